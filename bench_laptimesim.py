@@ -0,0 +1,339 @@
+# benchmark of the lap time simulation, compares the calculation time per lap of different solver options and
+# measures the performance of the solver for all bundled tracks, vehicles and several step sizes (benchmark suite)
+import laptimesim
+import copy
+import datetime
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import toml
+
+from datastore import DataStore
+
+# step sizes of the benchmark suite [m] (interp_stepsize_des)
+BENCH_STEPSIZES = [2.5, 5.0, 10.0]
+
+# relative decrease of the laps per second and increase of the peak memory that is flagged as regression
+BENCH_REGRESSION_TOL = 0.2
+
+# change of the lap time that is flagged as changed result [s]
+BENCH_LAP_TIME_TOL = 1e-3
+
+
+def create_lap(track_opts, solver_opts, driver_opts, debug_opts, car_config, track_pars, car_name):
+    """Create a lap object for the car of the first sensitivity analysis iteration.
+
+    Inputs:
+        - track_opts (dict): track options from sim_config.toml
+        - solver_opts (dict): solver options from sim_config.toml
+        - driver_opts (dict): driver options from sim_config.toml
+        - debug_opts (dict): debug options from sim_config.toml
+        - car_config (dict): car config, raw from the config file
+        - track_pars (dict): dictionary of track parameters of a single track from track_pars.toml
+        - car_name (str): name of the car config file
+
+    Outputs:
+        - lap (laptimesim.src.lap.Lap): lap object ready to be simulated
+
+    Raises:
+        - Nothing
+    """
+
+    repo_path = os.path.dirname(os.path.abspath(__file__))
+
+    # the datastore is only used to create the car, its results file is not needed
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        datastore = DataStore(results_file_name=os.path.join(tmp_dir, "results.csv"),
+                              track_pars=track_pars,
+                              car_name=car_name)
+        datastore.parse_car_config(car_config)
+        datastore.generate_unique_sa_combinations()
+
+    race_car_model = datastore.get_first_race_car_model()
+    car = laptimesim.src.car_electric.CarElectric(pars=race_car_model.get_car_parameters_for_laptimesim())
+
+    trackfilepath = os.path.join(repo_path, "laptimesim", "input", "tracks", "racelines",
+                                 track_opts["trackname"] + ".csv")
+
+    track = laptimesim.src.track.Track(track_opts=track_opts,
+                                       track_pars=track_pars,
+                                       trackfilepath=trackfilepath,
+                                       vel_lim_glob=np.inf,
+                                       yellow_s1=driver_opts["yellow_s1"],
+                                       yellow_s2=driver_opts["yellow_s2"],
+                                       yellow_s3=driver_opts["yellow_s3"])
+
+    driver = laptimesim.src.driver.Driver(carobj=car,
+                                          pars_driver=driver_opts,
+                                          trackobj=track,
+                                          stepsize=track.stepsize)
+
+    return laptimesim.src.lap.Lap(driverobj=driver,
+                                  trackobj=track,
+                                  pars_solver=solver_opts,
+                                  debug_opts=debug_opts)
+
+
+def time_laps(lap, no_laps):
+    """Simulate the lap no_laps times and return the mean calculation time per lap in seconds as well as the
+    velocity profile of the last lap"""
+
+    t_start = time.perf_counter()
+
+    for _ in range(no_laps):
+        lap.reset_lap()
+        lap.simulate_lap()
+
+    return (time.perf_counter() - t_start) / no_laps, lap.vel_cl.copy()
+
+
+def bench_lap(lap, no_laps):
+    """Measure the performance of a lap object
+
+    Inputs:
+        - lap (laptimesim.src.lap.Lap): lap object ready to be simulated
+        - no_laps (int): number of timed laps
+
+    Outputs:
+        - result (dict): laps per second, peak memory of a lap in MB (traced by tracemalloc in a separate lap since
+        tracing slows down the solver) and lap time of the simulated lap in s
+
+    Raises:
+        - Nothing
+    """
+
+    # first lap is not timed (e.g. compilation of the numba backend)
+    lap.simulate_lap()
+
+    t_lap, _ = time_laps(lap=lap, no_laps=no_laps)
+
+    tracemalloc.start()
+    lap.reset_lap()
+    lap.simulate_lap()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"laps_per_second": 1.0 / t_lap,
+            "peak_memory_mb": peak_memory / 1e6,
+            "lap_time": float(lap.t_cl[-1])}
+
+
+def bench_suite(config, car_configs, track_config, stepsizes, no_laps=3):
+    """Benchmark the solver for all combinations of tracks, vehicles and step sizes. Combinations that cannot be
+    simulated (e.g. start velocity too high for the track) are recorded with the error message.
+
+    Inputs:
+        - config (dict): content of sim_config.toml
+        - car_configs (dict): car configs (raw from the config files) by car config file name
+        - track_config (dict): content of track_pars.toml, all tracks that have a raceline are benchmarked
+        - stepsizes (list): step sizes [m] (interp_stepsize_des)
+        - no_laps (int): number of timed laps per combination
+
+    Outputs:
+        - results (dict): results of bench_lap by "<track>/<car>/<stepsize>"
+
+    Raises:
+        - Nothing
+    """
+
+    repo_path = os.path.dirname(os.path.abspath(__file__))
+    racelines_path = os.path.join(repo_path, "laptimesim", "input", "tracks", "racelines")
+
+    results = {}
+
+    for trackname in track_config:
+        if not os.path.isfile(os.path.join(racelines_path, trackname + ".csv")):
+            continue
+
+        for car_name, car_config in car_configs.items():
+            for stepsize in stepsizes:
+                track_opts = copy.deepcopy(config["track_opts_"])
+                track_opts["trackname"] = trackname
+                track_opts["interp_stepsize_des"] = stepsize
+
+                debug_opts = copy.deepcopy(config["debug_opts_"])
+                debug_opts["use_print"] = False
+
+                key = "%s/%s/%s" % (trackname, car_name, stepsize)
+
+                try:
+                    lap = create_lap(track_opts=track_opts,
+                                     solver_opts=copy.deepcopy(config["solver_opts_"]),
+                                     driver_opts=copy.deepcopy(config["driver_opts_"]),
+                                     debug_opts=debug_opts,
+                                     car_config=copy.deepcopy(car_config),
+                                     track_pars=copy.deepcopy(track_config[trackname]),
+                                     car_name=car_name)
+
+                    results[key] = bench_lap(lap=lap, no_laps=no_laps)
+                except RuntimeError as e:
+                    results[key] = {"error": str(e)}
+
+                print("%s: %s" % (key, results[key]))
+
+    return results
+
+
+def find_regressions(results, reference, tol=BENCH_REGRESSION_TOL, lap_time_tol=BENCH_LAP_TIME_TOL):
+    """Compare the results of a benchmark suite run to a reference run
+
+    Inputs:
+        - results (dict): results of bench_suite
+        - reference (dict): results of bench_suite of the reference run
+        - tol (float): relative decrease of the laps per second and increase of the peak memory that is flagged
+        - lap_time_tol (float): change of the lap time in s that is flagged
+
+    Outputs:
+        - regressions (list): description of every regression, empty if there is none
+
+    Raises:
+        - Nothing
+    """
+
+    regressions = []
+
+    for key, result in results.items():
+        if key not in reference or "error" in reference[key]:
+            continue
+
+        result_ref = reference[key]
+
+        if "error" in result:
+            regressions.append("%s: failed (%s)" % (key, result["error"]))
+            continue
+
+        if result["laps_per_second"] < (1.0 - tol) * result_ref["laps_per_second"]:
+            regressions.append("%s: %.2f laps/s (reference %.2f laps/s)"
+                               % (key, result["laps_per_second"], result_ref["laps_per_second"]))
+
+        if result["peak_memory_mb"] > (1.0 + tol) * result_ref["peak_memory_mb"]:
+            regressions.append("%s: peak memory %.2f MB (reference %.2f MB)"
+                               % (key, result["peak_memory_mb"], result_ref["peak_memory_mb"]))
+
+        if abs(result["lap_time"] - result_ref["lap_time"]) > lap_time_tol:
+            regressions.append("%s: lap time %.3f s (reference %.3f s)"
+                               % (key, result["lap_time"], result_ref["lap_time"]))
+
+    return regressions
+
+
+def save_bench_results(file_path, results):
+    """Save the results of bench_suite together with some information about the machine to a json file"""
+
+    with open(file_path, "w") as fh:
+        json.dump({"date": datetime.datetime.now().isoformat(),
+                   "machine": platform.platform(),
+                   "python": platform.python_version(),
+                   "numpy": np.__version__,
+                   "results": results}, fh, indent=4)
+
+
+def load_bench_results(file_path):
+    """Load the results of bench_suite from a json file written by save_bench_results"""
+
+    with open(file_path, "r") as fh:
+        return json.load(fh)["results"]
+
+
+def bench_solver_option(config, car_config, track_pars, car_name, option, values, no_laps=3):
+    """Compare the calculation time per lap for different values of a solver option
+
+    Inputs:
+        - config (dict): content of sim_config.toml
+        - car_config (dict): car config, raw from the config file
+        - track_pars (dict): dictionary of track parameters of a single track from track_pars.toml
+        - car_name (str): name of the car config file
+        - option (str): name of the solver option, e.g. calc_max_ax_mode
+        - values (list): values of the solver option to compare, the first one is the reference
+        - no_laps (int): number of laps simulated per value
+
+    Outputs:
+        - results (dict): mean calculation time per lap in seconds for every value
+
+    Raises:
+        - Nothing
+    """
+
+    results = {}
+    vel_cl = {}
+
+    for value in values:
+        solver_opts = copy.deepcopy(config["solver_opts_"])
+        solver_opts[option] = value
+
+        lap = create_lap(track_opts=copy.deepcopy(config["track_opts_"]),
+                         solver_opts=solver_opts,
+                         driver_opts=copy.deepcopy(config["driver_opts_"]),
+                         debug_opts=copy.deepcopy(config["debug_opts_"]),
+                         car_config=copy.deepcopy(car_config),
+                         track_pars=track_pars,
+                         car_name=car_name)
+
+        # first lap is not timed (e.g. compilation of the numba backend)
+        lap.simulate_lap()
+
+        results[value], vel_cl[value] = time_laps(lap=lap, no_laps=no_laps)
+
+    for value in values:
+        print("%s = %s: %.4f s/lap, speedup %.2f, max. velocity difference %.3f m/s"
+              % (option, value, results[value], results[values[0]] / results[value],
+                 np.max(np.abs(vel_cl[values[0]] - vel_cl[value]))))
+
+    return results
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# MAIN FUNCTION CALL ---------------------------------------------------------------------------------------------------
+# ----------------------------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    repo_path_ = os.path.dirname(os.path.abspath(__file__))
+
+    config_ = toml.load(os.path.join(repo_path_, "sim_config.toml"))
+    car_name_ = "{}.toml".format(config_["car_opts_"]["car"])
+    car_config_ = toml.load(os.path.join(repo_path_, "laptimesim", "input", "vehicles", car_name_))
+    track_config_ = toml.load(os.path.join(repo_path_, "laptimesim", "input", "tracks", "track_pars.toml"))
+
+    for option_, values_ in (("calc_max_ax_mode", ["search", "analytic"]),
+                             ("backend", ["python", "numba"])):
+        bench_solver_option(config=config_,
+                            car_config=car_config_,
+                            track_pars=track_config_[config_["track_opts_"]["trackname"]],
+                            car_name=car_name_,
+                            option=option_,
+                            values=values_)
+
+    # benchmark suite --------------------------------------------------------------------------------------------------
+    # the results are saved in the output folder, the first run is saved as reference for the following runs (delete
+    # bench_reference.json to create a new reference, e.g. on another machine)
+    vehicles_path_ = os.path.join(repo_path_, "laptimesim", "input", "vehicles")
+    car_configs_ = {car_name: toml.load(os.path.join(vehicles_path_, car_name))
+                    for car_name in sorted(os.listdir(vehicles_path_)) if car_name.endswith(".toml")}
+
+    results_ = bench_suite(config=config_,
+                           car_configs=car_configs_,
+                           track_config=track_config_,
+                           stepsizes=BENCH_STEPSIZES)
+
+    bench_path_ = os.path.join(repo_path_, "laptimesim", "output", "bench")
+    os.makedirs(bench_path_, exist_ok=True)
+
+    date_ = datetime.datetime.now().strftime("%Y_%m_%d-%H_%M_%S")
+    save_bench_results(os.path.join(bench_path_, "bench-%s.json" % date_), results_)
+
+    reference_file_path_ = os.path.join(bench_path_, "bench_reference.json")
+
+    if os.path.isfile(reference_file_path_):
+        regressions_ = find_regressions(results=results_, reference=load_bench_results(reference_file_path_))
+
+        for regression_ in regressions_:
+            print("REGRESSION: %s" % regression_)
+
+        print("%i regressions compared to the reference" % len(regressions_))
+    else:
+        save_bench_results(reference_file_path_, results_)
+        print("Saved the results as reference")
@@ -0,0 +1,87 @@
+# shared inputs of the tests, the options of sim_config.toml are loaded with a pinned car, track and pinned options,
+# such that the tests do not depend on the choices in the local sim_config.toml
+import os
+import toml
+
+from definitions import GWC_TIMES_TAG, PIT_DRIVE_THROUGH_PENALTY_TIME, WINNING_GAS_CAR_LAPS
+
+REPO_PATH = os.path.dirname(os.path.abspath(__file__))
+
+TEST_CAR = "eLemons_honda_insight"
+TEST_TRACK = "HighPlainsFullTrack"
+
+# options the tests are based on, options that are not listed are taken from sim_config.toml
+TEST_OPTS = {
+    "track_opts_": {"flip_track": False,
+                    "mu_weather": 1.0,
+                    "interp_stepsize_des": 5.0,
+                    "curv_filt_width": 10.0,
+                    "use_drs1": False,
+                    "use_drs2": False,
+                    "use_pit": False,
+                    "use_elevation": False,
+                    "use_cache": False},
+    "solver_opts_": {"limit_braking_weak_side": "FA",
+                     "v_start": 27.7,
+                     "find_v_start": True,
+                     "max_no_em_iters": 5,
+                     "es_diff_max": 1.0,
+                     "em_iter_scheme": "add",
+                     "calc_max_ax_mode": "analytic",
+                     "calc_max_ax_tol": 0.25,
+                     "backend": "python",
+                     "warm_start": False,
+                     "v_start_tol": 0.01},
+    "driver_opts_": {"vel_subtr_corner": 0.5,
+                     "vel_lim_glob": 1000,
+                     "yellow_s1": False,
+                     "yellow_s2": False,
+                     "yellow_s3": False,
+                     "yellow_throttle": 0.3,
+                     "initial_energy": 0.0,
+                     "em_strategy": "FCFB",
+                     "use_recuperation": True,
+                     "use_lift_coast": False,
+                     "lift_coast_dist": 10.0,
+                     "disable_braking": True},
+    "debug_opts_": {"use_plot": False,
+                    "use_debug_plots": False,
+                    "use_plot_comparison_tph": False,
+                    "use_print": False,
+                    "use_print_result": False,
+                    "use_profiling": False,
+                    "headless": True}
+}
+
+
+def load_test_inputs(car=TEST_CAR, trackname=TEST_TRACK):
+    """Load the inputs of a simulation like main_laptimesim.py does, but with the pinned options.
+
+    Inputs:
+        - car (str): name of the car config file without extension
+        - trackname (str): name of the track in track_pars.toml
+
+    Outputs:
+        - config (dict): sim_config.toml with the options of TEST_OPTS, the car and the track
+        - car_name (str): name of the car config file
+        - car_config (dict): car config, raw from the config file
+        - track_pars (dict): track parameters from track_pars.toml including the keys set by main_laptimesim.py
+    """
+
+    config = toml.load(os.path.join(REPO_PATH, "sim_config.toml"))
+
+    for section, opts in TEST_OPTS.items():
+        config[section].update(opts)
+
+    config["track_opts_"]["trackname"] = trackname
+    config["car_opts_"]["car"] = car
+
+    car_name = "{}.toml".format(car)
+    car_config = toml.load(os.path.join(REPO_PATH, "laptimesim", "input", "vehicles", car_name))
+
+    track_pars = toml.load(os.path.join(REPO_PATH, "laptimesim", "input", "tracks", "track_pars.toml"))[trackname]
+    track_pars[WINNING_GAS_CAR_LAPS] = track_pars["winning_laps"]
+    track_pars[PIT_DRIVE_THROUGH_PENALTY_TIME] = track_pars["pit_penalty"]
+    track_pars[GWC_TIMES_TAG] = track_pars["gwc_times"]
+
+    return config, car_name, car_config, track_pars
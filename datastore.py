@@ -1,20 +1,24 @@
 # datastore for storing and outputting data, intended to be compatible with multiple threads
 import time
 import threading
-import csv
+import hashlib
+import json
+import os
 import numpy as np
-import itertools
 import pandas as pd
 from race_car_model import (
-    RaceCarModel
+    RaceCarModel, calculate_car_properties_columnar
 )
+from results_sink import create_results_sink
+from sa_sampler import create_sampler
+from laptimesim.src.lap_profiler import PROFILE_FIELDNAMES
 
 from definitions import (
     GWC_TIMES_TAG, ITER_TAG, PIT_DRIVE_THROUGH_PENALTY_TIME, TOTAL_PITS_TAG, TOTAL_PITS_TAG, 
     VEHICLE_TAG, TOTAL_LAPS_TAG, LAPTIME_TAG,
     LAP_ENERGY_TAG, ENERGY_REMAINING_TAG,
 
-    HEADER_ROW, WINNING_ELECTRIC_CAR_TAG, WINNING_GAS_CAR_LAPS
+    HEADER_ROW, RESULTS_DTYPES, WINNING_ELECTRIC_CAR_TAG, WINNING_GAS_CAR_LAPS
 )
 
 # Config keys that cannot be multiple values
@@ -29,6 +33,38 @@ EXCEPTION_KEYS = [
     "gearbox.e_i",
 ]
 
+# number of sensitivity analysis combinations whose car properties are calculated
+# at once (see DataStore.calculate_sa_grid_chunk)
+SA_CHUNK_SIZE = 10000
+
+
+def _json_default(x):
+    # numpy arrays and scalars in checkpoints and grid fingerprints
+    if isinstance(x, np.ndarray):
+        return x.tolist()
+    elif isinstance(x, np.generic):
+        return x.item()
+
+    raise TypeError("Object of type {} is not JSON serializable".format(type(x).__name__))
+
+
+def _create_race_car_model(input_vars, properties, k):
+    """Race car model of the combination k of a chunk of combinations (see DataStore.calculate_sa_grid_chunk)"""
+
+    car_input_vars = {}
+    for variable_name, value in input_vars.items():
+        if isinstance(value, np.ndarray):
+            car_input_vars[variable_name] = value[k]
+        else:
+            car_input_vars[variable_name] = value
+
+    # Make racecar property model and set the calculated parameters
+    race_car_model = RaceCarModel()
+    race_car_model.set_params(car_input_vars)
+    race_car_model.set_calculated_properties({key: value[k] for key, value in properties.items()})
+
+    return race_car_model
+
 
 class SingleIterationData():
     """Class to hold all data related to a single iteration including
@@ -78,7 +114,8 @@ class SingleIterationData():
 
 
 class DataStore():
-    def __init__(self, results_file_name, track_pars, car_name):
+    def __init__(self, results_file_name, track_pars, car_name, results_buffer_size=1, checkpoint_interval=0,
+                 resume=False, use_profiling=False):
         """ Initialize datastore and start output file
         
         This datastore is intended to be the main interaction to
@@ -101,30 +138,99 @@ class DataStore():
         1. initialize datastore
         2. add static and sa_range variables, all variables in REQUIRED_INPUTS 
         list must be present before moving to next step
-        3. create all input variable combinations 
-        4. Run simulations by accessing each iterations data in SingleIterationData class,
-        add results data back to SingleIterationData class
+        3. prepare the input variable combinations
+        4. Run simulations by iterating over the combinations (iterate_sa_combinations),
+        add results data back to the datastore (set_single_iteration_results)
+        5. Close the results file (close_results_file)
+
+        Checkpoints: if a checkpoint interval is set, the state of the sensitivity analysis
+        (grid fingerprint, iterations that are not finished yet, position in the results
+        file and best result) is saved next to the results file (<results file>.checkpoint.json)
+        at most every checkpoint_interval seconds. A crashed sensitivity analysis can be resumed
+        with the same results file name and resume=True, finished iterations are skipped and
+        the results are appended to the results file. Checkpoints are only supported for the
+        csv and npz formats, they are deactivated for the others.
 
         Inputs:
-            - results_file_name (str): file name for output file 
+            - results_file_name (str): file name for output file, the extension selects the format
+            (csv, npz, parquet or feather, see results_sink.py)
             - track_pars (dict): dictionary of track parameters of a single track from track_pars.toml
             - car_name (str): name of car used in the simulation
+            - results_buffer_size (int): number of results that are buffered before writing them to the output file
+            - checkpoint_interval (float): minimum time between two checkpoints in seconds (0 -> no checkpoints)
+            - resume (bool): resume the sensitivity analysis of the checkpoint of the results file
+            - use_profiling (bool): add the profile of the lap simulation to the results (see lap_profiler.py)
+
+        Raises:
+            - IOError if the sensitivity analysis should be resumed but there is no checkpoint or the format
+            of the results file cannot be resumed (parquet, feather)
         """
 
         self.add_results_lock = threading.Lock()
-        results_file = open(results_file_name, "w", newline='')
-        self.results_file_writer = csv.DictWriter(results_file,
-                                                  fieldnames=HEADER_ROW,
-                                                  )
+
+        self._checkpoint_file = results_file_name + ".checkpoint.json"
+        self._checkpoint_interval = checkpoint_interval
+        self._t_last_checkpoint = time.perf_counter()
+
+        if resume:
+            if not os.path.isfile(self._checkpoint_file):
+                raise IOError("There is no checkpoint to resume the sensitivity analysis from!")
+
+            with open(self._checkpoint_file, "r") as fh:
+                self._checkpoint = json.load(fh)
+
+            # results sinks without a position (parquet, feather) cannot be continued
+            if self._checkpoint["results_position"] is None:
+                raise IOError("Resuming is not supported for the format of the results file!")
+        else:
+            self._checkpoint = None
+
+        self._use_profiling = use_profiling
+
+        self.results_sink = create_results_sink(file_name=results_file_name,
+                                                fieldnames=HEADER_ROW + (PROFILE_FIELDNAMES if use_profiling else []),
+                                                buffer_size=results_buffer_size,
+                                                resume_position=(self._checkpoint["results_position"]
+                                                                 if resume else None),
+                                                dtypes=RESULTS_DTYPES)
+
+        # checkpoints require a position in the results file to continue it at
+        if self._checkpoint_interval > 0 and self.results_sink.get_position() is None:
+            print("WARNING: Checkpoints are deactivated, the format of the results file cannot be resumed!")
+            self._checkpoint_interval = 0
+
         self.track_pars = track_pars
         self.car_name = car_name
         self.results_list = []
 
-        self.results_file_writer.writeheader()
-
         self.input_data_ranges = {}
-        self.single_iteration_data = {}
+        self.single_iteration_data = {}  # iterations whose results are not set yet
         self._total_iterations = -1
+        self._sa_opts_names = []
+        self._sa_opts_explicit_values = []
+
+        # sampling of the sa variables, all combinations if the car config has no sampling section
+        self.sampling_opts = {"method": "grid"}
+        self._sampler = None
+        self._first_iteration_round = 0
+
+        # best result so far, updated whenever the results of an iteration are set
+        self._best_results = None
+        self._multiple_optimum_results = False
+
+        # all iterations below the next iteration were yielded by iterate_sa_combinations, the
+        # finished ones are removed from single_iteration_data
+        self._next_iteration = 0
+        self._grid_fingerprint = None
+
+        # pending iterations of the checkpoint that were not yielded again since the resume
+        self._pending_checkpoint = set()
+
+        if self._checkpoint is not None:
+            self._best_results = self._checkpoint["best_results"]
+            self._multiple_optimum_results = self._checkpoint["multiple_optimum_results"]
+            self._next_iteration = self._checkpoint["next_iteration"]
+            self._pending_checkpoint = set(self._checkpoint["pending_iterations"])
     
     def parse_car_config(self, car_config):
         """Function to parse the car properties dictionary
@@ -149,6 +255,10 @@ class DataStore():
         start_time = time.time()
         print("starting parsing car config...")
 
+        # the sampling section is no car property
+        car_config = dict(car_config)
+        self.sampling_opts = car_config.pop("sampling", self.sampling_opts)
+
         flattened_car_config = pd.json_normalize(car_config, sep='.')
         # the return object is pandas.core.frame.DataFrame
         # neet to convert it back to dict format
@@ -180,10 +290,14 @@ class DataStore():
         print("parsing complete, took: {} seconds".format(time.time() - start_time))
 
     def generate_unique_sa_combinations(self):
-        """ Function that generates all unique combinations of 
+        """ Function that prepares the generation of all unique combinations of
         sensitivity analysis variables.
 
-        This is intended to be called just before running the simulation
+        This is intended to be called just before running the simulation. The
+        combinations themselves are not created here, they are generated on demand
+        by iterate_sa_combinations such that memory stays flat for large sweeps.
+        Instead of all combinations, the sa variables can be sampled by one of the
+        methods of the sampling section of the car config (see sa_sampler.py).
 
         Inputs:
             - None
@@ -194,13 +308,14 @@ class DataStore():
         Raises:
             - Exception if there is an unsupported iteration variable or not all variables
             are present
+            - IOError if the sampling method is unknown or an adaptive or surrogate sampling should be resumed
 
         """
 
-        # turn iteration variables into a list of unique 
-        # simulation conditions to iterate through
+        # turn iteration variables into unique simulation conditions to iterate through
         # 1. List all unique values for each sensitivity analysis (sa) variable
-        # 2. Create all unique combinations with all variables
+        # 2. Create all unique combinations with all variables or the samples of the sampling method
+        # (chunk-wise, see calculate_sa_grid_chunk)
         # approach based on this stack overflow post:
         # https://stackoverflow.com/questions/798854/all-combinations-of-a-list-of-lists
         
@@ -211,8 +326,8 @@ class DataStore():
         print("starting generating unique combinations...")
 
         # 1
-        sa_opts_explicit_values = []
-        sa_opts_names = []
+        self._sa_opts_explicit_values = []
+        self._sa_opts_names = []
         for key, value in self.input_data_ranges.items():
             if key in EXCEPTION_KEYS:
                 # value is no a list, make a 1 entry list
@@ -221,65 +336,210 @@ class DataStore():
                 entry_explicit_values = np.linspace(value[0],
                                                     value[1],
                                                     value[2])
-            sa_opts_names.append(key)
-            sa_opts_explicit_values.append(entry_explicit_values)
+            self._sa_opts_names.append(key)
+            self._sa_opts_explicit_values.append(entry_explicit_values)
+
+        self._sampler = create_sampler(sampling_opts=self.sampling_opts,
+                                       explicit_values=self._sa_opts_explicit_values)
+
+        # number of combinations including the ones that are skipped because of the vehicle mass
+        self._total_iterations = self._sampler.no_samples
+        self._first_iteration_round = 0
 
-        # 2
-        """The format of variable_combinations will be as follows:
-        - overall data structure is a list of tuples
-        - each tuple has length n, where n is the number of sa_opts variables.
-        i.e. if the only sa_opt is mass then each tuple will have a length of 1.
-        If there are 3 sa_opts (mass, c_d, max_torque) then each tuple will have 3 elements
+        # fingerprint of the sensitivity analysis, a checkpoint can only be resumed with the same one
+        self._grid_fingerprint = hashlib.sha1(json.dumps({"car_name": self.car_name,
+                                                          "track_pars": self.track_pars,
+                                                          "input_data_ranges": self.input_data_ranges,
+                                                          "sampling_opts": self.sampling_opts},
+                                                         sort_keys=True, default=_json_default).encode()).hexdigest()
 
-        The associated variable name of each tuple is the same index of sa_opts_names
+        if self._checkpoint is not None and self._checkpoint["grid_fingerprint"] != self._grid_fingerprint:
+            raise IOError("Checkpoint does not match the sensitivity analysis (car, track or sa variables changed)!")
+
+        # the samples of the refinement rounds depend on results that are not part of the checkpoint
+        if self._checkpoint is not None and self.sampling_opts["method"] in ["adaptive", "surrogate"]:
+            raise IOError("Resuming is not supported for the {} sampling method!".format(self.sampling_opts["method"]))
+
+        print("combiations complete, took: {} seconds".format(time.time() - start_time))
+
+    def calculate_sa_grid_chunk(self, start, stop):
+        """Calculate the car properties of the sensitivity analysis combinations
+        start to stop (exclusive) at once in columnar form, see
+        calculate_car_properties_columnar. The combinations are numbered in the
+        order of itertools.product over all sa variables (grid sampling) or in the
+        order of the samples of the sampler.
+
+        Inputs:
+            - start (int): number of the first combination
+            - stop (int): number of the combination after the last one
+
+        Outputs:
+            - iterations (np.ndarray): numbers of the combinations
+            - input_vars (dict): key is flattened variable name, value is a numpy array with
+            one value per combination (single value for variables that are not swept)
+            - properties (dict): key is flattened property name, value is a numpy array with
+            one value per combination
+            - is_allowable_weight (np.ndarray): boolean mask of the rules legal cars
+
+        Raises:
+            - Nothing
         """
-        variable_combinations = list(itertools.product(*sa_opts_explicit_values))
-
-        # Add all unique combinations 
-        for i, entry in enumerate(variable_combinations):
-
-            # 3. remap each variable in the entry tuple to have a variable
-            # name from sa_opts_names to the values can be passed
-            # explicitly to the SingleIterationData class later
-            # This is possible because of the way the itertools.product 
-            # function works.
-            
-            # The first value in each tuple comes from 
-            # the first list that was passed in.
-            # The first list that was passed in has the variable name 
-            # in the first position of the list of the sa_opts_names list
-            # and so on for the 2nd, 3rd, etc.
-            input_vars = {}
-            for j, variable_name in enumerate(sa_opts_names):
-                input_vars[variable_name] = entry[j]
-            
-            # Make racecar property model and calculate parameters
-            race_car_model = RaceCarModel()
-
-            race_car_model.set_params(input_vars)
+
+        iterations = np.arange(start, stop)
+
+        # 2. values of every sa variable for the combinations, variables that are not
+        # swept keep their single value
+        # 3. associate the values with the variable names
+        input_vars = dict(zip(self._sa_opts_names, self._sampler.get_values(start, stop)))
+
+        properties, is_allowable_weight = calculate_car_properties_columnar(input_vars)
+
+        # properties that do not depend on the swept variables are single values
+        for key in properties:
+            properties[key] = np.broadcast_to(properties[key], iterations.shape)
+
+        is_allowable_weight = np.broadcast_to(is_allowable_weight, iterations.shape)
+
+        return iterations, input_vars, properties, is_allowable_weight
+
+    def _iterate_race_car_models(self, first_iteration=0):
+        """Generator that yields the iteration number and the race car model of all
+        rules legal combinations starting at first_iteration. The car properties are
+        calculated chunk-wise in columnar form, the race car models are created on demand."""
+
+        for start in range(first_iteration, self._total_iterations, SA_CHUNK_SIZE):
+            stop = min(start + SA_CHUNK_SIZE, self._total_iterations)
+            iterations, input_vars, properties, is_allowable_weight = self.calculate_sa_grid_chunk(start, stop)
 
             # Catch condition where the total mass of the vehicle
             # is too high and don't add to the iteration
-            try:
-                race_car_model.calculate_car_properties()
-            except Exception as e:
-                print("Exception in calculating car properties {}".format(e))
+            if not np.all(is_allowable_weight):
+                print("Skipped {} combinations because the vehicle is over weight and out of rule spec"
+                      .format(np.count_nonzero(~is_allowable_weight)))
+
+            for k in np.flatnonzero(is_allowable_weight):
+                yield int(iterations[k]), _create_race_car_model(input_vars=input_vars, properties=properties, k=k)
+
+    def get_race_car_model(self, iteration):
+        """Get the race car model of a single combination of sensitivity analysis
+        variables, e.g. to simulate the lap of a finished iteration again. The
+        combination is not registered as iteration.
+
+        Inputs:
+            - iteration (int): iteration number of the combination (see iterate_sa_combinations)
+
+        Outputs:
+            - race_car_model (RaceCarModel): race car model, None if the combination is out of rule spec
+
+        Raises:
+            - IOError if the iteration is not part of the sensitivity analysis (e.g. an iteration of a
+            refinement round of the adaptive sampling that was not generated yet)
+        """
+
+        if not 0 <= iteration < self._total_iterations:
+            raise IOError("Unknown iteration {}!".format(iteration))
+
+        _, input_vars, properties, is_allowable_weight = self.calculate_sa_grid_chunk(iteration, iteration + 1)
+
+        if not is_allowable_weight[0]:
+            return None
+
+        return _create_race_car_model(input_vars=input_vars, properties=properties, k=0)
+
+    def iterate_sa_combinations(self):
+        """Generator that yields all unique combinations of sensitivity
+        analysis variables one after another.
+
+        Combinations are created and validated on demand, i.e. only the
+        iterations that were yielded but whose results are not set yet
+        are held in memory. The iteration number is the index of the
+        combination in the itertools.product order, combinations that are
+        out of rule spec are skipped. If the sensitivity analysis is resumed,
+        the iterations that were finished before the checkpoint are skipped.
+        For adaptive sampling, only the combinations of the current refinement
+        round are yielded (see refine_sa_combinations).
+
+        Inputs:
+            - None
+
+        Outputs:
+            - (iteration, single_iteration_data) (tuple): iteration number and
+            SingleIterationData of every valid combination
+
+        Raises:
+            - Nothing
+        """
+
+        if self._checkpoint is not None:
+            next_iteration_checkpoint = self._checkpoint["next_iteration"]
+            pending_checkpoint = set(self._checkpoint["pending_iterations"])
+        else:
+            next_iteration_checkpoint = 0
+            pending_checkpoint = set()
+
+        for i, race_car_model in self._iterate_race_car_models(first_iteration=self._first_iteration_round):
+            # skip iterations that were finished before the checkpoint
+            if i < next_iteration_checkpoint and i not in pending_checkpoint:
                 continue
 
+            # pending iterations of the checkpoint are below its next iteration, which must not be lowered
+            self._next_iteration = max(self._next_iteration, i + 1)
+            self._pending_checkpoint.discard(i)
+
             iteration_data = SingleIterationData(iteration_number=i,
                                                  vehicle_name=self.car_name,
                                                  race_car_model=race_car_model
                                                  )
             self.single_iteration_data[i] = iteration_data
-            self._total_iterations = i + 1 # enumerate is 0 based
-        print("combiations complete, took: {} seconds".format(time.time() - start_time))
+
+            yield i, iteration_data
+
+    def refine_sa_combinations(self):
+        """Add the combinations of the next refinement round of the adaptive sampling
+        based on the results of all previous iterations, must be called after the
+        results of all iterations of the current round are set.
+
+        Inputs:
+            - None
+
+        Outputs:
+            - is_refined (bool): True if there are new combinations, they are yielded by
+            the next call of iterate_sa_combinations
+
+        Raises:
+            - Nothing
+        """
+
+        self._first_iteration_round = self._total_iterations
+        is_refined = self._sampler.refine()
+        self._total_iterations = self._sampler.no_samples
+
+        return is_refined
+
+    def get_first_race_car_model(self):
+        """Get the race car model of the first valid combination of sensitivity
+        analysis variables, e.g. to create the lap objects before the simulation.
+        The combination is not registered as iteration.
+
+        Inputs:
+            - None
+
+        Outputs:
+            - race_car_model (RaceCarModel): race car model, None if there is no valid combination
+
+        Raises:
+            - Nothing
+        """
+
+        return next((race_car_model for _, race_car_model in self._iterate_race_car_models()), None)
 
     def set_single_iteration_results(
         self, iteration, lap_time, lap_energy, total_laps,
-        total_pits, energy_remaining, is_winning_car_configuration
+        total_pits, energy_remaining, is_winning_car_configuration, profile=None
     ):
         """Method to set results of a single lap.
-        Saves to datastore and writes out to csv file
+        Saves to datastore and writes out to the results file. Only the best result is
+        kept in memory, the iteration is removed from the datastore afterwards.
         
         Inputs:
             - iteration (int): iteration number of simulation, retreived from
@@ -292,6 +552,8 @@ class DataStore():
             - energy_remaining (float): sum of percentage of battery energy remaining in race
             - is_winning_car_configuration (bool): True if the electric car does more laps in the race
                 than the winning gas car
+            - profile (dict): profile summary of the lap simulation (see lap_profiler.py), only written if
+                profiling is used, None -> no profile (e.g. cached lap)
 
         Outputs: Nothing
         
@@ -306,15 +568,38 @@ class DataStore():
                                                               is_winning_car_configuration=is_winning_car_configuration)
 
             # Write results to file
-            # this should work magically because the csv writer is type DictWriter
-            # all data should be in the properly labeled columns
+            # all data should be in the properly labeled columns of HEADER_ROW
 
             results = self.single_iteration_data[iteration].get_results()
             results[WINNING_GAS_CAR_LAPS] = self.track_pars[WINNING_GAS_CAR_LAPS]
             results[PIT_DRIVE_THROUGH_PENALTY_TIME] = self.track_pars[PIT_DRIVE_THROUGH_PENALTY_TIME]
             results[GWC_TIMES_TAG] = self.track_pars[GWC_TIMES_TAG]
-            
-            self.results_file_writer.writerow(results)
+
+            # laps that were not simulated (e.g. cached) have no profile
+            if self._use_profiling:
+                results.update(profile if profile is not None else dict.fromkeys(PROFILE_FIELDNAMES, np.nan))
+
+            self.results_sink.write(results)
+
+            # update best result, with multiple optimum results the first iteration is kept
+            if self._best_results is None or results[TOTAL_LAPS_TAG] > self._best_results[TOTAL_LAPS_TAG]:
+                self._best_results = results
+                self._multiple_optimum_results = False
+            elif results[TOTAL_LAPS_TAG] == self._best_results[TOTAL_LAPS_TAG]:
+                self._multiple_optimum_results = True
+
+                if results[ITER_TAG] < self._best_results[ITER_TAG]:
+                    self._best_results = results
+
+            del self.single_iteration_data[iteration]
+
+            self._sampler.set_results(sample=iteration,
+                                      total_laps=total_laps,
+                                      is_winning_car_configuration=is_winning_car_configuration)
+
+            if self._checkpoint_interval > 0 \
+                    and time.perf_counter() - self._t_last_checkpoint >= self._checkpoint_interval:
+                self._save_checkpoint()
     
     def get_best_result(self):
         """Gets information about the result that 
@@ -330,23 +615,39 @@ class DataStore():
             - Nothing
         """
 
-        # Find best iteration
+        return self._best_results, self._multiple_optimum_results
+
+    def close_results_file(self):
+        """Writes all buffered results and closes the output file, must be called after all
+        simulations have run"""
+
+        with self.add_results_lock:
+            if self._checkpoint_interval > 0:
+                self._save_checkpoint()
+
+            self.results_sink.close()
+
+    def _save_checkpoint(self):
+        """Write all buffered results and save the state of the sensitivity analysis such that it can be resumed,
+        must be called with the add results lock held"""
+
+        self.results_sink.flush()
 
-        max_laps = 0
-        best_iteration = 0
-        multiple_optimum_results = False
+        checkpoint = {
+            "grid_fingerprint": self._grid_fingerprint,
+            "next_iteration": self._next_iteration,
+            "pending_iterations": sorted(self._pending_checkpoint.union(self.single_iteration_data)),
+            "results_position": self.results_sink.get_position(),
+            "best_results": self._best_results,
+            "multiple_optimum_results": self._multiple_optimum_results,
+        }
 
-        for key in self.single_iteration_data:
-            results = self.single_iteration_data[key].get_results()
+        # write to a temporary file first such that a crash never leaves an incomplete checkpoint
+        checkpoint_file_tmp = self._checkpoint_file + ".tmp"
 
-            if results[TOTAL_LAPS_TAG] == max_laps:
-                multiple_optimum_results = True
-            if results[TOTAL_LAPS_TAG] > max_laps:
-                best_iteration = results[ITER_TAG]
-                max_laps = results[TOTAL_LAPS_TAG]
-                multiple_optimum_results = False
+        with open(checkpoint_file_tmp, "w") as fh:
+            json.dump(checkpoint, fh, default=_json_default)
 
-        best_single_iteration = self.single_iteration_data[best_iteration]
-        best_results = best_single_iteration.get_results()
+        os.replace(checkpoint_file_tmp, self._checkpoint_file)
 
-        return best_results, multiple_optimum_results
+        self._t_last_checkpoint = time.perf_counter()
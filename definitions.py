@@ -79,6 +79,12 @@ ENERGY_REMAINING_TAG = "Energy Remaining (sum of %)"
 
 WINNING_ELECTRIC_CAR_TAG = "Does this electric car win? (bool)"
 
+# Monte Carlo race simulation results
+TOTAL_LAPS_P05_TAG = "Total Laps Completed 5th Percentile"
+TOTAL_LAPS_P50_TAG = "Total Laps Completed Median"
+TOTAL_LAPS_P95_TAG = "Total Laps Completed 95th Percentile"
+WIN_PROBABILITY_TAG = "Probability to beat the winning gas car"
+
 HEADER_ROW = [
     ITER_TAG, VEHICLE_TAG, TOTAL_LAPS_TAG, LAPTIME_TAG,
     LAP_ENERGY_TAG, BATTERY_MASS_TAG, PIT_TIME_TAG,
@@ -105,3 +111,9 @@ HEADER_ROW = [
     FRONT_TIRE_FZ_0_TAG, FRONT_TIRE_MUX_TAG, FRONT_TIRE_MUY_TAG, FRONT_TIRE_DMUX_DFZ_TAG,
     FRONT_TIRE_DMUY_DFZ_TAG, F_ROLL_TAG
 ]
+
+# types of the integer and boolean columns of the results, all other numeric columns are stored as float64 in the
+# columnar results formats (see results_sink.py), i.e. the types do not depend on the values of a chunk of rows
+RESULTS_DTYPES = {
+    ITER_TAG: "int64", TOTAL_LAPS_TAG: "int64", TOTAL_PITS_TAG: "int64", WINNING_ELECTRIC_CAR_TAG: "bool"
+}
@@ -0,0 +1,305 @@
+# offscreen reports of selected iterations of the sensitivity analysis, the laps of the selected
+# iterations are simulated again and their plots are rendered with the Agg backend into image files
+import concurrent.futures
+import os
+import numpy as np
+import laptimesim
+
+from definitions import ITER_TAG, LAP_ENERGY_TAG, LAPTIME_TAG, TOTAL_LAPS_TAG
+
+# supported image formats of the reports
+REPORT_FORMATS = ["png", "svg"]
+
+# lap object of a worker process, it is created once per worker in _init_worker and reused
+# for all iterations that are rendered by this worker
+_worker_lap = None
+
+
+def select_best(data, no_best):
+    """Select the iterations with the most total laps, ties are broken by the lap time.
+
+    Inputs:
+        - data (pd.DataFrame): results of the sensitivity analysis, e.g. from results_sink.read_results
+        - no_best (int): number of selected iterations
+
+    Outputs:
+        - iterations (np.ndarray): iteration numbers, best iteration first
+    """
+
+    data_sorted = data.sort_values([TOTAL_LAPS_TAG, LAPTIME_TAG], ascending=[False, True], kind="stable")
+
+    return data_sorted[ITER_TAG].to_numpy(dtype=int)[:no_best]
+
+
+def select_pareto_front(data):
+    """Select the iterations on the pareto front of lap time and lap energy, i.e. the iterations
+    for which no other iteration is faster without consuming more energy per lap.
+
+    Inputs:
+        - data (pd.DataFrame): results of the sensitivity analysis, e.g. from results_sink.read_results
+
+    Outputs:
+        - iterations (np.ndarray): iteration numbers, fastest iteration first
+    """
+
+    lap_time = data[LAPTIME_TAG].to_numpy(dtype=float)
+    lap_energy = data[LAP_ENERGY_TAG].to_numpy(dtype=float)
+
+    # sorted by lap time (and lap energy for equal lap times), an iteration is on the pareto front if it
+    # consumes less energy than all faster iterations
+    order = np.lexsort((lap_energy, lap_time))
+    lap_energy_sorted = lap_energy[order]
+    lap_energy_min_before = np.minimum.accumulate(np.concatenate(([np.inf], lap_energy_sorted[:-1])))
+
+    return data[ITER_TAG].to_numpy(dtype=int)[order[lap_energy_sorted < lap_energy_min_before]]
+
+
+def select_iterations(data, report_opts):
+    """Iterations of the reports according to the report options (best iterations and optionally the
+    pareto front, see select_best and select_pareto_front), sorted by the iteration number"""
+
+    iterations = select_best(data=data, no_best=report_opts["no_best"])
+
+    if report_opts["use_pareto_front"]:
+        iterations = np.concatenate((iterations, select_pareto_front(data=data)))
+
+    return np.unique(iterations)
+
+
+def _add_lines(ax, x, ys, labels):
+    """Draw several lines with a common x axis as a single line collection and add a legend"""
+
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
+
+    colors = ["C%i" % i for i in range(len(ys))]
+
+    ax.add_collection(LineCollection([np.column_stack((x, y)) for y in ys], colors=colors))
+    ax.autoscale_view()
+    ax.legend([Line2D([], [], color=color) for color in colors], labels)
+
+
+def _add_colored_line(ax, points, values, cmap, norm):
+    """Draw a line through the points whose segments are colored by the values (one value per segment)"""
+
+    from matplotlib.collections import LineCollection
+
+    segments = np.stack((points[:-1], points[1:]), axis=1)
+    lines = LineCollection(segments, cmap=cmap, norm=norm, linewidths=3.0)
+    lines.set_array(values)
+
+    ax.add_collection(lines)
+    ax.autoscale_view()
+
+    return lines
+
+
+def render_lap_report(lap, file_name_prefix, formats):
+    """Render the overview, torque, tire load and gear plots of a simulated lap into image files.
+    The figures are drawn offscreen with the Agg backend, pyplot is not used, i.e. no window is
+    opened and several processes can render at the same time.
+
+    Inputs:
+        - lap (laptimesim.src.lap.Lap): simulated lap
+        - file_name_prefix (str): path and beginning of the file names, the plot name and the
+        extension are appended
+        - formats (list): image formats (see REPORT_FORMATS)
+
+    Outputs:
+        - file_names (list): paths of the written files
+
+    Raises:
+        - IOError if an image format is unknown
+    """
+
+    from matplotlib import colormaps
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.colors import Normalize
+    from matplotlib.figure import Figure
+
+    for image_format in formats:
+        if image_format not in REPORT_FORMATS:
+            raise IOError("Unknown report format {}!".format(image_format))
+
+    dists = lap.trackobj.dists_cl
+    figures = {}
+
+    # overview: velocity profile and track map colored by the velocity, energy consumption ----------------------------
+    fig = Figure(figsize=(12.0, 9.0))
+    cmap = colormaps["RdYlGn"]
+    norm = Normalize(vmin=np.amin(lap.vel_cl) * 3.6, vmax=np.amax(lap.vel_cl) * 3.6)
+
+    ax = fig.add_subplot(2, 1, 1)
+    _add_colored_line(ax, np.column_stack((dists, lap.vel_cl * 3.6)), lap.vel_cl[:-1] * 3.6, cmap, norm)
+    ax.set_title("lap time: %.3f s" % lap.t_cl[-1])
+    ax.set_xlabel("distance in m")
+    ax.set_ylabel("velocity in km/h")
+    ax.grid()
+
+    ax = fig.add_subplot(2, 2, 3)
+    lines = _add_colored_line(ax, np.vstack((lap.trackobj.raceline, lap.trackobj.raceline[:1])),
+                              lap.vel_cl[:-1] * 3.6, cmap, norm)
+    ax.plot(lap.trackobj.raceline[0, 0], lap.trackobj.raceline[0, 1], "k.", markersize=13.0)
+    ax.set_aspect("equal", adjustable="datalim")
+    ax.set_title("track map: " + lap.trackobj.pars_track["trackname"])
+    ax.set_xlabel("x in m")
+    ax.set_ylabel("y in m")
+    ax.grid()
+    fig.colorbar(lines, ax=ax, label="velocity in km/h")
+
+    ax = fig.add_subplot(2, 2, 4)
+    ax.plot(dists, lap.es_cl / 1000.0, "k-")  # [J] -> [kJ]
+    ax.set_title("consumption")
+    ax.set_xlabel("distance in m")
+    ax.set_ylabel("energy in kJ")
+    ax.grid()
+
+    figures["overview"] = fig
+
+    # torques ----------------------------------------------------------------------------------------------------------
+    fig = Figure()
+    ax = fig.add_subplot(111)
+    _add_lines(ax, dists[:-1], [lap.m_eng, lap.m_e_motor, lap.m_eng + lap.m_e_motor, lap.m_requ],
+               ["combustion engine", "electric motor", "powertrain total", "requested"])
+    ax.set_title("Provided and requested (i.e. transmittable by the tires) torque")
+    ax.set_xlabel("distance s in m")
+    ax.set_ylabel("torque in Nm")
+    ax.grid()
+
+    figures["torques"] = fig
+
+    # tire loads -------------------------------------------------------------------------------------------------------
+    f_z_stat_avg = 0.25 * lap.driverobj.carobj.pars_general["m"] * lap.driverobj.carobj.pars_general["g"]
+
+    fig = Figure()
+    ax = fig.add_subplot(111)
+    _add_lines(ax, dists[:-1], lap.tire_loads.T, ["front left", "front right", "rear left", "rear right"])
+    ax.axhline(y=f_z_stat_avg, color="k", linestyle="--")             # avg. static tire load
+    ax.axhline(y=3.0 * f_z_stat_avg, color="k", linestyle="-.")       # 3 * avg. static tire load
+    ax.set_title("Tire loads (dashed: avg. static, dash-dotted: 3 * avg. static)")
+    ax.set_xlabel("distance s in m")
+    ax.set_ylabel("tire load F_z in N")
+    ax.grid()
+
+    figures["tire_loads"] = fig
+
+    # engine speed and gears -------------------------------------------------------------------------------------------
+    fig = Figure()
+    ax1, ax2 = fig.subplots(nrows=2, ncols=1, sharex=True)
+    fig.suptitle("Engine speed and gear selection")
+
+    ax1.plot(dists, lap.n_cl * 60.0)
+    ax1.set_ylabel("engine speed in 1/min")
+    ax1.grid()
+
+    ax2.step(dists, lap.gear_cl, where="post")
+    ax2.set_xlabel("distance s in m")
+    ax2.set_ylabel("gear in -")
+    ax2.grid()
+
+    figures["gears"] = fig
+
+    # write files ------------------------------------------------------------------------------------------------------
+    file_names = []
+
+    for name, fig in figures.items():
+        FigureCanvasAgg(fig)
+        fig.tight_layout()
+
+        for image_format in formats:
+            file_name = "%s-%s.%s" % (file_name_prefix, name, image_format)
+            fig.savefig(file_name, format=image_format)
+            file_names.append(file_name)
+
+    return file_names
+
+
+def _init_worker(track, solver_opts, driver_opts, debug_opts, race_car_model):
+    """Initializer of a worker process (or of the main process if the reports are rendered serially),
+    creates the driver and lap objects of the worker"""
+
+    global _worker_lap
+
+    car = laptimesim.src.car_electric.CarElectric(pars=race_car_model.get_car_parameters_for_laptimesim())
+
+    driver = laptimesim.src.driver.Driver(carobj=car,
+                                          pars_driver=driver_opts,
+                                          trackobj=track,
+                                          stepsize=track.stepsize)
+
+    _worker_lap = laptimesim.src.lap.Lap(driverobj=driver,
+                                         trackobj=track,
+                                         pars_solver=solver_opts,
+                                         debug_opts=debug_opts)
+
+
+def _render_worker_iteration(iteration, race_car_model, output_path, formats):
+    """Task executed in a worker process, simulates the lap of an iteration with the lap object of the
+    worker and renders its report"""
+
+    _worker_lap.driverobj.carobj = laptimesim.src.car_electric.CarElectric(
+        pars=race_car_model.get_car_parameters_for_laptimesim())
+    _worker_lap.simulate_lap()
+
+    file_names = render_lap_report(lap=_worker_lap,
+                                   file_name_prefix=os.path.join(output_path, "iteration_%i" % iteration),
+                                   formats=formats)
+
+    _worker_lap.reset_lap()
+
+    return iteration, file_names
+
+
+def create_reports(track, solver_opts, driver_opts, debug_opts, datastore, iterations, output_path, formats,
+                   no_workers=1):
+    """Simulate the laps of the selected iterations of the sensitivity analysis again and render their
+    reports (see render_lap_report), the iterations are distributed on a pool of worker processes.
+
+    Inputs:
+        - track (laptimesim.src.track.Track): track object used for all iterations
+        - solver_opts (dict): solver options from sim_config.toml
+        - driver_opts (dict): driver options from sim_config.toml
+        - debug_opts (dict): debug options from sim_config.toml
+        - datastore (DataStore): datastore of the sensitivity analysis, the race car models of the
+        iterations are generated by it again
+        - iterations (list): iteration numbers, e.g. from select_iterations
+        - output_path (str): directory of the image files
+        - formats (list): image formats (see REPORT_FORMATS)
+        - no_workers (int): number of worker processes, 1 -> render in the main process
+
+    Outputs:
+        - file_names (dict): key is the iteration number, value is the list of paths of its image files
+
+    Raises:
+        - IOError if an iteration is not part of the sensitivity analysis or an image format is unknown
+    """
+
+    # iterations that are out of rule spec have no results and are therefore not selected
+    race_car_models = {int(i): datastore.get_race_car_model(int(i)) for i in iterations}
+    race_car_models = {i: race_car_model for i, race_car_model in race_car_models.items()
+                       if race_car_model is not None}
+
+    if not race_car_models:
+        return {}
+
+    os.makedirs(output_path, exist_ok=True)
+
+    initargs = (track, solver_opts, driver_opts, debug_opts, next(iter(race_car_models.values())))
+    file_names = {}
+
+    if no_workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=no_workers,
+                                                    initializer=_init_worker,
+                                                    initargs=initargs) as executor:
+            futures = [executor.submit(_render_worker_iteration, i, race_car_model, output_path, formats)
+                       for i, race_car_model in race_car_models.items()]
+
+            for future in concurrent.futures.as_completed(futures):
+                iteration, file_names[iteration] = future.result()
+    else:
+        _init_worker(*initargs)
+
+        for i, race_car_model in race_car_models.items():
+            iteration, file_names[iteration] = _render_worker_iteration(i, race_car_model, output_path, formats)
+
+    return file_names
@@ -0,0 +1,108 @@
+# cache of lap simulation results, different race car models often lead to identical
+# cars in the lap time simulation (e.g. pit time only affects the race simulation)
+import collections
+import hashlib
+import json
+import os
+import numpy as np
+
+# version of the lap results stored in the cache, must be increased whenever the solver changes its results (e.g. track
+# preparation, vehicle model or solver changes), such that cached laps of an older version are not used anymore
+_LAP_CACHE_VERSION = 2
+
+
+def _json_default(x):
+    # numpy arrays and scalars that are no python floats (e.g. np.int64)
+    if isinstance(x, np.ndarray):
+        return x.tolist()
+    elif isinstance(x, np.generic):
+        return x.item()
+
+    raise TypeError("Object of type {} cannot be part of a lap cache key!".format(type(x).__name__))
+
+
+class LapResultCache():
+    """Cache of lap times and lap energies keyed by the car parameters of the lap time simulation.
+
+    The results are kept in memory with least recently used eviction and can additionally be
+    stored on disk (one json file per lap) such that they are shared between worker processes
+    and simulation runs.
+    """
+
+    def __init__(self, max_size, context, cache_path=None):
+        """
+        Inputs:
+            - max_size (int): maximum number of lap results kept in memory
+            - context (dict): everything besides the car the lap results depend on, e.g. track,
+            solver and driver options
+            - cache_path (str): directory of the on-disk store, None -> memory only
+        """
+
+        self._max_size = max_size
+        self._cache_path = cache_path
+        self._results = collections.OrderedDict()
+        self._context_key = hashlib.sha1(self._dumps([_LAP_CACHE_VERSION, context]).encode()).hexdigest()
+
+        self.hits = 0
+        self.misses = 0
+
+        if self._cache_path is not None:
+            os.makedirs(self._cache_path, exist_ok=True)
+
+    @staticmethod
+    def _dumps(x):
+        # canonical representation, floats are written with their shortest exact representation
+        return json.dumps(x, sort_keys=True, default=_json_default)
+
+    def make_key(self, veh_pars):
+        """Key of the lap of a car, veh_pars is the output of RaceCarModel.get_car_parameters_for_laptimesim"""
+
+        return hashlib.sha1((self._context_key + self._dumps(veh_pars)).encode()).hexdigest()
+
+    def get(self, key):
+        """Get the lap time (s) and lap energy (J) of a lap, returns None if the lap is not cached"""
+
+        if key in self._results:
+            self._results.move_to_end(key)
+            self.hits += 1
+
+            return self._results[key]
+
+        if self._cache_path is not None:
+            try:
+                with open(os.path.join(self._cache_path, key + ".json"), "r") as fh:
+                    lap_result = json.load(fh)
+            except (OSError, ValueError):
+                pass
+            else:
+                self.hits += 1
+                lap_result = (lap_result["lap_time"], lap_result["lap_energy"])
+                self._add(key, lap_result)
+
+                return lap_result
+
+        self.misses += 1
+
+        return None
+
+    def put(self, key, lap_time, lap_energy):
+        """Add the lap time (s) and lap energy (J) of a lap"""
+
+        self._add(key, (float(lap_time), float(lap_energy)))
+
+        if self._cache_path is not None:
+            # write to a temporary file first such that other processes never read incomplete files
+            cache_file = os.path.join(self._cache_path, key + ".json")
+            cache_file_tmp = "%s.%i.tmp" % (cache_file, os.getpid())
+
+            with open(cache_file_tmp, "w") as fh:
+                json.dump({"lap_time": float(lap_time), "lap_energy": float(lap_energy)}, fh)
+
+            os.replace(cache_file_tmp, cache_file)
+
+    def _add(self, key, lap_result):
+        self._results[key] = lap_result
+        self._results.move_to_end(key)
+
+        while len(self._results) > self._max_size:
+            self._results.popitem(last=False)
@@ -1,4 +1,5 @@
 import laptimesim.src.lap
+import laptimesim.src.lap_batch
 import laptimesim.src.track
 import laptimesim.src.driver
 import laptimesim.src.car_hybrid
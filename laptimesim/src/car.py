@@ -1,6 +1,12 @@
 import numpy as np
 import math
-import matplotlib.pyplot as plt
+import bisect
+import hashlib
+import collections
+
+# cache of maximum cornering velocity profiles shared by all car objects of a process, see v_max_cornering_profile
+_V_MAX_CORNERING_CACHE = collections.OrderedDict()
+_V_MAX_CORNERING_CACHE_SIZE = 64
 
 
 class Car(object):
@@ -25,7 +31,11 @@ class Car(object):
                  "__pars_engine",
                  "__pars_gearbox",
                  "__pars_tires",
-                 "__f_z_calc_stat")
+                 "__f_z_calc_stat",
+                 "__f_z_calc_stat_vec",
+                 "__pars_tires_vec",
+                 "__tire_circ_ref",
+                 "__vel_shift")
 
     # ------------------------------------------------------------------------------------------------------------------
     # CONSTRUCTOR ------------------------------------------------------------------------------------------------------
@@ -77,6 +87,35 @@ class Car(object):
         self.f_z_calc_stat["aero"][2] = 0.5 * 0.5 * self.pars_general["c_z_a_r"] * self.pars_general["rho_air"]
         self.f_z_calc_stat["aero"][3] = 0.5 * 0.5 * self.pars_general["c_z_a_r"] * self.pars_general["rho_air"]
 
+        # contiguous arrays for the vectorized tire force potential calculation, columns are [FL, FR, RL, RR]
+        # rows: static load, longitudinal load transfer, lateral load transfer, aero downforce (the signs of the load
+        # transfers are already included such that all rows can be summed up)
+        self.f_z_calc_stat_vec = np.vstack((self.f_z_calc_stat["stat_load"],
+                                            self.f_z_calc_stat["trans_long"] * np.array([-1.0, -1.0, 1.0, 1.0]),
+                                            self.f_z_calc_stat["trans_lat"] * np.array([-1.0, 1.0, -1.0, 1.0]),
+                                            self.f_z_calc_stat["aero"]))
+
+        # rows: mux, muy, dmux_dfz, dmuy_dfz, fz_0
+        self.pars_tires_vec = np.array([[self.pars_tires[axle][par] for axle in ("f", "f", "r", "r")]
+                                        for par in ("mux", "muy", "dmux_dfz", "dmuy_dfz", "fz_0")])
+
+        # reference circumreference of the driven tire(s)
+        if self.pars_engine["topology"] == "FWD":
+            self.tire_circ_ref = self.pars_tires["f"]["circ_ref"]
+
+        elif self.pars_engine["topology"] == "RWD":
+            self.tire_circ_ref = self.pars_tires["r"]["circ_ref"]
+
+        elif self.pars_engine["topology"] == "AWD":
+            # use average circumreference in this case
+            self.tire_circ_ref = 0.5 * (self.pars_tires["f"]["circ_ref"] + self.pars_tires["r"]["circ_ref"])
+
+        else:
+            raise RuntimeError("Powertrain topology unknown!")
+
+        # gear selection table, see find_gear
+        self.vel_shift = self.__calc_vel_shift()
+
     # ------------------------------------------------------------------------------------------------------------------
     # GETTERS / SETTERS ------------------------------------------------------------------------------------------------
     # ------------------------------------------------------------------------------------------------------------------
@@ -105,6 +144,22 @@ class Car(object):
     def __set_f_z_calc_stat(self, x: dict) -> None: self.__f_z_calc_stat = x
     f_z_calc_stat = property(__get_f_z_calc_stat, __set_f_z_calc_stat)
 
+    def __get_f_z_calc_stat_vec(self) -> np.ndarray: return self.__f_z_calc_stat_vec
+    def __set_f_z_calc_stat_vec(self, x: np.ndarray) -> None: self.__f_z_calc_stat_vec = x
+    f_z_calc_stat_vec = property(__get_f_z_calc_stat_vec, __set_f_z_calc_stat_vec)
+
+    def __get_pars_tires_vec(self) -> np.ndarray: return self.__pars_tires_vec
+    def __set_pars_tires_vec(self, x: np.ndarray) -> None: self.__pars_tires_vec = x
+    pars_tires_vec = property(__get_pars_tires_vec, __set_pars_tires_vec)
+
+    def __get_tire_circ_ref(self) -> float: return self.__tire_circ_ref
+    def __set_tire_circ_ref(self, x: float) -> None: self.__tire_circ_ref = x
+    tire_circ_ref = property(__get_tire_circ_ref, __set_tire_circ_ref)
+
+    def __get_vel_shift(self) -> list: return self.__vel_shift
+    def __set_vel_shift(self, x: list) -> None: self.__vel_shift = x
+    vel_shift = property(__get_vel_shift, __set_vel_shift)
+
     # ------------------------------------------------------------------------------------------------------------------
     # METHODS (CALCULATIONS) -------------------------------------------------------------------------------------------
     # ------------------------------------------------------------------------------------------------------------------
@@ -190,7 +245,46 @@ class Car(object):
                 f_x_pot_rl, f_y_pot_rl, f_z_rl,
                 f_x_pot_rr, f_y_pot_rr, f_z_rr)
 
+    def tire_force_pots_vec(self,
+                            vel: float or np.ndarray,
+                            a_x: float or np.ndarray,
+                            a_y: float or np.ndarray,
+                            mu: float or np.ndarray) -> np.ndarray:
+        """
+        Vectorized version of tire_force_pots. The inputs can be scalars or arrays of equal length N (velocity in m/s,
+        accelerations in m/s^2). Output is an array of size N x 12 containing the columns in the same order as the
+        return tuple of tire_force_pots: [f_x_pot_fl, f_y_pot_fl, f_z_fl, f_x_pot_fr, ..., f_y_pot_rr, f_z_rr].
+        """
+
+        vel, a_x, a_y, mu = np.broadcast_arrays(np.atleast_1d(np.asarray(vel, dtype=float)),
+                                                np.atleast_1d(np.asarray(a_x, dtype=float)),
+                                                np.atleast_1d(np.asarray(a_y, dtype=float)),
+                                                np.atleast_1d(np.asarray(mu, dtype=float)))
+
+        # tire load calculation (N x 4): static load, longitudinal load transfer, lateral load transfer, aero downforce
+        f_z = (self.f_z_calc_stat_vec[0]
+               + a_x[:, None] * self.f_z_calc_stat_vec[1]
+               + a_y[:, None] * self.f_z_calc_stat_vec[2]
+               + np.square(vel)[:, None] * self.f_z_calc_stat_vec[3])
+
+        # limit tire loads (see tire_force_pots)
+        np.maximum(f_z, 30.0, out=f_z)
+
+        # tire force potentials (N x 4)
+        f_x_pot = mu[:, None] * (self.pars_tires_vec[0] + self.pars_tires_vec[2] * (f_z - self.pars_tires_vec[4])) * f_z
+        f_y_pot = mu[:, None] * (self.pars_tires_vec[1] + self.pars_tires_vec[3] * (f_z - self.pars_tires_vec[4])) * f_z
+
+        # interleave to the output order of tire_force_pots
+        tire_force_pots = np.empty((f_z.shape[0], 12))
+        tire_force_pots[:, 0::3] = f_x_pot
+        tire_force_pots[:, 1::3] = f_y_pot
+        tire_force_pots[:, 2::3] = f_z
+
+        return tire_force_pots
+
     def plot_tire_characteristics(self) -> None:
+        import matplotlib.pyplot as plt
+
         # calculate relevant data
         f_z_range = np.arange(500.0, 13000.0, 500.0)
 
@@ -220,22 +314,10 @@ class Car(object):
         plt.show()
 
     def __circumref_driven_tire(self, vel: float) -> float:
-        """Velocity input in m/s. Reference speed for the circumreference calculation is 60 km/h. Output is in m."""
-
-        if self.pars_engine["topology"] == "FWD":
-            tire_circ_ref = self.pars_tires["f"]["circ_ref"]
-
-        elif self.pars_engine["topology"] == "RWD":
-            tire_circ_ref = self.pars_tires["r"]["circ_ref"]
-
-        elif self.pars_engine["topology"] == "AWD":
-            # use average circumreference in this case
-            tire_circ_ref = 0.5 * (self.pars_tires["f"]["circ_ref"] + self.pars_tires["r"]["circ_ref"])
+        """Velocity input in m/s (also works for arrays). Reference speed for the circumreference calculation is
+        60 km/h. Output is in m."""
 
-        else:
-            raise RuntimeError("Powertrain topology unknown!")
-
-        return tire_circ_ref * (1 + (vel * 3.6 - 60.0) * (0.045 / 200.0))
+        return self.tire_circ_ref * (1 + (vel * 3.6 - 60.0) * (0.045 / 200.0))
 
     def r_driven_tire(self, vel: float) -> float:
         """Velocity input in m/s. Output is in m."""
@@ -347,6 +429,106 @@ class Car(object):
 
         return vel_range[ind_mid] - vel_subtr_corner
 
+    def v_max_cornering_profile(self, kappa: np.ndarray, mu: np.ndarray, vel_subtr_corner: float = 0.5) -> np.ndarray:
+        """
+        Vectorized version of v_max_cornering for all points of a track, curvature input in rad/m, vel_subtr_corner in
+        m/s. The binary search is executed for all points at once and gives exactly the same results as calling
+        v_max_cornering for every point. Profiles are cached based on the parameters influencing the cornering velocity
+        (tire, aero and mass parameters, topology) as well as kappa and mu, i.e. cars that only differ in other
+        parameters (e.g. the powertrain) reuse the profile.
+        """
+
+        kappa = np.asarray(kappa, dtype=float)
+        mu = np.broadcast_to(np.asarray(mu, dtype=float), kappa.shape)
+
+        # check cache
+        key = self.__v_max_cornering_key(kappa=kappa, mu=mu, vel_subtr_corner=vel_subtr_corner)
+
+        if key in _V_MAX_CORNERING_CACHE:
+            _V_MAX_CORNERING_CACHE.move_to_end(key)
+            return _V_MAX_CORNERING_CACHE[key].copy()
+
+        # user input (see v_max_cornering)
+        no_steps = 546          # [-] number of steps is currently chosen such that the stepsize is 0.2 m/s
+        vel_max = 110.0         # [m/s] cover speed range up to 400 km/h
+
+        # create velocity array
+        vel_range = np.linspace(1.0, vel_max, no_steps)
+
+        # binary search for maximum velocity (executed for all points that did not converge so far)
+        ind_first = np.zeros(kappa.size, dtype=int)
+        ind_last = np.full(kappa.size, vel_range.size - 1)
+        ind_mid = (ind_first + ind_last + 1) // 2
+
+        active = ind_first != ind_last
+
+        while np.any(active):
+            inds = np.flatnonzero(active)
+            vel = vel_range[ind_mid[inds]]
+
+            # calculate currently acting lateral acceleration and forces
+            a_y = np.square(vel) * kappa[inds]
+            f_y_f, f_y_r = self.calc_lat_forces(a_y=a_y)
+
+            # calculate tire force potentials (using a_x = 0.0 at maximum cornering)
+            tire_force_pots = self.tire_force_pots_vec(vel=vel, a_x=0.0, a_y=a_y, mu=mu[inds])
+
+            # check if potential is left overall and if f_x_poss is enough to overcome drag and rolling resistances
+            potential_left = np.logical_and(np.abs(f_y_f) < tire_force_pots[:, 1] + tire_force_pots[:, 4],
+                                            np.abs(f_y_r) < tire_force_pots[:, 7] + tire_force_pots[:, 10])
+
+            if np.any(potential_left):
+                f_x_poss = self.calc_f_x_pot_vec(tire_force_pots=tire_force_pots[potential_left],
+                                                 f_y_f=f_y_f[potential_left],
+                                                 f_y_r=f_y_r[potential_left],
+                                                 force_use_all_wheels=False,
+                                                 limit_braking_weak_side=None)
+
+                f_x_drag = (0.5 * self.pars_general["c_w_a"] * self.pars_general["rho_air"]
+                            * np.square(vel[potential_left])
+                            + self.roll_res(f_z_tot=tire_force_pots[potential_left, 2]
+                                            + tire_force_pots[potential_left, 5]
+                                            + tire_force_pots[potential_left, 8]
+                                            + tire_force_pots[potential_left, 11]))
+
+                potential_left[potential_left] = f_x_poss >= f_x_drag
+
+            # set indices of velocity array accordingly
+            ind_first[inds[potential_left]] = ind_mid[inds[potential_left]]
+            ind_last[inds[~potential_left]] = ind_mid[inds[~potential_left]] - 1
+
+            # update middle index
+            ind_mid[inds] = (ind_first[inds] + ind_last[inds] + 1) // 2
+            active[inds] = ind_first[inds] != ind_last[inds]
+
+        vel_max_cornering = vel_range[ind_mid] - vel_subtr_corner
+
+        # save profile in the cache
+        _V_MAX_CORNERING_CACHE[key] = vel_max_cornering.copy()
+
+        if len(_V_MAX_CORNERING_CACHE) > _V_MAX_CORNERING_CACHE_SIZE:
+            _V_MAX_CORNERING_CACHE.popitem(last=False)
+
+        return vel_max_cornering
+
+    def __v_max_cornering_key(self, kappa: np.ndarray, mu: np.ndarray, vel_subtr_corner: float) -> str:
+        """Hash of all parameters and inputs that influence the maximum cornering velocity profile."""
+
+        pars_general = tuple(float(self.pars_general[par]) for par in ("lf", "lr", "h_cog", "sf", "sr", "m", "f_roll",
+                                                                       "c_w_a", "c_z_a_f", "c_z_a_r", "g", "rho_air"))
+        pars_tires = tuple((axle, tuple(sorted(self.pars_tires[axle].items()))) for axle in ("f", "r"))
+
+        hasher = hashlib.sha1()
+        hasher.update(repr((pars_general,
+                            pars_tires,
+                            float(self.pars_tires["tire_model_exp"]),
+                            self.pars_engine["topology"],
+                            float(vel_subtr_corner))).encode())
+        hasher.update(np.ascontiguousarray(kappa).tobytes())
+        hasher.update(np.ascontiguousarray(mu).tobytes())
+
+        return hasher.hexdigest()
+
     def calc_f_x_pot(self,
                      f_x_pot_fl: float,
                      f_x_pot_fr: float,
@@ -410,6 +592,49 @@ class Car(object):
 
         return f_x_poss_f + f_x_poss_r
 
+    def calc_f_x_pot_vec(self,
+                         tire_force_pots: np.ndarray,
+                         f_y_f: np.ndarray,
+                         f_y_r: np.ndarray,
+                         force_use_all_wheels: bool = False,
+                         limit_braking_weak_side: None or str = None) -> np.ndarray:
+        """Vectorized version of calc_f_x_pot. tire_force_pots is the N x 12 array returned by tire_force_pots_vec,
+        f_y_f and f_y_r are arrays of size N. All forces in N."""
+
+        exp_tmp = self.pars_tires["tire_model_exp"]
+
+        # determine axle potentials
+        if limit_braking_weak_side is None:
+            f_x_pot_f = tire_force_pots[:, 0] + tire_force_pots[:, 3]
+            f_x_pot_r = tire_force_pots[:, 6] + tire_force_pots[:, 9]
+        elif limit_braking_weak_side == 'FA':
+            f_x_pot_f = 2 * np.minimum(tire_force_pots[:, 0], tire_force_pots[:, 3])
+            f_x_pot_r = tire_force_pots[:, 6] + tire_force_pots[:, 9]
+        elif limit_braking_weak_side == 'RA':
+            f_x_pot_f = tire_force_pots[:, 0] + tire_force_pots[:, 3]
+            f_x_pot_r = 2 * np.minimum(tire_force_pots[:, 6], tire_force_pots[:, 9])
+        elif limit_braking_weak_side == 'all':
+            f_x_pot_f = 2 * np.minimum(tire_force_pots[:, 0], tire_force_pots[:, 3])
+            f_x_pot_r = 2 * np.minimum(tire_force_pots[:, 6], tire_force_pots[:, 9])
+        else:
+            raise RuntimeError("Unknown option %s!" % limit_braking_weak_side)
+
+        # calculate radicands of the tire model and check if below zero (absolute values of lateral forces required)
+        radicand_f = np.maximum(1 - np.power(np.abs(f_y_f) / (tire_force_pots[:, 1] + tire_force_pots[:, 4]),
+                                             exp_tmp), 0.0)
+        radicand_r = np.maximum(1 - np.power(np.abs(f_y_r) / (tire_force_pots[:, 7] + tire_force_pots[:, 10]),
+                                             exp_tmp), 0.0)
+
+        # calculate remaining force potential
+        if self.pars_engine["topology"] == "AWD" or force_use_all_wheels:
+            return f_x_pot_f * np.power(radicand_f, 1.0 / exp_tmp) + f_x_pot_r * np.power(radicand_r, 1.0 / exp_tmp)
+        elif self.pars_engine["topology"] == "FWD":
+            return f_x_pot_f * np.power(radicand_f, 1.0 / exp_tmp)
+        elif self.pars_engine["topology"] == "RWD":
+            return f_x_pot_r * np.power(radicand_r, 1.0 / exp_tmp)
+        else:
+            raise RuntimeError("Powertrain topology unknown!")
+
     def calc_max_ax(self, vel: float, a_y: float, mu: float, f_y_f: float, f_y_r: float) -> float:
         """Calculate maximum longitudinal acceleration at which the car stays on the track. vel in m/s, a_y in m/s^2,
         f_y_f and f_y_r in N. Using binary search technique to decrease calculation time."""
@@ -449,24 +674,142 @@ class Car(object):
 
         return a_x_range[ind_mid]
 
+    def calc_max_ax_analytic(self, vel: float, a_y: float, mu: float, f_y_f: float, f_y_r: float,
+                             tol: float = 0.25) -> float:
+        """Calculate maximum longitudinal acceleration at which the car stays on the track (see calc_max_ax). vel in
+        m/s, a_y in m/s^2, f_y_f and f_y_r in N. The lateral force potential of an axle is a quadratic function of a_x
+        (linear load transfer, tire model quadratic in the tire load). Therefore, the limit is determined from the
+        roots of these polynomials and floored to a multiple of tol. tol = 0.25 m/s^2 corresponds to the resolution of
+        the binary search in calc_max_ax. Falls back to the binary search if the tire load limitation becomes active
+        or the result does not fulfill the lateral force condition."""
+
+        # user input (see calc_max_ax)
+        a_x_max = 25.0  # [m/s^2]
+
+        # plain floats are much faster than numpy scalars in the following scalar calculations
+        vel_sq = float(vel) * float(vel)
+        a_y = float(a_y)
+        mu = float(mu)
+        f_z_calc_stat = self.f_z_calc_stat_vec.tolist()
+
+        a_x_lim = [a_x_max, a_x_max]
+        f_z_lin = []  # tire loads f_z = c + s * a_x as tuples (c, s)
+
+        # determine the a_x limit for both axles, wheels [FL, FR] and [RL, RR]
+        for axle, f_y, inds in (("f", f_y_f, (0, 1)), ("r", f_y_r, (2, 3))):
+            muy = self.pars_tires[axle]["muy"]
+            dmuy_dfz = self.pars_tires[axle]["dmuy_dfz"]
+            p = muy - dmuy_dfz * self.pars_tires[axle]["fz_0"]
+
+            # coefficients of the axle potential q2 * a_x^2 + q1 * a_x + q0 (tire load f_z = c + s * a_x)
+            q2 = 0.0
+            q1 = 0.0
+            q0 = 0.0
+
+            for ind in inds:
+                c = f_z_calc_stat[0][ind] + a_y * f_z_calc_stat[2][ind] + vel_sq * f_z_calc_stat[3][ind]
+                s = f_z_calc_stat[1][ind]
+
+                f_z_lin.append((c, s))
+
+                q2 += mu * dmuy_dfz * s * s
+                q1 += mu * (p * s + 2.0 * dmuy_dfz * c * s)
+                q0 += mu * (p * c + dmuy_dfz * c * c)
+
+            # smallest positive root of q2 * a_x^2 + q1 * a_x + q0 - |f_y| = 0
+            q0 -= math.fabs(f_y)
+
+            if q2 == 0.0:
+                roots = [-q0 / q1] if q1 != 0.0 else []
+            else:
+                discriminant = q1 * q1 - 4.0 * q2 * q0
+
+                if discriminant < 0.0:
+                    roots = []
+                else:
+                    roots = [(-q1 - math.sqrt(discriminant)) / (2.0 * q2),
+                             (-q1 + math.sqrt(discriminant)) / (2.0 * q2)]
+
+            roots = [root for root in roots if root > 0.0]
+
+            if roots:
+                a_x_lim[inds[0] // 2] = min(min(roots), a_x_max)
+
+        # floor to the desired resolution
+        a_x = math.floor(min(a_x_lim) / tol) * tol
+
+        # tire load limitation (see tire_force_pots) is not covered by the polynomials
+        if any(c < 30.0 or c + s * a_x < 30.0 for c, s in f_z_lin):
+            return self.calc_max_ax(vel=vel, a_y=a_y, mu=mu, f_y_f=f_y_f, f_y_r=f_y_r)
+
+        # check result (covers the case that the potential is already exceeded at a_x = 0.0)
+        _, f_y_pot_fl, _, \
+            _, f_y_pot_fr, _, \
+            _, f_y_pot_rl, _, \
+            _, f_y_pot_rr, _ = self.tire_force_pots(vel=vel,
+                                                    a_x=a_x,
+                                                    a_y=a_y,
+                                                    mu=mu)
+
+        if math.fabs(f_y_f) <= f_y_pot_fl + f_y_pot_fr and math.fabs(f_y_r) <= f_y_pot_rl + f_y_pot_rr:
+            return a_x
+        else:
+            return self.calc_max_ax(vel=vel, a_y=a_y, mu=mu, f_y_f=f_y_f, f_y_r=f_y_r)
+
+    def __calc_vel_shift(self) -> list:
+        """Calculate the gear selection table used by find_gear. The engine revs of a gear rise monotonically with
+        the velocity, i.e. a gear is below its shift revs for all velocities below its shift velocity. The first gear
+        below its shift revs (i.e. the gear selected by the shift strategy) is therefore the first gear whose shift
+        velocity is above the current velocity. The shift velocities are made cumulative maxima such that they can be
+        searched and are adjusted to the floating point values at which the engine revs calculation reaches the shift
+        revs, i.e. the table reproduces the gear selection exactly. Output is in m/s."""
+
+        k_circ = 0.045 / 200.0
+        vel_shift = []
+
+        for i_trans, n_shift in zip(self.pars_gearbox["i_trans"], self.pars_gearbox["n_shift"]):
+            i_trans = float(i_trans)
+            n_shift = float(n_shift)
+
+            def below_shift_revs(vel: float) -> bool:
+                return vel / (self.__circumref_driven_tire(vel=vel) * i_trans) < n_shift
+
+            # analytical solution of vel / (circumref(vel) * i_trans) = n_shift
+            tmp = n_shift * i_trans * self.tire_circ_ref
+            denom = 1.0 - tmp * 3.6 * k_circ
+
+            if denom <= 0.0 or not math.isfinite(tmp):
+                vel_gear = math.inf  # shift revs are never reached
+            else:
+                vel_gear = max(tmp * (1.0 - 60.0 * k_circ) / denom, 0.0)
+
+                # smallest velocity that is not below the shift revs
+                while below_shift_revs(vel_gear):
+                    vel_gear = math.nextafter(vel_gear, math.inf)
+
+                while vel_gear > 0.0 and not below_shift_revs(math.nextafter(vel_gear, -math.inf)):
+                    vel_gear = math.nextafter(vel_gear, -math.inf)
+
+            vel_shift.append(float(max(vel_gear, vel_shift[-1])) if vel_shift else float(vel_gear))
+
+        return vel_shift
+
     def find_gear(self, vel: float) -> tuple:
         """Velocity input in m/s. Output is the gear used for that velocity (zero based) as well as the corresponding
         engine rev in 1/s."""
 
-        # calculate theoretical engine revs for all the gears
-        n_gears = vel / (self.__circumref_driven_tire(vel=vel) * self.pars_gearbox["i_trans"])  # [1/s]
+        # find largest gear below shift revs, if max rev in final gear is reached do not shift up
+        gear_ind = min(bisect.bisect_right(self.vel_shift, vel), len(self.vel_shift) - 1)
 
-        # find largest gear below shift revs
-        shift_bool = n_gears < self.pars_gearbox["n_shift"]
+        return gear_ind, vel / (self.__circumref_driven_tire(vel=vel) * self.pars_gearbox["i_trans"][gear_ind])
 
-        if np.all(~shift_bool):
-            # if max rev in final gear is reached do not shift up
-            gear_ind = self.pars_gearbox["n_shift"].size - 1  # -1 due to zero based indexing
-        else:
-            # find first True value (zero based indexing of gears)
-            gear_ind = int(np.argmax(shift_bool))
+    def find_gear_profile(self, vel: np.ndarray) -> tuple:
+        """Vectorized version of find_gear for a whole velocity profile. Velocity input in m/s. Output is an array of
+        the gears used (zero based) as well as an array of the corresponding engine revs in 1/s."""
+
+        gear_inds = np.minimum(np.searchsorted(self.vel_shift, vel, side="right"), len(self.vel_shift) - 1)
 
-        return gear_ind, n_gears[gear_ind]
+        return gear_inds, vel / (self.__circumref_driven_tire(vel=vel) * self.pars_gearbox["i_trans"][gear_inds])
 
     def calc_m_requ(self, f_x: float, vel: float) -> float:
         """Function to calculate required powertrain torque to reach a specific longitudinal acceleration force f_x at
@@ -103,6 +103,17 @@ class CarElectric(Car):
         # first return is engine motor torque, which is 0 (b/c no combustion engine, its electric)
         return 0.0, m_e_motor
 
+    def calc_torque_e_motor_boost(self, n: np.ndarray, m_requ: np.ndarray, throttle_pos: np.ndarray,
+                                  **kwargs) -> np.ndarray:
+        """n in 1/s, torque_req in Nm. Vectorized version of calc_torque_distr for boosted points with sufficient ES
+        charge state. Function returns the torques delivered by the e motor in Nm."""
+
+        # get torque potential of e motor
+        e_motor_torque_max = np.minimum(self.pars_engine["pow_e_motor"] * self.pars_engine["eta_e_motor"]
+                                        / (2 * math.pi * n), self.pars_engine["torque_e_motor_max"])
+
+        return throttle_pos * np.where(m_requ <= e_motor_torque_max, m_requ, e_motor_torque_max)
+
     def calc_torque_distr_f_x(self, f_x: float, n: float, throttle_pos: float, es: float, vel: float,
                               **kwargs) -> tuple:
         """n in 1/s, torque_req in Nm, es in J. Function returns torques delivered by engine and e motor in
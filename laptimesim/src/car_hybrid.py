@@ -1,6 +1,5 @@
 import numpy as np
 import math
-import matplotlib.pyplot as plt
 import json
 from laptimesim.src.car import Car
 import configparser
@@ -110,6 +109,8 @@ class CarHybrid(Car):
         return p_eng
 
     def plot_power_engine(self) -> None:
+        import matplotlib.pyplot as plt
+
         # plot
         n_range = np.arange(7000.0, 15100.0, 100.0) / 60.0  # [1/s]
 
@@ -124,7 +125,7 @@ class CarHybrid(Car):
     def torque(self, n: float) -> float:
         """Rev input in 1/s. Output is the maximum torque in Nm."""
 
-        return float(self.__power_engine(n=n)) / (2 * math.pi * n)
+        return self.__power_engine(n=n).item() / (2 * math.pi * n)
 
     def torque_e_motor(self, n: float) -> float:
         """Rev input in 1/s. Output is the maximum torque in Nm."""
@@ -207,6 +208,22 @@ class CarHybrid(Car):
 
         return m_eng, m_e_motor
 
+    def calc_torque_e_motor_boost(self, n: np.ndarray, m_requ: np.ndarray, throttle_pos: np.ndarray,
+                                  vel: np.ndarray) -> np.ndarray:
+        """n in 1/s, torque_req in Nm. Vectorized version of calc_torque_distr for boosted points with sufficient ES
+        charge state. Function returns the torques delivered by the e motor in Nm."""
+
+        # get torque potential of engine and e motor
+        eng_torque_max = self.__power_engine(n=n) / (2 * math.pi * n)
+        e_motor_torque_max = np.minimum(self.pars_engine["pow_e_motor"] / (2 * math.pi * n),
+                                        self.pars_engine["torque_e_motor_max"])
+
+        # ICE only -> 0.0, ICE + e motor (partly) -> difference, ICE + e motor (fully) -> e motor potential
+        m_e_motor = throttle_pos * np.clip(m_requ - eng_torque_max, 0.0, e_motor_torque_max)
+        m_e_motor[vel < self.pars_engine["vel_min_e_motor"]] = 0.0
+
+        return m_e_motor
+
     def calc_torque_distr_f_x(self, f_x: float, n: float, throttle_pos: float, es: float,
                               em_boost_use: bool, vel: float) -> tuple:
         """n in 1/s, torque_req in Nm, es in J. Function returns torques delivered by engine and e motor in
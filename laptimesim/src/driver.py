@@ -1,5 +1,4 @@
 import numpy as np
-import math
 from laptimesim.src.car_hybrid import CarHybrid
 from laptimesim.src.car_electric import CarElectric
 from laptimesim.src.track import Track
@@ -158,49 +157,31 @@ class Driver(object):
             print("WARNING: ES charge state already negative when entering EM strategy calculation!")
 
         # find indices of brake points
-        inds_brake = np.squeeze(np.argwhere(np.diff(vel_cl) < 0.0))
+        inds_brake = np.flatnonzero(np.diff(vel_cl) < 0.0)
 
-        # calculate time until next brake point for every point (0.0 for brake points themself)
+        # calculate time until next brake point for every point (0.0 for brake points themself), points behind the
+        # last brake point use the first brake point of the next lap
         no_points = t_cl.size - 1  # - 1 to get number of points for unclosed lap
-        t_until_brake = np.zeros(no_points)
+        inds_next_brake = np.searchsorted(inds_brake, np.arange(no_points))
+        next_lap = inds_next_brake == inds_brake.size
+        inds_next_brake[next_lap] = 0
 
-        for i in range(no_points):
-            if i <= inds_brake[-1]:
-                ind_brake_rel = inds_brake[np.searchsorted(inds_brake, i)]
-                t_until_brake[i] = t_cl[ind_brake_rel] - t_cl[i]
-            else:
-                ind_brake_rel = inds_brake[0]
-                t_until_brake[i] = t_cl[-1] - t_cl[i] + t_cl[ind_brake_rel]
+        t_until_brake = t_cl[inds_brake[inds_next_brake]] - t_cl[:-1]
+        t_until_brake[next_lap] = t_cl[-1] - t_cl[:-1][next_lap] + t_cl[inds_brake[0]]
 
         # sort t_until_brake and get indices (minus sign to sort in a descending order)
-        inds_sorted = list(np.argsort(-t_until_brake))
-
-        while es_final > 0.0 and len(inds_sorted) > 0:
-            # get current index and remove it from indices list
-            ind_cur = inds_sorted.pop(0)
-
-            # check if a brake point would be used (case when too much energy available) -> if so break
-            if math.isclose(t_until_brake[ind_cur], 0.0):
-                self.em_boost_use = np.full(no_points, True)
-                break
-
-            # apply boost if boost was not applied here so far
-            if not self.em_boost_use[ind_cur]:
-                # apply boost here
-                self.em_boost_use[ind_cur] = True
-
-                # calculate torque distribution within the hybrid system
-                m_e_motor = self.carobj.calc_torque_distr(n=n_cl[ind_cur],
-                                                          m_requ=m_requ[ind_cur],
-                                                          throttle_pos=self.throttle_pos[ind_cur],
-                                                          es=np.inf,
-                                                          em_boost_use=True,
-                                                          vel=vel_cl[ind_cur])[1]
-
-                # update energy store status (approximation because velocity profile is influenced obviously)
-                es_final -= (self.carobj.power_demand_e_motor_drive(n=n_cl[ind_cur],
-                                                                    m_e_motor=np.array(m_e_motor))
-                             * (t_cl[ind_cur + 1] - t_cl[ind_cur]))
+        inds_boost = self.__select_boost_points(inds_sorted=np.argsort(-t_until_brake),
+                                                t_cl=t_cl,
+                                                vel_cl=vel_cl,
+                                                n_cl=n_cl,
+                                                m_requ=m_requ,
+                                                es_final=es_final)
+
+        # check if a brake point would be used (case when too much energy available) -> if so use boost everywhere
+        if np.any(t_until_brake[inds_boost] == 0.0):
+            self.em_boost_use = np.full(no_points, True)
+        else:
+            self.em_boost_use[inds_boost] = True
 
     def __strategy_ls(self, t_cl: np.ndarray, vel_cl: np.ndarray, n_cl: np.ndarray, m_requ: np.ndarray,
                       es_final: float):
@@ -213,29 +194,35 @@ class Driver(object):
             print("WARNING: ES charge state already negative when entering EM strategy calculation!")
 
         # sort vel and get indices
-        inds_sorted = list(np.argsort(vel_cl[:-1]))
-
-        while es_final > 0.0 and len(inds_sorted) > 0:
-            # get current index and remove it from indices list
-            ind_cur = inds_sorted.pop(0)
-
-            # apply boost if boost was not applied here so far
-            if not self.em_boost_use[ind_cur]:
-                # apply boost here
-                self.em_boost_use[ind_cur] = True
-
-                # calculate torque distribution within the hybrid system
-                m_e_motor = self.carobj.calc_torque_distr(n=n_cl[ind_cur],
-                                                          m_requ=m_requ[ind_cur],
-                                                          throttle_pos=self.throttle_pos[ind_cur],
-                                                          es=np.inf,
-                                                          em_boost_use=True,
-                                                          vel=vel_cl[ind_cur])[1]
-
-                # update energy store status (approximation because velocity profile is influenced obviously)
-                es_final -= (self.carobj.power_demand_e_motor_drive(n=n_cl[ind_cur],
-                                                                    m_e_motor=np.array(m_e_motor))
-                             * (t_cl[ind_cur + 1] - t_cl[ind_cur]))
+        inds_boost = self.__select_boost_points(inds_sorted=np.argsort(vel_cl[:-1]),
+                                                t_cl=t_cl,
+                                                vel_cl=vel_cl,
+                                                n_cl=n_cl,
+                                                m_requ=m_requ,
+                                                es_final=es_final)
+
+        self.em_boost_use[inds_boost] = True
+
+    def __select_boost_points(self, inds_sorted: np.ndarray, t_cl: np.ndarray, vel_cl: np.ndarray, n_cl: np.ndarray,
+                              m_requ: np.ndarray, es_final: float) -> np.ndarray:
+        """Boost is applied in the order of inds_sorted as long as the ES is not empty. Returns the indices of the
+        points that get boost (including the ones that got boost before)."""
+
+        # calculate energy required to boost at every point (0.0 where boost was applied so far), this is an
+        # approximation because velocity profile is influenced obviously
+        m_e_motor = self.carobj.calc_torque_e_motor_boost(n=n_cl[:-1],
+                                                          m_requ=m_requ,
+                                                          throttle_pos=self.throttle_pos,
+                                                          vel=vel_cl[:-1])
+        e_boost = self.carobj.power_demand_e_motor_drive(n=n_cl[:-1], m_e_motor=m_e_motor) * np.diff(t_cl)
+        e_boost[self.em_boost_use] = 0.0
+
+        # a point gets boost if the ES is not empty before it
+        es_before = es_final - np.concatenate(([0.0], np.cumsum(e_boost[inds_sorted])[:-1]))
+        es_left = es_before > 0.0
+        no_boost_points = inds_sorted.size if np.all(es_left) else np.argmin(es_left)
+
+        return inds_sorted[:no_boost_points]
 
     def __lift_coast(self, vel_cl: np.ndarray, n_lac: int):
         """Velocity input in m/s, n_lac is the number of points without throttle in front of a brake point."""
@@ -0,0 +1,553 @@
+import numpy as np
+import math
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+"""
+author:
+E-lemons team (based on the FB+ solver in lap.py by Alexander Heilmeier)
+
+.. description::
+The file provides a compiled version of the forward-backward solver (Lap.__fbplus) for electric cars. The solver
+operates on flat arrays of car parameters and track profiles only, such that it can be compiled with Numba. If Numba is
+not installed, the solver is still usable as plain Python function (which is slower than the object oriented solver in
+lap.py). The maximum cornering velocity profile is calculated beforehand (see Car.v_max_cornering_profile) and the
+maximum longitudinal acceleration is always determined using the binary search (see Car.calc_max_ax).
+"""
+
+# indices of the parameters in the flat car parameter array, see pack_car_pars
+M = 0
+G = 1
+LF = 2
+LR = 3
+F_ROLL = 4
+C_W_A = 5
+RHO_AIR = 6
+DRS_FACTOR = 7
+ETA_G = 8
+POW_E_MOTOR = 9
+ETA_E_MOTOR = 10
+ETA_E_MOTOR_RE = 11
+TORQUE_E_MOTOR_MAX = 12
+TIRE_CIRC_REF = 13
+TIRE_MODEL_EXP = 14
+TOPOLOGY = 15
+NO_CAR_PARS = 16
+
+# topology codes
+TOPOLOGY_CODES = {"FWD": 0, "RWD": 1, "AWD": 2}
+
+# codes of limit_braking_weak_side
+LIMIT_BRAKING_CODES = {None: 0, "FA": 1, "RA": 2, "all": 3}
+
+NUMBA_AVAILABLE = numba is not None
+
+
+def pack_car_pars(carobj) -> np.ndarray:
+    """Pack the parameters of an electric car object into a flat array (see index definitions above)."""
+
+    if carobj.pars_engine["topology"] == "FWD":
+        tire_circ_ref = carobj.pars_tires["f"]["circ_ref"]
+    elif carobj.pars_engine["topology"] == "RWD":
+        tire_circ_ref = carobj.pars_tires["r"]["circ_ref"]
+    elif carobj.pars_engine["topology"] == "AWD":
+        tire_circ_ref = 0.5 * (carobj.pars_tires["f"]["circ_ref"] + carobj.pars_tires["r"]["circ_ref"])
+    else:
+        raise RuntimeError("Powertrain topology unknown!")
+
+    car_pars = np.zeros(NO_CAR_PARS)
+    car_pars[M] = carobj.pars_general["m"]
+    car_pars[G] = carobj.pars_general["g"]
+    car_pars[LF] = carobj.pars_general["lf"]
+    car_pars[LR] = carobj.pars_general["lr"]
+    car_pars[F_ROLL] = carobj.pars_general["f_roll"]
+    car_pars[C_W_A] = carobj.pars_general["c_w_a"]
+    car_pars[RHO_AIR] = carobj.pars_general["rho_air"]
+    car_pars[DRS_FACTOR] = carobj.pars_general["drs_factor"]
+    car_pars[ETA_G] = carobj.pars_gearbox["eta_g"]
+    car_pars[POW_E_MOTOR] = carobj.pars_engine["pow_e_motor"]
+    car_pars[ETA_E_MOTOR] = carobj.pars_engine["eta_e_motor"]
+    car_pars[ETA_E_MOTOR_RE] = carobj.pars_engine["eta_e_motor_re"]
+    car_pars[TORQUE_E_MOTOR_MAX] = carobj.pars_engine["torque_e_motor_max"]
+    car_pars[TIRE_CIRC_REF] = tire_circ_ref
+    car_pars[TIRE_MODEL_EXP] = carobj.pars_tires["tire_model_exp"]
+    car_pars[TOPOLOGY] = TOPOLOGY_CODES[carobj.pars_engine["topology"]]
+
+    return car_pars
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# CAR FUNCTIONS --------------------------------------------------------------------------------------------------------
+# ----------------------------------------------------------------------------------------------------------------------
+
+def tire_force_pots(car_pars, f_z_calc_stat, pars_tires, vel, a_x, a_y, mu, out):
+    """See Car.tire_force_pots, out is an array of size 12 that is filled in the same order as the returned tuple.
+    f_z_calc_stat and pars_tires are the arrays Car.f_z_calc_stat_vec and Car.pars_tires_vec (signs of the load
+    transfers included)."""
+
+    for w in range(4):
+        f_z = (f_z_calc_stat[0, w]
+               + a_x * f_z_calc_stat[1, w]
+               + a_y * f_z_calc_stat[2, w]
+               + vel * vel * f_z_calc_stat[3, w])
+
+        if f_z < 30.0:
+            f_z = 30.0
+
+        out[3 * w] = mu * (pars_tires[0, w] + pars_tires[2, w] * (f_z - pars_tires[4, w])) * f_z
+        out[3 * w + 1] = mu * (pars_tires[1, w] + pars_tires[3, w] * (f_z - pars_tires[4, w])) * f_z
+        out[3 * w + 2] = f_z
+
+
+def calc_lat_forces(car_pars, a_y):
+    """See Car.calc_lat_forces."""
+
+    f_y = car_pars[M] * a_y
+    f_y_f = f_y * car_pars[LR] / (car_pars[LF] + car_pars[LR])
+    f_y_r = f_y * car_pars[LF] / (car_pars[LF] + car_pars[LR])
+
+    return f_y_f, f_y_r
+
+
+def calc_f_x_pot(car_pars, pots, f_y_f, f_y_r, force_use_all_wheels, limit_braking_code):
+    """See Car.calc_f_x_pot, pots is the array filled by tire_force_pots."""
+
+    exp_tmp = car_pars[TIRE_MODEL_EXP]
+
+    # determine axle potentials
+    if limit_braking_code == 1 or limit_braking_code == 3:
+        f_x_pot_f = 2 * min(pots[0], pots[3])
+    else:
+        f_x_pot_f = pots[0] + pots[3]
+
+    if limit_braking_code == 2 or limit_braking_code == 3:
+        f_x_pot_r = 2 * min(pots[6], pots[9])
+    else:
+        f_x_pot_r = pots[6] + pots[9]
+
+    # calculate radicands of the tire model and check if below zero
+    radicand_f = max(1 - math.pow(math.fabs(f_y_f) / (pots[1] + pots[4]), exp_tmp), 0.0)
+    radicand_r = max(1 - math.pow(math.fabs(f_y_r) / (pots[7] + pots[10]), exp_tmp), 0.0)
+
+    # calculate remaining force potential
+    if car_pars[TOPOLOGY] == 2 or force_use_all_wheels:
+        f_x_poss_f = f_x_pot_f * math.pow(radicand_f, 1.0 / exp_tmp)
+        f_x_poss_r = f_x_pot_r * math.pow(radicand_r, 1.0 / exp_tmp)
+    elif car_pars[TOPOLOGY] == 0:
+        f_x_poss_f = f_x_pot_f * math.pow(radicand_f, 1.0 / exp_tmp)
+        f_x_poss_r = 0.0
+    else:
+        f_x_poss_f = 0.0
+        f_x_poss_r = f_x_pot_r * math.pow(radicand_r, 1.0 / exp_tmp)
+
+    return f_x_poss_f + f_x_poss_r
+
+
+def calc_max_ax(car_pars, f_z_calc_stat, pars_tires, a_x_range, vel, a_y, mu, f_y_f, f_y_r, pots):
+    """See Car.calc_max_ax, a_x_range must be the array used there."""
+
+    ind_first = 0
+    ind_last = a_x_range.size - 1
+    ind_mid = (ind_first + ind_last + 1) // 2
+
+    while ind_first != ind_last:
+        tire_force_pots(car_pars, f_z_calc_stat, pars_tires, vel, a_x_range[ind_mid], a_y, mu, pots)
+
+        if math.fabs(f_y_f) <= pots[1] + pots[4] and math.fabs(f_y_r) <= pots[7] + pots[10]:
+            ind_first = ind_mid
+        else:
+            ind_last = ind_mid - 1
+
+        ind_mid = (ind_first + ind_last + 1) // 2
+
+    return a_x_range[ind_mid]
+
+
+def r_driven_tire(car_pars, vel):
+    """See Car.r_driven_tire."""
+
+    return car_pars[TIRE_CIRC_REF] * (1 + (vel * 3.6 - 60.0) * (0.045 / 200.0)) / (2 * math.pi)
+
+
+def find_gear(car_pars, i_trans, n_shift, vel):
+    """See Car.find_gear."""
+
+    circumref = car_pars[TIRE_CIRC_REF] * (1 + (vel * 3.6 - 60.0) * (0.045 / 200.0))
+
+    for gear in range(i_trans.size):
+        n_gear = vel / (circumref * i_trans[gear])
+
+        if n_gear < n_shift[gear]:
+            return gear, n_gear
+
+    # if max rev in final gear is reached do not shift up
+    gear = i_trans.size - 1
+
+    return gear, vel / (circumref * i_trans[gear])
+
+
+def air_res(car_pars, vel, drs):
+    """See Car.air_res."""
+
+    if drs:
+        return 0.5 * (1.0 - car_pars[DRS_FACTOR]) * car_pars[C_W_A] * car_pars[RHO_AIR] * (vel * vel)
+    else:
+        return 0.5 * car_pars[C_W_A] * car_pars[RHO_AIR] * (vel * vel)
+
+
+def calc_torque_distr_f_x(car_pars, i_trans, n_shift, e_i, f_x, n, throttle_pos, vel):
+    """See CarElectric.calc_torque_distr_f_x, returns m_requ and m_e_motor."""
+
+    # calculate required torque to reach f_x
+    gear = find_gear(car_pars, i_trans, n_shift, vel)[0]
+    m_requ = f_x * r_driven_tire(car_pars, vel) * i_trans[gear] * e_i[gear] / car_pars[ETA_G]
+
+    # get torque potential of e motor
+    e_motor_torque_max = car_pars[POW_E_MOTOR] * car_pars[ETA_E_MOTOR] / (2 * math.pi * n)
+
+    if e_motor_torque_max > car_pars[TORQUE_E_MOTOR_MAX]:
+        e_motor_torque_max = car_pars[TORQUE_E_MOTOR_MAX]
+
+    if m_requ <= e_motor_torque_max:
+        m_e_motor = throttle_pos * m_requ
+    else:
+        m_e_motor = throttle_pos * e_motor_torque_max
+
+    return m_requ, m_e_motor
+
+
+def power_demand_e_motor_drive(car_pars, n, m_e_motor):
+    """See CarElectric.power_demand_e_motor_drive."""
+
+    return (2 * math.pi * n * m_e_motor) / car_pars[ETA_E_MOTOR]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# SOLVER ---------------------------------------------------------------------------------------------------------------
+# ----------------------------------------------------------------------------------------------------------------------
+
+def fbplus(car_pars, f_z_calc_stat, pars_tires, i_trans, n_shift, e_i, a_x_range,
+           kappa, mu, vel_lim, drs, f_x_grade, throttle_pos, vel_max_cornering,
+           stepsize, regen_only, limit_braking_code, use_recuperation,
+           initial_energy, e_rec_e_motor_max, v_start, a_x_start,
+           t_cl, vel_cl, n_cl, gear_cl, m_eng, m_e_motor, m_requ, es_cl, e_rec_e_motor, tire_loads, e_motor_power):
+    """
+    Compiled version of Lap.__fbplus for electric cars. Returned arrays t_cl, vel_cl, n_cl, es_cl and gear_cl are
+    closed, the rest is unclosed. All output arrays are filled in place (gear_cl zero based). Returns the final a_x
+    value.
+    """
+
+    # loop options
+    tol = 1e-2          # [m/s] termination criterion
+
+    no_points = kappa.size
+    pots = np.zeros(12)
+    tire_loads_tmp = np.zeros(4)
+
+    vel_lim_cl = np.empty(no_points + 1)
+    vel_lim_cl[:-1] = vel_lim
+    vel_lim_cl[-1] = vel_lim[0]
+    e_rec_e_motor[:] = 0.0  # must be reset for every run
+
+    # set start conditions
+    vel_cl[0] = v_start
+    es_cl[0] = initial_energy
+    gear_cl[0], n_cl[0] = find_gear(car_pars, i_trans, n_shift, vel_cl[0])
+
+    i = 0
+    a_x = a_x_start
+
+    while i < no_points:
+        # calculate currently acting lateral acceleration and forces
+        a_y = vel_cl[i] * vel_cl[i] * kappa[i]
+        f_y_f, f_y_r = calc_lat_forces(car_pars, a_y)
+
+        # calculate tire force potentials (using a_x = 0.0 (maximum cornering) to find out if we can stay on track)
+        tire_force_pots(car_pars, f_z_calc_stat, pars_tires, vel_cl[i], 0.0, a_y, mu[i], pots)
+
+        for w in range(4):
+            tire_loads[i, w] = pots[3 * w + 2]
+
+        # --------------------------------------------------------------------------------------------------------------
+        # CASE 1: some tire potential is left and no velocity limit is set -> accelerate -------------------------------
+        # --------------------------------------------------------------------------------------------------------------
+
+        if math.fabs(f_y_f) <= pots[1] + pots[4] and math.fabs(f_y_r) <= pots[7] + pots[10] \
+                and vel_cl[i] <= vel_lim[i]:
+
+            # obtain maximum longitudinal acceleration
+            a_x_max = calc_max_ax(car_pars, f_z_calc_stat, pars_tires, a_x_range, vel_cl[i], a_y, mu[i], f_y_f, f_y_r,
+                                  pots)
+
+            # approximate current a_x for tire load calc. either based on previous iteration or based on a_x_max
+            if a_x > 0.0:
+                a_x = min(a_x, a_x_max)
+            else:
+                a_x = a_x_max
+
+            # recalculate tire force potentials based on approximated a_x
+            tire_force_pots(car_pars, f_z_calc_stat, pars_tires, vel_cl[i], a_x, a_y, mu[i], pots)
+
+            for w in range(4):
+                tire_loads[i, w] = pots[3 * w + 2]
+
+            # calculate remaining tire potential at front and rear axle for longitudinal force transmission
+            f_x_poss = calc_f_x_pot(car_pars, pots, f_y_f, f_y_r, False, 0)
+
+            # calculate torque distribution (trying to reach the possible force f_x)
+            m_requ[i], m_e_motor[i] = calc_torque_distr_f_x(car_pars, i_trans, n_shift, e_i, f_x_poss, n_cl[i],
+                                                            throttle_pos[i], vel_cl[i])
+            m_eng[i] = 0.0
+
+            # calculate available acceleration force in powertrain
+            f_x_powert = (car_pars[ETA_G] * (m_eng[i] + m_e_motor[i])
+                          / (i_trans[gear_cl[i]] * r_driven_tire(car_pars, vel_cl[i]) * e_i[gear_cl[i]]))
+
+            # account for available force due to change in elevation
+            f_x_powert = f_x_powert - f_x_grade[i]
+
+            # calculate reached longitudinal acceleration
+            f_z_tot = tire_loads[i, 0] + tire_loads[i, 1] + tire_loads[i, 2] + tire_loads[i, 3]
+            a_x = ((f_x_powert - air_res(car_pars, vel_cl[i], drs[i]) - f_z_tot * car_pars[F_ROLL])
+                   / car_pars[M])
+
+            # calculate velocity in the next point
+            radicand = vel_cl[i] * vel_cl[i] + 2 * a_x * stepsize
+
+            if radicand < 0.0:
+                raise ValueError("math domain error")
+
+            vel_cl[i + 1] = math.sqrt(radicand)
+
+            # consider velocity limit if reaching it during this step
+            if vel_cl[i] <= vel_lim_cl[i + 1] < vel_cl[i + 1]:
+                # calculate a_x required to reach the velocity limit
+                a_x = (vel_lim_cl[i + 1] * vel_lim_cl[i + 1] - vel_cl[i] * vel_cl[i]) / (2 * stepsize)
+
+                f_x_target = (air_res(car_pars, vel_cl[i], False)
+                              + f_z_tot * car_pars[F_ROLL]
+                              + car_pars[M] * a_x)
+
+                m_requ[i], m_e_motor[i] = calc_torque_distr_f_x(car_pars, i_trans, n_shift, e_i, f_x_target, n_cl[i],
+                                                                throttle_pos[i], vel_cl[i])
+                m_eng[i] = 0.0
+
+                # set velocity accordingly
+                vel_cl[i + 1] = vel_lim_cl[i + 1]
+
+            # check shifting -> calculate gear and rev in the next point
+            gear_cl[i + 1], n_cl[i + 1] = find_gear(car_pars, i_trans, n_shift, vel_cl[i + 1])
+
+            # calculate time at start of next point
+            t_cl[i + 1] = t_cl[i] + 2 * stepsize / (vel_cl[i] + vel_cl[i + 1])
+
+            # calculate energy used by e motor during current step in [J] and changes in the energy storage
+            e_cons_e_motor = power_demand_e_motor_drive(car_pars, n_cl[i], m_e_motor[i]) * (t_cl[i + 1] - t_cl[i])
+            es_cl[i + 1] = es_cl[i] + 0.0 - e_cons_e_motor
+
+            e_motor_power[i] = power_demand_e_motor_drive(car_pars, n_cl[i], m_e_motor[i])
+
+            # increment
+            i += 1
+
+        # --------------------------------------------------------------------------------------------------------------
+        # CASE 2: lateral force is greater than poss. tot. tire force of an axle or speed limit must be kept -> brake --
+        # --------------------------------------------------------------------------------------------------------------
+
+        else:
+            # check if start velocity is too high
+            if i == 1:
+                raise RuntimeError("Reduce start velocity! (it could be that braking would affect points within the"
+                                   " previous lap)")
+
+            # get maximum current velocity depending on speed limit or lateral acceleration limit due to curvature
+            vel_cl[i] = min(vel_max_cornering[i], vel_lim[i])
+
+            # backward iterations -> maximum current velocity should be kept at current point i
+            j = 0
+            a_x = 0.0
+
+            while True:
+                vel_tmp = vel_cl[i - j]
+                vel_tmp_old = 0.0
+                vels_tmp_sum = 0.0
+                vels_tmp_no = 0
+
+                while math.fabs(vel_tmp - vel_tmp_old) > tol:
+                    vel_tmp_old = vel_tmp
+
+                    # calculate lat. acceleration and forces with temporary stored velocity and previous curvature
+                    a_y = vel_tmp * vel_tmp * kappa[i - j - 1]
+                    f_y_f, f_y_r = calc_lat_forces(car_pars, a_y)
+
+                    # calculate tire force potentials
+                    tire_force_pots(car_pars, f_z_calc_stat, pars_tires, vel_tmp, a_x, a_y, mu[i - j - 1], pots)
+
+                    for w in range(4):
+                        tire_loads_tmp[w] = pots[3 * w + 2]
+
+                    # calculate remaining tire potential for deceleration (see Lap.__fbplus)
+                    if regen_only:
+                        f_x_poss = calc_f_x_pot(car_pars, pots, f_y_f, f_y_r, False, 0)
+                    else:
+                        f_x_poss = calc_f_x_pot(car_pars, pots, f_y_f, f_y_r, True, limit_braking_code)
+
+                    # limit the deceleration force to the motor capabilities if only regen is used
+                    if regen_only:
+                        f_x_poss_torque = (car_pars[TORQUE_E_MOTOR_MAX]
+                                           / car_pars[ETA_G]
+                                           / (i_trans[gear_cl[i - j - 1]]
+                                              * r_driven_tire(car_pars, vel_cl[i - j - 1])
+                                              * e_i[gear_cl[i - j - 1]]))
+
+                        f_x_poss_power = (car_pars[POW_E_MOTOR]
+                                          / car_pars[ETA_E_MOTOR_RE]
+                                          / car_pars[ETA_G]
+                                          / vel_tmp)
+
+                        f_x_poss = min(f_x_poss, f_x_poss_torque, f_x_poss_power)
+
+                    # account for the force due to change in elevation
+                    f_x_poss = f_x_poss + f_x_grade[i - j - 1]
+
+                    # calculate deceleration
+                    f_z_tot = tire_loads_tmp[0] + tire_loads_tmp[1] + tire_loads_tmp[2] + tire_loads_tmp[3]
+                    a_x = -(f_x_poss + air_res(car_pars, vel_tmp, False) + f_z_tot * car_pars[F_ROLL]) / car_pars[M]
+
+                    # calculate previous velocity and use the average of all values as applied velocity
+                    vels_tmp_sum += math.sqrt(vel_cl[i - j] * vel_cl[i - j] + 2 * -a_x * stepsize)
+                    vels_tmp_no += 1
+
+                    vel_tmp = vels_tmp_sum / vels_tmp_no
+
+                # check if the calculated velocity is greater than the original one -> break the loop
+                if vel_tmp >= vel_cl[i - j - 1]:
+                    break
+                else:
+                    vel_cl[i - j - 1] = vel_tmp
+
+                    for w in range(4):
+                        tire_loads[i - j - 1, w] = tire_loads_tmp[w]
+
+                # increment to previous point
+                j += 1
+
+                if i - j - 1 < 0:
+                    raise RuntimeError("Reduce start velocity (it could be that braking would affect points within"
+                                       " the previous lap)!")
+
+            # recalculate gears and revs for all changed points including current point
+            for k in range(i - j, i + 1):
+                gear_cl[k], n_cl[k] = find_gear(car_pars, i_trans, n_shift, vel_cl[k])
+
+            # recalculate lap times starting from the last unchanged point i - j - 1
+            for k in range(i - j - 1, i):
+                t_cl[k + 1] = t_cl[k] + 2 * stepsize / (vel_cl[k + 1] + vel_cl[k])
+
+            # recalculate energy related quantities starting from the last unchanged point i - j - 1
+            for k in range(i - j - 1, i):
+                drs_tmp = drs[k] if k == i - j - 1 else False
+
+                f_x_resi = (air_res(car_pars, vel_cl[k], drs_tmp)
+                            + (tire_loads[k, 0] + tire_loads[k, 1] + tire_loads[k, 2] + tire_loads[k, 3])
+                            * car_pars[F_ROLL])
+
+                # calculate the longitudinal acceleration and force required for the given velocities
+                a_x_requ = (vel_cl[k + 1] * vel_cl[k + 1] - vel_cl[k] * vel_cl[k]) / (2 * stepsize)
+                f_x_requ = car_pars[M] * a_x_requ
+
+                # calculate force that must be provided by the powertrain (or brakes) to reach this acc. force
+                f_x_powert = f_x_requ + f_x_resi + f_x_grade[k]
+
+                if f_x_powert > 0.0:
+                    # engine demanded
+                    e_rec_e_motor[k] = 0.0
+
+                    m_requ[k], m_e_motor[k] = calc_torque_distr_f_x(car_pars, i_trans, n_shift, e_i, f_x_powert,
+                                                                    n_cl[k], throttle_pos[k], vel_cl[k])
+                    m_eng[k] = 0.0
+
+                    # check torques provided and requested
+                    if math.fabs(m_e_motor[k] - m_requ[k]) > 1e-9 * max(math.fabs(m_e_motor[k]),
+                                                                        math.fabs(m_requ[k])):
+                        print("WARNING: It seems like if the requested torque could not be supplied by the powertrain."
+                              " Be aware that this fact is not considered and the further calculation is processed"
+                              " as if the torque was supplied! The difference in Nm amounts to",
+                              m_requ[k] - m_e_motor[k])
+
+                    # calculate energy used by e motor during current step in [J]
+                    e_cons_e_motor = (power_demand_e_motor_drive(car_pars, n_cl[k], m_e_motor[k])
+                                      * (t_cl[k + 1] - t_cl[k]))
+
+                    # index i is used here on purpose to keep the results identical to Lap.__fbplus
+                    e_motor_power[i] = power_demand_e_motor_drive(car_pars, n_cl[i], m_e_motor[i])
+
+                    es_cl[k + 1] = es_cl[k] + 0.0 - e_cons_e_motor
+
+                else:
+                    # engine not demanded -> kinetic energy recuperation
+                    m_eng[k] = 0.0
+                    m_requ[k] = 0.0
+
+                    if np.sum(e_rec_e_motor) < e_rec_e_motor_max and use_recuperation:
+                        e_rec_e_motor_tires = math.fabs(f_x_powert) * stepsize
+
+                        e_rec_e_motor_torque = (car_pars[TORQUE_E_MOTOR_MAX]
+                                                / car_pars[ETA_G]
+                                                / i_trans[gear_cl[k]]
+                                                / r_driven_tire(car_pars, vel_cl[k])
+                                                * stepsize)
+
+                        e_rec_e_motor_power = (car_pars[POW_E_MOTOR]
+                                               / car_pars[ETA_E_MOTOR_RE]
+                                               / car_pars[ETA_G]
+                                               * (t_cl[k] - t_cl[k - 1]))
+
+                        e_rec_tmp = min(e_rec_e_motor_tires, e_rec_e_motor_torque, e_rec_e_motor_power)
+                        e_rec_e_motor[k] = e_rec_tmp * car_pars[ETA_G] * car_pars[ETA_E_MOTOR_RE]
+
+                        e_motor_power[k] = - e_rec_e_motor[k] / (t_cl[k + 1] - t_cl[k])
+                        m_e_motor[k] = e_motor_power[k] / (n_cl[k] * 2 * math.pi) * car_pars[ETA_E_MOTOR_RE]
+
+                        if abs(m_e_motor[k]) > car_pars[TORQUE_E_MOTOR_MAX]:
+                            raise Exception("Maximum motor torque exceeded!")
+
+                        if abs(e_motor_power[k]) > car_pars[POW_E_MOTOR]:
+                            raise Exception("Maximum Motor power exceeded!")
+
+                    else:
+                        e_rec_e_motor[k] = 0.0
+
+                    # update energy storage
+                    es_cl[k + 1] = es_cl[k] + e_rec_e_motor[k]
+
+            # reset longitudinal acceleration for next step
+            a_x = 0.0
+
+    return a_x
+
+
+# compile the solver and its helpers if numba is available (the helpers must be compiled as well to be callable from
+# within the compiled solver)
+if NUMBA_AVAILABLE:
+    tire_force_pots = numba.njit(cache=True)(tire_force_pots)
+    calc_lat_forces = numba.njit(cache=True)(calc_lat_forces)
+    calc_f_x_pot = numba.njit(cache=True)(calc_f_x_pot)
+    calc_max_ax = numba.njit(cache=True)(calc_max_ax)
+    r_driven_tire = numba.njit(cache=True)(r_driven_tire)
+    find_gear = numba.njit(cache=True)(find_gear)
+    air_res = numba.njit(cache=True)(air_res)
+    calc_torque_distr_f_x = numba.njit(cache=True)(calc_torque_distr_f_x)
+    power_demand_e_motor_drive = numba.njit(cache=True)(power_demand_e_motor_drive)
+    fbplus = numba.njit(cache=True)(fbplus)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# TESTING --------------------------------------------------------------------------------------------------------------
+# ----------------------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    pass
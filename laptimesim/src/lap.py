@@ -1,8 +1,9 @@
 import numpy as np
 import math
-import matplotlib.pyplot as plt
 from laptimesim.src.track import Track
 from laptimesim.src.driver import Driver
+from laptimesim.src import fbplus_kernel
+from laptimesim.src.lap_profiler import LapProfiler
 
 
 class Lap(object):
@@ -44,7 +45,10 @@ class Lap(object):
                  "__e_cons_cl",
                  "__tire_loads",
                  "__e_es_to_e_motor_max",
-                 "__e_motor_power")
+                 "__e_motor_power",
+                 "__warm_start_state",
+                 "__profiler",
+                 "__em_iter_stats")
 
     # ------------------------------------------------------------------------------------------------------------------
     # CONSTRUCTOR ------------------------------------------------------------------------------------------------------
@@ -66,6 +70,18 @@ class Lap(object):
             self.pars_solver["v_start"] = self.trackobj.pars_track["pitspeed"]
             self.pars_solver["find_v_start"] = False
 
+        if self.pars_solver["calc_max_ax_mode"] not in ["search", "analytic"]:
+            raise IOError("Unknown calc_max_ax_mode!")
+
+        if self.pars_solver["backend"] not in ["python", "numba"]:
+            raise IOError("Unknown solver backend!")
+
+        if self.pars_solver["em_iter_scheme"] not in ["add", "secant"]:
+            raise IOError("Unknown EM iteration scheme!")
+
+        if self.pars_solver["backend"] == "numba" and not fbplus_kernel.NUMBA_AVAILABLE:
+            print("WARNING: Numba is not installed, using the python solver backend instead!")
+
         # initialize lap variables
         self.t_cl = np.zeros(trackobj.no_points_cl)     # [s] lap time at the beginning of a step
         self.vel_cl = np.zeros(trackobj.no_points_cl)   # [m/s] velocity at the beginning of a step
@@ -89,6 +105,18 @@ class Lap(object):
         self.e_rec_e_motor_max = np.inf
         self.e_es_to_e_motor_max = np.inf
 
+        # start velocity and acceleration of the previous lap (kept by reset_lap), see simulate_lap
+        self.warm_start_state = None
+
+        # profiler of the solver phases (None -> profiling deactivated), see lap_profiler.py
+        if self.debug_opts["use_profiling"]:
+            self.profiler = LapProfiler()
+        else:
+            self.profiler = None
+
+        # convergence of the EM recalculation (one dict per iteration), see simulate_lap
+        self.em_iter_stats = []
+
     # ------------------------------------------------------------------------------------------------------------------
     # GETTERS / SETTERS ------------------------------------------------------------------------------------------------
     # ------------------------------------------------------------------------------------------------------------------
@@ -173,6 +201,18 @@ class Lap(object):
     def __set_e_motor_power(self, x: np.ndarray) -> None: self.__e_motor_power = x
     e_motor_power = property(__get_e_motor_power, __set_e_motor_power)
 
+    def __get_warm_start_state(self) -> tuple: return self.__warm_start_state
+    def __set_warm_start_state(self, x: tuple) -> None: self.__warm_start_state = x
+    warm_start_state = property(__get_warm_start_state, __set_warm_start_state)
+
+    def __get_profiler(self) -> LapProfiler: return self.__profiler
+    def __set_profiler(self, x: LapProfiler) -> None: self.__profiler = x
+    profiler = property(__get_profiler, __set_profiler)
+
+    def __get_em_iter_stats(self) -> list: return self.__em_iter_stats
+    def __set_em_iter_stats(self, x: list) -> None: self.__em_iter_stats = x
+    em_iter_stats = property(__get_em_iter_stats, __set_em_iter_stats)
+
     # ------------------------------------------------------------------------------------------------------------------
     # METHODS (CALCULATIONS) -------------------------------------------------------------------------------------------
     # ------------------------------------------------------------------------------------------------------------------
@@ -214,9 +254,16 @@ class Lap(object):
             1) The boost will increase the velocity and thereby reduce the time consumed in one track segment and
             therefore reduce the amount of energy consumed there. 2) Additional recuperated energy due to the increased
             velocity. This additional energy remains at the end of the lap and can be used to recalculate the EM boost
-            points for the next run. We only add new boost points and do net remove old ones to avoid endless loops (we
-            do not know how much energy is available for EM strategy otherwise).
+            points for the next run. The solver option em_iter_scheme determines how the energy budget of the EM
+            strategy is updated:
+            add: We only add new boost points and do net remove old ones to avoid endless loops (we do not know how
+            much energy is available for EM strategy otherwise).
+            secant: The boost points are recalculated from scratch in every iteration (i.e. they can also be removed)
+            based on the velocity profile without EM. Therefore, the remaining energy only depends on the energy
+            budget and the budget leading to an empty ES is found by the secant method, i.e. the energy rebound of the
+            boost is predicted from the previous iterations. A tight energy balance typically requires two iterations.
             This process helps to get a good approximation without too many loop iterations, i.e. calculation time.
+            The convergence of every iteration is stored in em_iter_stats.
 
         Solver calls appear in the following order (EM = FCFB):
         1) Initial call with EM
@@ -229,25 +276,39 @@ class Lap(object):
             will of course improve the lap time instead to decrease it.
         """
 
+        # the profile and the EM convergence belong to a single lap
+        if self.profiler is not None:
+            self.profiler.reset()
+
+        self.em_iter_stats = []
+
         # --------------------------------------------------------------------------------------------------------------
         # CALL SOLVER (WITHOUT EM) -------------------------------------------------------------------------------------
         # --------------------------------------------------------------------------------------------------------------
 
-        # initial solver run
-        if self.debug_opts["use_print"]:
-            print("-" * 50)
-            print("Starting solver run (1)")
-
-        self.__fbplus(v_start=self.pars_solver["v_start"],
-                      a_x_start=0.0)
+        # warm start based on the result of the previous lap (if desired by user and available)
+        if self.pars_solver["warm_start"] and self.pars_solver["find_v_start"] \
+                and self.warm_start_state is not None:
+            warm_started = self.__fbplus_warm_start()
+        else:
+            warm_started = False
 
-        # use previous result to rerun the simulation with proper start velocity (if desired by user)
-        if self.pars_solver["find_v_start"]:
+        if not warm_started:
+            # initial solver run
             if self.debug_opts["use_print"]:
-                print("Starting solver run (2) (considering new start velocity)")
+                print("-" * 50)
+                print("Starting solver run (1)")
 
-            self.__fbplus(v_start=self.vel_cl[-1],
-                          a_x_start=self.a_x_final)
+            self.__fbplus(v_start=self.pars_solver["v_start"],
+                          a_x_start=0.0)
+
+            # use previous result to rerun the simulation with proper start velocity (if desired by user)
+            if self.pars_solver["find_v_start"]:
+                if self.debug_opts["use_print"]:
+                    print("Starting solver run (2) (considering new start velocity)")
+
+                self.__fbplus(v_start=self.vel_cl[-1],
+                              a_x_start=self.a_x_final)
 
         # --------------------------------------------------------------------------------------------------------------
         # CALL SOLVER (WITH EM) ----------------------------------------------------------------------------------------
@@ -258,57 +319,82 @@ class Lap(object):
             """Due to the mutual influence between velocity profile and EM strategy we need some iterations until an
             equilibrium was found."""
 
-            # create required loop variables
-            i = 0
-            es_prev = 0.0
+            if self.pars_solver["em_iter_scheme"] == "add":
+                es_prev = 0.0
 
-            while math.fabs(self.es_cl[-1] - es_prev) > self.pars_solver["es_diff_max"] \
-                    and i < self.pars_solver["max_no_em_iters"]:
+                while math.fabs(self.es_cl[-1] - es_prev) > self.pars_solver["es_diff_max"] \
+                        and len(self.em_iter_stats) < self.pars_solver["max_no_em_iters"]:
 
-                i += 1
-                es_prev = self.es_cl[-1]
+                    es_prev = self.es_cl[-1]
 
-                if self.debug_opts["use_print"]:
-                    print("Starting recalculation considering hybrid system (%i)" % i)
-
-                # calculate hybrid system application (boost) based on the previous result
-                self.driverobj.calc_em_boost_use(t_cl=self.t_cl,
-                                                 vel_cl=self.vel_cl,
-                                                 n_cl=self.n_cl,
-                                                 m_requ=self.m_requ,
-                                                 es_final=self.es_cl[-1])
-
-                # rerun solver to get new velocity profile
-                if self.pars_solver["find_v_start"]:
-                    self.__fbplus(v_start=self.vel_cl[-1],
-                                  a_x_start=self.a_x_final)
-                else:
-                    self.__fbplus(v_start=self.pars_solver["v_start"],
-                                  a_x_start=0.0)
+                    # calculate hybrid system application (boost) based on the previous result
+                    self.__em_iteration(es_budget=es_prev,
+                                        t_cl=self.t_cl,
+                                        vel_cl=self.vel_cl,
+                                        n_cl=self.n_cl,
+                                        m_requ=self.m_requ)
 
-                if self.debug_opts["use_print"]:
-                    print("Remaining energy in ES: %.0f kJ" % (self.es_cl[-1] / 1000.0))
+            else:
+                # the boost points of every iteration are calculated based on the velocity profile without EM
+                t_cl_ref = np.copy(self.t_cl)
+                vel_cl_ref = np.copy(self.vel_cl)
+                n_cl_ref = np.copy(self.n_cl)
+                m_requ_ref = np.copy(self.m_requ)
+                em_boost_use_ref = np.copy(self.driverobj.em_boost_use)
+
+                # remaining energy as a function of the energy budget (no budget -> no boost), the budget leading to an
+                # empty ES lies between es_budget_lo (ES not empty) and es_budget_hi (ES empty)
+                es_budget_lo = 0.0
+                es_final_lo = self.es_cl[-1]
+                es_budget_hi = math.inf
+                es_final_prev = self.es_cl[-1]
+                es_budget = self.es_cl[-1]
+
+                while len(self.em_iter_stats) < self.pars_solver["max_no_em_iters"]:
+                    em_boost_use_prev = self.driverobj.em_boost_use
+                    self.driverobj.em_boost_use = np.copy(em_boost_use_ref)
+
+                    # stop if the budget has no more influence
+                    if not self.__em_iteration(es_budget=es_budget,
+                                               t_cl=t_cl_ref,
+                                               vel_cl=vel_cl_ref,
+                                               n_cl=n_cl_ref,
+                                               m_requ=m_requ_ref,
+                                               em_boost_use_prev=em_boost_use_prev) \
+                            or math.fabs(self.es_cl[-1] - es_final_prev) <= self.pars_solver["es_diff_max"]:
+                        break
+
+                    es_final_prev = self.es_cl[-1]
+
+                    if self.es_cl[-1] > self.pars_solver["es_diff_max"]:
+                        # secant step, i.e. the energy rebound of the boost (less time in the boost segments, more
+                        # recuperation) is predicted from the previous budget, relaxation step if it cannot be predicted
+                        es_slope = (self.es_cl[-1] - es_final_lo) / (es_budget - es_budget_lo)
+                        es_budget_lo = es_budget
+                        es_final_lo = self.es_cl[-1]
+
+                        if es_slope < 0.0:
+                            es_budget -= self.es_cl[-1] / es_slope
+                        else:
+                            es_budget += self.es_cl[-1]
+
+                        if es_budget >= es_budget_hi:
+                            es_budget = 0.5 * (es_budget_lo + es_budget_hi)
+
+                    else:
+                        # ES empty (hybrid cars cannot go below 0.0) -> budget too large, bisection
+                        es_budget_hi = es_budget
+                        es_budget = 0.5 * (es_budget_lo + es_budget_hi)
 
         elif self.driverobj.pars_driver["em_strategy"] == "FCFB" and self.driverobj.pars_driver["use_lift_coast"]:
             """Case FCFB + lift&coast."""
 
-            if self.debug_opts["use_print"]:
-                print("Starting recalculation considering hybrid system (1)")
-
             # calculate hybrid system application (boost) based on the previous result
-            self.driverobj.calc_em_boost_use(t_cl=self.t_cl,
-                                             vel_cl=self.vel_cl,
-                                             n_cl=self.n_cl,
-                                             m_requ=self.m_requ,
-                                             es_final=self.es_cl[-1])
-
-            # rerun solver to get new velocity profile
-            if self.pars_solver["find_v_start"]:
-                self.__fbplus(v_start=self.vel_cl[-1],
-                              a_x_start=self.a_x_final)
-            else:
-                self.__fbplus(v_start=self.pars_solver["v_start"],
-                              a_x_start=0.0)
+            self.__em_iteration(es_budget=self.es_cl[-1],
+                                t_cl=self.t_cl,
+                                vel_cl=self.vel_cl,
+                                n_cl=self.n_cl,
+                                m_requ=self.m_requ)
 
         if self.debug_opts["use_print"]:
             print("Finished solver calculations")
@@ -317,6 +403,9 @@ class Lap(object):
         # FUEL/ENERGY CONSUMPTION --------------------------------------------------------------------------------------
         # --------------------------------------------------------------------------------------------------------------
 
+        if self.profiler is not None:
+            t_start = self.profiler.timer()
+
         if not self.driverobj.carobj.powertrain_type == "electric":
             self.fuel_cons_cl = self.driverobj.carobj.fuel_cons(t_cl=self.t_cl,
                                                                 n_cl=self.n_cl,
@@ -326,11 +415,112 @@ class Lap(object):
                                                       n_cl=self.n_cl,
                                                       m_e_motor=self.m_e_motor)
 
+        if self.profiler is not None:
+            self.profiler.add_time("e_cons", t_start)
+
+        # save start conditions for a warm start of the next lap
+        self.warm_start_state = (self.vel_cl[-1], self.a_x_final)
+
+    def __em_iteration(self, es_budget: float, t_cl: np.ndarray, vel_cl: np.ndarray, n_cl: np.ndarray,
+                       m_requ: np.ndarray, em_boost_use_prev: np.ndarray = None) -> bool:
+        """
+        Iteration of the EM recalculation (LBP/LS): the EM strategy is calculated for an energy budget (in J) based on
+        the given velocity profile, then the solver runs with the resulting boost points. Returns False without running
+        the solver if the boost points are equal to em_boost_use_prev.
+        """
+
+        if self.profiler is not None:
+            self.profiler.add_count("em_iters")
+            t_start = self.profiler.timer()
+
+        # calculate hybrid system application (boost)
+        self.driverobj.calc_em_boost_use(t_cl=t_cl,
+                                         vel_cl=vel_cl,
+                                         n_cl=n_cl,
+                                         m_requ=m_requ,
+                                         es_final=es_budget)
+
+        if self.profiler is not None:
+            self.profiler.add_time("em_strategy", t_start)
+
+        if em_boost_use_prev is not None and np.array_equal(self.driverobj.em_boost_use, em_boost_use_prev):
+            return False
+
+        if self.debug_opts["use_print"]:
+            print("Starting recalculation considering hybrid system (%i)" % (len(self.em_iter_stats) + 1))
+
+        # rerun solver to get new velocity profile
+        if self.pars_solver["find_v_start"]:
+            self.__fbplus(v_start=self.vel_cl[-1],
+                          a_x_start=self.a_x_final)
+        else:
+            self.__fbplus(v_start=self.pars_solver["v_start"],
+                          a_x_start=0.0)
+
+        self.em_iter_stats.append({"es_budget": float(es_budget),
+                                   "es_final": float(self.es_cl[-1]),
+                                   "no_boost_points": int(np.count_nonzero(self.driverobj.em_boost_use)),
+                                   "lap_time": float(self.t_cl[-1])})
+
+        if self.debug_opts["use_print"]:
+            print("Remaining energy in ES: %.0f kJ" % (self.es_cl[-1] / 1000.0))
+
+        return True
+
+    def __fbplus_warm_start(self) -> bool:
+        """
+        Solver run starting with the velocity and acceleration at the end of the previous lap, e.g. of the previous
+        iteration of a sensitivity analysis. If only few car parameters changed, the start velocity is already close to
+        the end velocity of the lap such that the second solver run can be skipped. Returns False if the solver run
+        failed (e.g. start velocity too high), i.e. a cold start is required.
+        """
+
+        v_start, a_x_start = self.warm_start_state
+
+        if self.debug_opts["use_print"]:
+            print("-" * 50)
+            print("Starting solver run (1) (warm start)")
+
+        try:
+            self.__fbplus(v_start=v_start,
+                          a_x_start=a_x_start)
+        except RuntimeError:
+            if self.debug_opts["use_print"]:
+                print("Warm start failed, starting cold start")
+
+            return False
+
+        # rerun the simulation only if the start velocity did not converge
+        if math.fabs(self.vel_cl[-1] - v_start) > self.pars_solver["v_start_tol"]:
+            if self.debug_opts["use_print"]:
+                print("Starting solver run (2) (considering new start velocity)")
+
+            self.__fbplus(v_start=self.vel_cl[-1],
+                          a_x_start=self.a_x_final)
+
+        return True
+
     def __fbplus(self, v_start: float, a_x_start: float = 0.0):
         """
         Returned arrays t_cl, vel_cl, n_cl, es_cl and gear_cl are closed, the rest is unclosed.
         """
 
+        profiler = self.profiler
+
+        if profiler is not None:
+            t_start_fbplus = profiler.timer()
+
+        # use compiled solver if desired and possible (electric cars only)
+        if self.pars_solver["backend"] == "numba" and fbplus_kernel.NUMBA_AVAILABLE \
+                and self.driverobj.carobj.powertrain_type == "electric":
+            self.__fbplus_compiled(v_start=v_start,
+                                   a_x_start=a_x_start)
+
+            if profiler is not None:
+                profiler.add_time("fbplus", t_start_fbplus)
+
+            return
+
         # --------------------------------------------------------------------------------------------------------------
         # USER INPUT ---------------------------------------------------------------------------------------------------
         # --------------------------------------------------------------------------------------------------------------
@@ -346,6 +536,23 @@ class Lap(object):
         vel_lim_cl = np.append(self.trackobj.vel_lim, self.trackobj.vel_lim[0])
         self.e_rec_e_motor[:] = 0.0  # must be reset for every run
 
+        # force required to overcome the elevation change to the next point (zero if the elevation is not used), as
+        # list such that the loops below work on python floats
+        f_x_grade = self.trackobj.calc_grade_forces(m=self.driverobj.carobj.pars_general["m"],
+                                                    g=self.driverobj.carobj.pars_general["g"]).tolist()
+
+        if profiler is not None:
+            t_start = profiler.timer()
+
+        # maximum cornering velocities of all points (cached within the car module)
+        vel_max_cornering = self.driverobj.carobj.\
+            v_max_cornering_profile(kappa=self.trackobj.kappa,
+                                    mu=self.trackobj.mu,
+                                    vel_subtr_corner=self.driverobj.pars_driver["vel_subtr_corner"])
+
+        if profiler is not None:
+            profiler.add_time("v_max_cornering", t_start)
+
         # --------------------------------------------------------------------------------------------------------------
         # SET START CONDITIONS -----------------------------------------------------------------------------------------
         # --------------------------------------------------------------------------------------------------------------
@@ -394,12 +601,28 @@ class Lap(object):
                 get a proper assumption of the maximum longitudinal acceleration a_x that can be handled without
                 leaving the track (the connection originates in the a_x influence to the wheel loads)."""
 
+                if profiler is not None:
+                    profiler.add_count("forward_steps")
+                    t_start = profiler.timer()
+
                 # obtain maximum longitudinal acceleration
-                a_x_max = self.driverobj.carobj.calc_max_ax(vel=self.vel_cl[i],
-                                                            a_y=a_y,
-                                                            mu=self.trackobj.mu[i],
-                                                            f_y_f=f_y_f,
-                                                            f_y_r=f_y_r)
+                if self.pars_solver["calc_max_ax_mode"] == "analytic":
+                    a_x_max = self.driverobj.carobj.\
+                        calc_max_ax_analytic(vel=self.vel_cl[i],
+                                             a_y=a_y,
+                                             mu=self.trackobj.mu[i],
+                                             f_y_f=f_y_f,
+                                             f_y_r=f_y_r,
+                                             tol=self.pars_solver["calc_max_ax_tol"])
+                else:
+                    a_x_max = self.driverobj.carobj.calc_max_ax(vel=self.vel_cl[i],
+                                                                a_y=a_y,
+                                                                mu=self.trackobj.mu[i],
+                                                                f_y_f=f_y_f,
+                                                                f_y_r=f_y_r)
+
+                if profiler is not None:
+                    profiler.add_time("calc_max_ax", t_start)
 
                 # approximate current a_x for tire load calc. either based on previous iteration or based on a_x_max
                 if a_x > 0.0:
@@ -443,21 +666,9 @@ class Lap(object):
                               / (self.driverobj.carobj.pars_gearbox["i_trans"][self.gear_cl[i]]
                                  * self.driverobj.carobj.r_driven_tire(vel=self.vel_cl[i])
                                  * self.driverobj.carobj.pars_gearbox["e_i"][self.gear_cl[i]]))
-                
-                # account for available force due to change in elevation
-                if self.trackobj.pars_track["use_elevation"]:
-                    if i == len(self.trackobj.elevation_profile) - 1:
-                        elevation_change = self.trackobj.elevation_profile[0] - self.trackobj.elevation_profile[i]
-                    else:
-                        elevation_change = self.trackobj.elevation_profile[i + 1] - self.trackobj.elevation_profile[i]
-                    elevation_energy = (
-                        elevation_change * 
-                        self.driverobj.carobj.pars_general["m"] *
-                        self.driverobj.carobj.pars_general["g"]
-                    )
-
-                    f_x_powert = f_x_powert - elevation_energy / self.trackobj.stepsize
 
+                # account for available force due to change in elevation
+                f_x_powert = f_x_powert - f_x_grade[i]
 
                 # calculate reached longitudinal acceleration
                 a_x = ((f_x_powert - self.driverobj.carobj.air_res(vel=self.vel_cl[i], drs=self.trackobj.drs[i])
@@ -538,16 +749,15 @@ class Lap(object):
                                        + " previous lap)")
 
                 # get maximum current velocity depending on speed limit or lateral acceleration limit due to curvature
-                self.vel_cl[i] = min(self.driverobj.carobj.
-                                     v_max_cornering(kappa=self.trackobj.kappa[i],
-                                                     mu=self.trackobj.mu[i],
-                                                     vel_subtr_corner=self.driverobj.pars_driver["vel_subtr_corner"]),
-                                     self.trackobj.vel_lim[i])
+                self.vel_cl[i] = min(vel_max_cornering[i], self.trackobj.vel_lim[i])
 
                 # ------------------------------------------------------------------------------------------------------
                 # BACKWARD ITERATIONS -> MAXIMUM CURRENT VELOCITY SHOULD BE KEPT AT CURRENT POINT i --------------------
                 # ------------------------------------------------------------------------------------------------------
 
+                if profiler is not None:
+                    t_start = profiler.timer()
+
                 j = 0
                 a_x = 0.0  # reset longitudinal acceleration (almost zero during maximum cornering)
 
@@ -639,19 +849,9 @@ class Lap(object):
 
                             f_x_poss = min(f_x_poss, f_x_poss_torque, f_x_poss_power)
                         
-                        # calculate the energy change due to elevation change
-                        if self.trackobj.pars_track["use_elevation"]:
-                            elevation_change = self.trackobj.elevation_profile[i - j - 1 + 1] \
-                                             - self.trackobj.elevation_profile[i - j - 1]
-                            elevation_energy = (
-                                elevation_change * 
-                                self.driverobj.carobj.pars_general["m"] *
-                                self.driverobj.carobj.pars_general["g"]
-                            )
-
-                            # + sign because the f_x_poss is positive for deceleration
-                            # and positive elevation change will also decelerate the vehicle
-                            f_x_poss = f_x_poss + elevation_energy / self.trackobj.stepsize
+                        # account for the force due to change in elevation, + sign because the f_x_poss is positive
+                        # for deceleration and positive elevation change will also decelerate the vehicle
+                        f_x_poss = f_x_poss + f_x_grade[i - j - 1]
 
                         # calculate deceleration
                         a_x = (-(f_x_poss + self.driverobj.carobj.air_res(vel=vel_tmp, drs=False)
@@ -669,6 +869,9 @@ class Lap(object):
                         # if counter > 10:
                         #     vel_tmp -= (counter - 10) * force_conv
 
+                    if profiler is not None:
+                        profiler.add_count("backward_inner_iters", counter)
+
                     # check if the calculated velocity is greater than the original one -> break the loop
                     if vel_tmp >= self.vel_cl[i - j - 1]:
                         break  # without incrementing -> i - j - 1 is last unchanged point
@@ -683,13 +886,20 @@ class Lap(object):
                         raise RuntimeError("Reduce start velocity (it could be that braking would affect points within"
                                            " the previous lap)!")
 
+                if profiler is not None:
+                    profiler.add_time("backward", t_start)
+                    profiler.add_count("braking_zones")
+                    profiler.add_count("backward_depth", j)
+                    profiler.set_max("backward_depth_max", j)
+                    t_start = profiler.timer()
+
                 # ------------------------------------------------------------------------------------------------------
                 # MODIFIED VELOCITY PROFILE IS KNOWN -> RECALCULATION OF REMAINING DATA ON THIS BASIS ------------------
                 # ------------------------------------------------------------------------------------------------------
 
                 # recalculate gears and revs for all changed points including current point
-                for k in range(i - j, i + 1):
-                    self.gear_cl[k], self.n_cl[k] = self.driverobj.carobj.find_gear(vel=self.vel_cl[k])
+                self.gear_cl[i - j:i + 1], self.n_cl[i - j:i + 1] = \
+                    self.driverobj.carobj.find_gear_profile(vel=self.vel_cl[i - j:i + 1])
 
                 # recalculate lap times starting from the last unchanged point i - j - 1
                 for k in range(i - j - 1, i):
@@ -717,17 +927,7 @@ class Lap(object):
                     f_x_requ = self.driverobj.carobj.pars_general["m"] * a_x_requ
                     
                     # calculate force that must be provided by the powertrain (or brakes) to reach this acc. force
-                    f_x_powert = f_x_requ + f_x_resi 
-                    
-                    if self.trackobj.pars_track["use_elevation"]:
-                        elevation_change = self.trackobj.elevation_profile[k + 1] - self.trackobj.elevation_profile[k]
-                        elevation_energy = (
-                            elevation_change * 
-                            self.driverobj.carobj.pars_general["m"] *
-                            self.driverobj.carobj.pars_general["g"]
-                        )
-
-                        f_x_powert = f_x_powert + elevation_energy / self.trackobj.stepsize
+                    f_x_powert = f_x_requ + f_x_resi + f_x_grade[k]
 
                     # check for the two cases "engine demanded" and "engine not demanded"
                     if f_x_powert > 0.0:
@@ -855,6 +1055,8 @@ class Lap(object):
                         # update energy storage (no energy harvested in el. turbocharger while engine is not demanded)
                         self.es_cl[k + 1] = self.es_cl[k] + self.e_rec_e_motor[k]
 
+                if profiler is not None:
+                    profiler.add_time("recalc", t_start)
 
                 # reset longitudinal acceleration for next step (almost zero during maximum cornering)
                 a_x = 0.0
@@ -869,11 +1071,69 @@ class Lap(object):
         # save final a_x value for a possible recalculation of the lap
         self.a_x_final = a_x
 
+        if profiler is not None:
+            profiler.add_time("fbplus", t_start_fbplus)
+
+    def __fbplus_compiled(self, v_start: float, a_x_start: float = 0.0):
+        """
+        Same as __fbplus but using the compiled solver in fbplus_kernel.py, which operates on flat arrays of the car
+        parameters and the track profiles. The maximum longitudinal acceleration is always determined by the binary
+        search on a_x_range = np.linspace(0.0, 25.0, 101) (i.e. calc_max_ax_mode "search"), calc_max_ax_mode and
+        calc_max_ax_tol are ignored.
+        """
+
+        carobj = self.driverobj.carobj
+
+        vel_max_cornering = carobj.v_max_cornering_profile(
+            kappa=self.trackobj.kappa,
+            mu=self.trackobj.mu,
+            vel_subtr_corner=self.driverobj.pars_driver["vel_subtr_corner"])
+
+        self.a_x_final = fbplus_kernel.\
+            fbplus(car_pars=fbplus_kernel.pack_car_pars(carobj=carobj),
+                   f_z_calc_stat=carobj.f_z_calc_stat_vec,
+                   pars_tires=carobj.pars_tires_vec,
+                   i_trans=np.ascontiguousarray(carobj.pars_gearbox["i_trans"], dtype=float),
+                   n_shift=np.ascontiguousarray(carobj.pars_gearbox["n_shift"], dtype=float),
+                   e_i=np.ascontiguousarray(carobj.pars_gearbox["e_i"], dtype=float),
+                   a_x_range=np.linspace(0.0, 25.0, 101),
+                   kappa=np.ascontiguousarray(self.trackobj.kappa, dtype=float),
+                   mu=np.ascontiguousarray(self.trackobj.mu, dtype=float),
+                   vel_lim=np.ascontiguousarray(self.trackobj.vel_lim, dtype=float),
+                   drs=np.ascontiguousarray(self.trackobj.drs, dtype=bool),
+                   f_x_grade=self.trackobj.calc_grade_forces(m=carobj.pars_general["m"], g=carobj.pars_general["g"]),
+                   throttle_pos=np.ascontiguousarray(self.driverobj.throttle_pos, dtype=float),
+                   vel_max_cornering=vel_max_cornering,
+                   stepsize=float(self.trackobj.stepsize),
+                   regen_only=bool(self.driverobj.pars_driver["disable_braking"]),
+                   limit_braking_code=fbplus_kernel.LIMIT_BRAKING_CODES[self.pars_solver["limit_braking_weak_side"]],
+                   use_recuperation=bool(self.driverobj.pars_driver["use_recuperation"]),
+                   initial_energy=float(self.driverobj.pars_driver["initial_energy"]),
+                   e_rec_e_motor_max=float(self.e_rec_e_motor_max),
+                   v_start=float(v_start),
+                   a_x_start=float(a_x_start),
+                   t_cl=self.t_cl,
+                   vel_cl=self.vel_cl,
+                   n_cl=self.n_cl,
+                   gear_cl=self.gear_cl,
+                   m_eng=self.m_eng,
+                   m_e_motor=self.m_e_motor,
+                   m_requ=self.m_requ,
+                   es_cl=self.es_cl,
+                   e_rec_e_motor=self.e_rec_e_motor,
+                   tire_loads=self.tire_loads,
+                   e_motor_power=self.e_motor_power)
+
+        # return real instead of index based gear values
+        self.gear_cl = self.gear_cl + 1
+
     # ------------------------------------------------------------------------------------------------------------------
     # METHODS (ANALYSIS) -----------------------------------------------------------------------------------------------
     # ------------------------------------------------------------------------------------------------------------------
 
     def plot_lat_acc(self):
+        import matplotlib.pyplot as plt
+
         a_y_tmp = np.power(self.vel_cl[:-1], 2) * self.trackobj.kappa
 
         a_y_valid = 30.0
@@ -890,6 +1150,8 @@ class Lap(object):
         plt.show()
 
     def plot_torques(self):
+        import matplotlib.pyplot as plt
+
         fig = plt.figure()
         ax = fig.add_subplot(111)
         plt.plot(self.trackobj.dists_cl[:-1], self.m_eng)
@@ -904,6 +1166,8 @@ class Lap(object):
         plt.show()
 
     def plot_power(self):
+        import matplotlib.pyplot as plt
+
         fig = plt.figure()
         ax = fig.add_subplot(111)
         plt.plot(self.trackobj.dists_cl[:-1], self.e_motor_power)
@@ -914,6 +1178,8 @@ class Lap(object):
         plt.show()
 
     def plot_throttle(self):
+        import matplotlib.pyplot as plt
+
         fig = plt.figure()
         ax = fig.add_subplot(111)
         plt.plot(self.trackobj.dists_cl[:-1], self.driverobj.throttle_pos)
@@ -926,6 +1192,8 @@ class Lap(object):
     
 
     def plot_tire_loads(self):
+        import matplotlib.pyplot as plt
+
         f_z_stat_avg = 0.25 * self.driverobj.carobj.pars_general["m"] * self.driverobj.carobj.pars_general["g"]
 
         f_z_dyn_valid = f_z_stat_avg * 3.0
@@ -950,6 +1218,8 @@ class Lap(object):
         plt.show()
 
     def plot_aero_forces(self):
+        import matplotlib.pyplot as plt
+
         c_z_a_f = self.driverobj.carobj.pars_general["c_z_a_f"]
         c_z_a_r = self.driverobj.carobj.pars_general["c_z_a_r"]
         c_w_a = self.driverobj.carobj.pars_general["c_w_a"]
@@ -973,6 +1243,8 @@ class Lap(object):
         plt.show()
 
     def plot_enginespeed_gears(self):
+        import matplotlib.pyplot as plt
+
         fig, (ax1, ax2) = plt.subplots(nrows=2, ncols=1, sharex=True)
         fig.suptitle("Engine speed and gear selection")
 
@@ -989,6 +1261,8 @@ class Lap(object):
         plt.show()
 
     def plot_overview(self):
+        import matplotlib.pyplot as plt
+
         # set bigger font size
         plt.rcParams["font.size"] = 16.0
 
@@ -1089,7 +1363,7 @@ class Lap(object):
         # plot velocity dependent colors into track map
         cmap = plt.get_cmap("RdYlGn")
         normalize = plt.Normalize(vmin=-np.amax(self.vel_cl), vmax=-np.amin(self.vel_cl))
-        colors = [cmap(normalize(cur_vel)) for cur_vel in -self.vel_cl[:-1]]
+        colors = cmap(normalize(-self.vel_cl[:-1]))
         ax1.scatter(self.trackobj.raceline[:, 0], self.trackobj.raceline[:, 1], c=colors, s=5)
 
         plt.axis("equal")
@@ -1124,6 +1398,8 @@ class Lap(object):
         plt.rcParams["font.size"] = 10.0
 
     def plot_revs_gears(self):
+        import matplotlib.pyplot as plt
+
         # --------------------------------------------------------------------------------------------------------------
         # REVS AND GEARS -----------------------------------------------------------------------------------------------
         # --------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,861 @@
+import numpy as np
+import math
+from laptimesim.src.track import Track
+from laptimesim.src.driver import Driver
+from laptimesim.src import fbplus_kernel
+from laptimesim.src.fbplus_kernel import (
+    M, G, LF, LR, F_ROLL, C_W_A, RHO_AIR, DRS_FACTOR, ETA_G, POW_E_MOTOR, ETA_E_MOTOR, ETA_E_MOTOR_RE,
+    TORQUE_E_MOTOR_MAX, TIRE_CIRC_REF, TIRE_MODEL_EXP, TOPOLOGY
+)
+
+
+# element-wise power of the tire model: with numba, math.pow is evaluated in a compiled ufunc, i.e. the results are
+# bit-exact to the scalar solver in lap.py. Otherwise np.power is used, which differs from math.pow (libm) in the last
+# digit for some inputs (e.g. np.power(x, 2.0) is evaluated as x * x), i.e. the results differ slightly.
+if fbplus_kernel.NUMBA_AVAILABLE:
+    _pow = fbplus_kernel.numba.vectorize(["float64(float64, float64)"], cache=True)(lambda x, y: math.pow(x, y))
+else:
+    _pow = np.power
+
+
+class LapBatch(object):
+    """
+    author:
+    E-lemons team (based on the solver in lap.py by Alexander Heilmeier)
+
+    .. description::
+    The class provides the FB+ solver of lap.py for a batch of N electric cars at once. All cars drive the same track
+    discretization, therefore, the car parameters are stacked into parameter matrices and the velocity profiles of all
+    cars are advanced together. Every car has its own current point and state (accelerating or braking), the physics
+    are evaluated for all cars in the same state at once using masks. This amortizes the python overhead of the solver
+    across the whole batch. The results are the same as for N separate Lap objects (except for rounding in the last
+    digits).
+
+    Restrictions compared to lap.py: electric cars only, energy management strategy FCFB without lift and coast (i.e.
+    the sensitivity analysis setup), the recuperated energy per lap is not limited, the maximum longitudinal
+    acceleration is always determined by the binary search (calc_max_ax_mode "search").
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # SLOTS ------------------------------------------------------------------------------------------------------------
+    # ------------------------------------------------------------------------------------------------------------------
+
+    __slots__ = ("__carobjs",
+                 "__trackobj",
+                 "__pars_driver",
+                 "__pars_solver",
+                 "__debug_opts",
+                 "__throttle_pos",
+                 "__car_pars",
+                 "__f_z_calc_stat",
+                 "__pars_tires",
+                 "__i_trans",
+                 "__vel_shift",
+                 "__e_i",
+                 "__vel_max_cornering",
+                 "__t_cl",
+                 "__vel_cl",
+                 "__n_cl",
+                 "__m_eng",
+                 "__m_e_motor",
+                 "__m_requ",
+                 "__es_cl",
+                 "__gear_cl",
+                 "__e_rec_e_motor",
+                 "__a_x_final",
+                 "__e_cons_cl",
+                 "__tire_loads",
+                 "__e_motor_power")
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # CONSTRUCTOR ------------------------------------------------------------------------------------------------------
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self, carobjs: list, pars_driver: dict, trackobj: Track, pars_solver: dict, debug_opts: dict):
+
+        # check inputs
+        if not all(carobj.powertrain_type == "electric" for carobj in carobjs):
+            raise IOError("LapBatch only supports electric cars!")
+
+        if pars_driver["em_strategy"] != "FCFB" or pars_driver["use_lift_coast"]:
+            raise IOError("LapBatch only supports the FCFB energy management strategy without lift and coast!")
+
+        if len({carobj.pars_gearbox["i_trans"].size for carobj in carobjs}) != 1:
+            raise IOError("All cars of a batch must have the same number of gears!")
+
+        # save car and track objects as well as parameters
+        self.carobjs = carobjs
+        self.trackobj = trackobj
+        self.pars_driver = pars_driver
+        self.pars_solver = pars_solver
+        self.debug_opts = debug_opts
+
+        # adjust solver parameters
+        if self.trackobj.pars_track["use_pit"]:
+            # v_start is defined by pit speed limit
+            self.pars_solver["v_start"] = self.trackobj.pars_track["pitspeed"]
+            self.pars_solver["find_v_start"] = False
+
+        # throttle position is the same for all cars (yellow flags)
+        self.throttle_pos = Driver(carobj=carobjs[0],
+                                   pars_driver=pars_driver,
+                                   trackobj=trackobj,
+                                   stepsize=trackobj.stepsize).throttle_pos
+
+        # stack car parameters: N x NO_CAR_PARS (see fbplus_kernel), N x 4 x 4, N x 5 x 4 and N x no_gears
+        self.car_pars = np.vstack([fbplus_kernel.pack_car_pars(carobj=carobj) for carobj in carobjs])
+        self.f_z_calc_stat = np.stack([carobj.f_z_calc_stat_vec for carobj in carobjs])
+        self.pars_tires = np.stack([carobj.pars_tires_vec for carobj in carobjs])
+        self.i_trans = np.vstack([carobj.pars_gearbox["i_trans"] for carobj in carobjs]).astype(float)
+        self.e_i = np.vstack([carobj.pars_gearbox["e_i"] for carobj in carobjs]).astype(float)
+        self.vel_shift = np.vstack([carobj.vel_shift for carobj in carobjs])
+
+        # maximum cornering velocities of all cars (N x no_points)
+        self.vel_max_cornering = np.vstack([carobj.v_max_cornering_profile(
+            kappa=trackobj.kappa,
+            mu=trackobj.mu,
+            vel_subtr_corner=pars_driver["vel_subtr_corner"]) for carobj in carobjs])
+
+        # initialize lap variables (one row per car, see Lap)
+        self.reset_lap()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # GETTERS / SETTERS ------------------------------------------------------------------------------------------------
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def __get_carobjs(self) -> list: return self.__carobjs
+    def __set_carobjs(self, x: list) -> None: self.__carobjs = x
+    carobjs = property(__get_carobjs, __set_carobjs)
+
+    def __get_trackobj(self) -> Track: return self.__trackobj
+    def __set_trackobj(self, x: Track) -> None: self.__trackobj = x
+    trackobj = property(__get_trackobj, __set_trackobj)
+
+    def __get_pars_driver(self) -> dict: return self.__pars_driver
+    def __set_pars_driver(self, x: dict) -> None: self.__pars_driver = x
+    pars_driver = property(__get_pars_driver, __set_pars_driver)
+
+    def __get_pars_solver(self) -> dict: return self.__pars_solver
+    def __set_pars_solver(self, x: dict) -> None: self.__pars_solver = x
+    pars_solver = property(__get_pars_solver, __set_pars_solver)
+
+    def __get_debug_opts(self) -> dict: return self.__debug_opts
+    def __set_debug_opts(self, x: dict) -> None: self.__debug_opts = x
+    debug_opts = property(__get_debug_opts, __set_debug_opts)
+
+    def __get_throttle_pos(self) -> np.ndarray: return self.__throttle_pos
+    def __set_throttle_pos(self, x: np.ndarray) -> None: self.__throttle_pos = x
+    throttle_pos = property(__get_throttle_pos, __set_throttle_pos)
+
+    def __get_car_pars(self) -> np.ndarray: return self.__car_pars
+    def __set_car_pars(self, x: np.ndarray) -> None: self.__car_pars = x
+    car_pars = property(__get_car_pars, __set_car_pars)
+
+    def __get_f_z_calc_stat(self) -> np.ndarray: return self.__f_z_calc_stat
+    def __set_f_z_calc_stat(self, x: np.ndarray) -> None: self.__f_z_calc_stat = x
+    f_z_calc_stat = property(__get_f_z_calc_stat, __set_f_z_calc_stat)
+
+    def __get_pars_tires(self) -> np.ndarray: return self.__pars_tires
+    def __set_pars_tires(self, x: np.ndarray) -> None: self.__pars_tires = x
+    pars_tires = property(__get_pars_tires, __set_pars_tires)
+
+    def __get_i_trans(self) -> np.ndarray: return self.__i_trans
+    def __set_i_trans(self, x: np.ndarray) -> None: self.__i_trans = x
+    i_trans = property(__get_i_trans, __set_i_trans)
+
+    def __get_vel_shift(self) -> np.ndarray: return self.__vel_shift
+    def __set_vel_shift(self, x: np.ndarray) -> None: self.__vel_shift = x
+    vel_shift = property(__get_vel_shift, __set_vel_shift)
+
+    def __get_e_i(self) -> np.ndarray: return self.__e_i
+    def __set_e_i(self, x: np.ndarray) -> None: self.__e_i = x
+    e_i = property(__get_e_i, __set_e_i)
+
+    def __get_vel_max_cornering(self) -> np.ndarray: return self.__vel_max_cornering
+    def __set_vel_max_cornering(self, x: np.ndarray) -> None: self.__vel_max_cornering = x
+    vel_max_cornering = property(__get_vel_max_cornering, __set_vel_max_cornering)
+
+    def __get_t_cl(self) -> np.ndarray: return self.__t_cl
+    def __set_t_cl(self, x: np.ndarray) -> None: self.__t_cl = x
+    t_cl = property(__get_t_cl, __set_t_cl)
+
+    def __get_vel_cl(self) -> np.ndarray: return self.__vel_cl
+    def __set_vel_cl(self, x: np.ndarray) -> None: self.__vel_cl = x
+    vel_cl = property(__get_vel_cl, __set_vel_cl)
+
+    def __get_n_cl(self) -> np.ndarray: return self.__n_cl
+    def __set_n_cl(self, x: np.ndarray) -> None: self.__n_cl = x
+    n_cl = property(__get_n_cl, __set_n_cl)
+
+    def __get_m_eng(self) -> np.ndarray: return self.__m_eng
+    def __set_m_eng(self, x: np.ndarray) -> None: self.__m_eng = x
+    m_eng = property(__get_m_eng, __set_m_eng)
+
+    def __get_m_e_motor(self) -> np.ndarray: return self.__m_e_motor
+    def __set_m_e_motor(self, x: np.ndarray) -> None: self.__m_e_motor = x
+    m_e_motor = property(__get_m_e_motor, __set_m_e_motor)
+
+    def __get_m_requ(self) -> np.ndarray: return self.__m_requ
+    def __set_m_requ(self, x: np.ndarray) -> None: self.__m_requ = x
+    m_requ = property(__get_m_requ, __set_m_requ)
+
+    def __get_es_cl(self) -> np.ndarray: return self.__es_cl
+    def __set_es_cl(self, x: np.ndarray) -> None: self.__es_cl = x
+    es_cl = property(__get_es_cl, __set_es_cl)
+
+    def __get_gear_cl(self) -> np.ndarray: return self.__gear_cl
+    def __set_gear_cl(self, x: np.ndarray) -> None: self.__gear_cl = x
+    gear_cl = property(__get_gear_cl, __set_gear_cl)
+
+    def __get_e_rec_e_motor(self) -> np.ndarray: return self.__e_rec_e_motor
+    def __set_e_rec_e_motor(self, x: np.ndarray) -> None: self.__e_rec_e_motor = x
+    e_rec_e_motor = property(__get_e_rec_e_motor, __set_e_rec_e_motor)
+
+    def __get_a_x_final(self) -> np.ndarray: return self.__a_x_final
+    def __set_a_x_final(self, x: np.ndarray) -> None: self.__a_x_final = x
+    a_x_final = property(__get_a_x_final, __set_a_x_final)
+
+    def __get_e_cons_cl(self) -> np.ndarray: return self.__e_cons_cl
+    def __set_e_cons_cl(self, x: np.ndarray) -> None: self.__e_cons_cl = x
+    e_cons_cl = property(__get_e_cons_cl, __set_e_cons_cl)
+
+    def __get_tire_loads(self) -> np.ndarray: return self.__tire_loads
+    def __set_tire_loads(self, x: np.ndarray) -> None: self.__tire_loads = x
+    tire_loads = property(__get_tire_loads, __set_tire_loads)
+
+    def __get_e_motor_power(self) -> np.ndarray: return self.__e_motor_power
+    def __set_e_motor_power(self, x: np.ndarray) -> None: self.__e_motor_power = x
+    e_motor_power = property(__get_e_motor_power, __set_e_motor_power)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # METHODS (CALCULATIONS) -------------------------------------------------------------------------------------------
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def reset_lap(self):
+        no_cars = len(self.carobjs)
+        no_points = self.trackobj.no_points
+        no_points_cl = self.trackobj.no_points_cl
+
+        self.t_cl = np.zeros((no_cars, no_points_cl))
+        self.vel_cl = np.zeros((no_cars, no_points_cl))
+        self.n_cl = np.zeros((no_cars, no_points_cl))
+        self.m_eng = np.zeros((no_cars, no_points))
+        self.m_e_motor = np.zeros((no_cars, no_points))
+        self.m_requ = np.zeros((no_cars, no_points))
+        self.es_cl = np.zeros((no_cars, no_points_cl))
+        self.gear_cl = np.zeros((no_cars, no_points_cl), dtype=int)
+        self.e_rec_e_motor = np.zeros((no_cars, no_points))
+        self.a_x_final = np.zeros(no_cars)
+        self.e_cons_cl = np.zeros((no_cars, no_points_cl))
+        self.tire_loads = np.zeros((no_cars, no_points, 4))
+        self.e_motor_power = np.zeros((no_cars, no_points))
+
+    def simulate_lap(self):
+        """
+        Main method used to simulate the lap for all cars (see Lap.simulate_lap). Solver calls: 1) initial call, 2)
+        second call starting with the proper start velocity of every car based on the previous result (if desired).
+        """
+
+        if self.debug_opts["use_print"]:
+            print("-" * 50)
+            print("Starting batch solver run (1) for %i cars" % len(self.carobjs))
+
+        self.__fbplus(v_start=np.full(len(self.carobjs), float(self.pars_solver["v_start"])),
+                      a_x_start=np.zeros(len(self.carobjs)))
+
+        if self.pars_solver["find_v_start"]:
+            if self.debug_opts["use_print"]:
+                print("Starting batch solver run (2) (considering new start velocity)")
+
+            self.__fbplus(v_start=self.vel_cl[:, -1].copy(),
+                          a_x_start=self.a_x_final.copy())
+
+        if self.debug_opts["use_print"]:
+            print("Finished batch solver calculations")
+
+        # energy consumption (see CarElectric.e_cons)
+        be_w = self.__power_demand_e_motor_drive(inds=slice(None),
+                                                 n=self.n_cl[:, :-1],
+                                                 m_e_motor=self.m_e_motor)
+        self.e_cons_cl = np.zeros(self.t_cl.shape)
+        self.e_cons_cl[:, 1:] = np.cumsum(np.diff(self.t_cl, axis=1) * be_w, axis=1)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # METHODS (BATCHED CAR PHYSICS) ------------------------------------------------------------------------------------
+    # ------------------------------------------------------------------------------------------------------------------
+
+    """All following methods evaluate the car physics of the cars given by the index array inds (one value per car),
+    see the corresponding methods in car.py and car_electric.py."""
+
+    def __tire_force_pots(self, inds: np.ndarray, vel: np.ndarray, a_x: np.ndarray, a_y: np.ndarray,
+                          mu: np.ndarray) -> tuple:
+        """Returns f_x_pot, f_y_pot and f_z as arrays of size K x 4 (wheels [FL, FR, RL, RR])."""
+
+        f_z_calc_stat = self.f_z_calc_stat[inds]
+        pars_tires = self.pars_tires[inds]
+
+        f_z = (f_z_calc_stat[:, 0]
+               + a_x[:, None] * f_z_calc_stat[:, 1]
+               + a_y[:, None] * f_z_calc_stat[:, 2]
+               + (vel * vel)[:, None] * f_z_calc_stat[:, 3])
+
+        np.maximum(f_z, 30.0, out=f_z)
+
+        f_x_pot = mu[:, None] * (pars_tires[:, 0] + pars_tires[:, 2] * (f_z - pars_tires[:, 4])) * f_z
+        f_y_pot = mu[:, None] * (pars_tires[:, 1] + pars_tires[:, 3] * (f_z - pars_tires[:, 4])) * f_z
+
+        return f_x_pot, f_y_pot, f_z
+
+    def __calc_lat_forces(self, inds: np.ndarray, a_y: np.ndarray) -> tuple:
+        car_pars = self.car_pars[inds]
+
+        f_y = car_pars[:, M] * a_y
+        f_y_f = f_y * car_pars[:, LR] / (car_pars[:, LF] + car_pars[:, LR])
+        f_y_r = f_y * car_pars[:, LF] / (car_pars[:, LF] + car_pars[:, LR])
+
+        return f_y_f, f_y_r
+
+    def __calc_f_x_pot(self, inds: np.ndarray, f_x_pot: np.ndarray, f_y_pot: np.ndarray, f_y_f: np.ndarray,
+                       f_y_r: np.ndarray, force_use_all_wheels: bool, limit_braking_weak_side: None or str) \
+            -> np.ndarray:
+        car_pars = self.car_pars[inds]
+        exp_tmp = car_pars[:, TIRE_MODEL_EXP]
+
+        # determine axle potentials
+        if limit_braking_weak_side in ["FA", "all"]:
+            f_x_pot_f = 2 * np.minimum(f_x_pot[:, 0], f_x_pot[:, 1])
+        else:
+            f_x_pot_f = f_x_pot[:, 0] + f_x_pot[:, 1]
+
+        if limit_braking_weak_side in ["RA", "all"]:
+            f_x_pot_r = 2 * np.minimum(f_x_pot[:, 2], f_x_pot[:, 3])
+        else:
+            f_x_pot_r = f_x_pot[:, 2] + f_x_pot[:, 3]
+
+        # calculate radicands of the tire model and check if below zero
+        radicand_f = np.maximum(1 - _pow(np.abs(f_y_f) / (f_y_pot[:, 0] + f_y_pot[:, 1]), exp_tmp), 0.0)
+        radicand_r = np.maximum(1 - _pow(np.abs(f_y_r) / (f_y_pot[:, 2] + f_y_pot[:, 3]), exp_tmp), 0.0)
+
+        f_x_poss_f = f_x_pot_f * _pow(radicand_f, 1.0 / exp_tmp)
+        f_x_poss_r = f_x_pot_r * _pow(radicand_r, 1.0 / exp_tmp)
+
+        # calculate remaining force potential depending on the driven axle(s)
+        if force_use_all_wheels:
+            return f_x_poss_f + f_x_poss_r
+
+        return np.where(car_pars[:, TOPOLOGY] == fbplus_kernel.TOPOLOGY_CODES["AWD"],
+                        f_x_poss_f + f_x_poss_r,
+                        np.where(car_pars[:, TOPOLOGY] == fbplus_kernel.TOPOLOGY_CODES["FWD"], f_x_poss_f, f_x_poss_r))
+
+    def __calc_max_ax(self, inds: np.ndarray, vel: np.ndarray, a_y: np.ndarray, mu: np.ndarray, f_y_f: np.ndarray,
+                      f_y_r: np.ndarray) -> np.ndarray:
+        """Binary search of Car.calc_max_ax executed for all cars at once."""
+
+        a_x_range = np.linspace(0.0, 25.0, 101)
+
+        ind_first = np.zeros(inds.size, dtype=int)
+        ind_last = np.full(inds.size, a_x_range.size - 1)
+        ind_mid = (ind_first + ind_last + 1) // 2
+
+        active = np.flatnonzero(ind_first != ind_last)
+
+        while active.size > 0:
+            _, f_y_pot, _ = self.__tire_force_pots(inds=inds[active],
+                                                   vel=vel[active],
+                                                   a_x=a_x_range[ind_mid[active]],
+                                                   a_y=a_y[active],
+                                                   mu=mu[active])
+
+            potential_left = np.logical_and(np.abs(f_y_f[active]) <= f_y_pot[:, 0] + f_y_pot[:, 1],
+                                            np.abs(f_y_r[active]) <= f_y_pot[:, 2] + f_y_pot[:, 3])
+
+            ind_first[active[potential_left]] = ind_mid[active[potential_left]]
+            ind_last[active[~potential_left]] = ind_mid[active[~potential_left]] - 1
+            ind_mid[active] = (ind_first[active] + ind_last[active] + 1) // 2
+
+            active = active[ind_first[active] != ind_last[active]]
+
+        return a_x_range[ind_mid]
+
+    def __circumref_driven_tire(self, inds: np.ndarray, vel: np.ndarray) -> np.ndarray:
+        return self.car_pars[inds, TIRE_CIRC_REF] * (1 + (vel * 3.6 - 60.0) * (0.045 / 200.0))
+
+    def __r_driven_tire(self, inds: np.ndarray, vel: np.ndarray) -> np.ndarray:
+        return self.__circumref_driven_tire(inds=inds, vel=vel) / (2 * math.pi)
+
+    def __find_gear(self, inds: np.ndarray, vel: np.ndarray) -> tuple:
+        """inds and vel can also be 2D arrays (e.g. K x no_points) as long as their shapes match."""
+
+        # first gear whose shift velocity is above the velocity (see Car.find_gear), do not shift up if max rev in
+        # final gear is reached
+        gear_ind = np.minimum(np.sum(vel[..., None] >= self.vel_shift[inds], axis=-1), self.vel_shift.shape[1] - 1)
+
+        return gear_ind, vel / (self.__circumref_driven_tire(inds=inds, vel=vel) * self.i_trans[inds, gear_ind])
+
+    def __air_res(self, inds: np.ndarray, vel: np.ndarray, drs: np.ndarray) -> np.ndarray:
+        car_pars = self.car_pars[inds]
+
+        return np.where(drs,
+                        0.5 * (1.0 - car_pars[:, DRS_FACTOR]) * car_pars[:, C_W_A] * car_pars[:, RHO_AIR] * (vel * vel),
+                        0.5 * car_pars[:, C_W_A] * car_pars[:, RHO_AIR] * (vel * vel))
+
+    def __calc_torque_distr_f_x(self, inds: np.ndarray, f_x: np.ndarray, n: np.ndarray, throttle_pos: np.ndarray,
+                                vel: np.ndarray) -> tuple:
+        """Returns m_requ and m_e_motor (see CarElectric.calc_torque_distr_f_x)."""
+
+        car_pars = self.car_pars[inds]
+
+        # calculate required torque to reach f_x
+        gear = self.__find_gear(inds=inds, vel=vel)[0]
+        m_requ = (f_x * self.__r_driven_tire(inds=inds, vel=vel) * self.i_trans[inds, gear] * self.e_i[inds, gear]
+                  / car_pars[:, ETA_G])
+
+        # get torque potential of e motor
+        e_motor_torque_max = np.minimum(car_pars[:, POW_E_MOTOR] * car_pars[:, ETA_E_MOTOR] / (2 * math.pi * n),
+                                        car_pars[:, TORQUE_E_MOTOR_MAX])
+
+        m_e_motor = np.where(m_requ <= e_motor_torque_max, throttle_pos * m_requ, throttle_pos * e_motor_torque_max)
+
+        return m_requ, m_e_motor
+
+    def __power_demand_e_motor_drive(self, inds: np.ndarray or slice, n: np.ndarray,
+                                     m_e_motor: np.ndarray) -> np.ndarray:
+        """inds, n and m_e_motor can also be 2D arrays (e.g. K x no_points)."""
+
+        eta_e_motor = self.car_pars[inds, ETA_E_MOTOR]
+
+        if n.ndim == 2 and eta_e_motor.ndim == 1:
+            eta_e_motor = eta_e_motor[:, None]
+
+        return (2 * math.pi * n * m_e_motor) / eta_e_motor
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # SOLVER -----------------------------------------------------------------------------------------------------------
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def __fbplus(self, v_start: np.ndarray, a_x_start: np.ndarray):
+        """
+        Batched version of Lap.__fbplus, v_start and a_x_start contain one value per car. Returned arrays t_cl, vel_cl,
+        n_cl, es_cl and gear_cl are closed, the rest is unclosed.
+        """
+
+        # loop options
+        tol = 1e-2          # [m/s] termination criterion
+
+        # car states
+        state_fwd = 0       # forward calculation (accelerating)
+        state_bwd = 1       # backward iterations (braking)
+        state_done = 2      # end of lap reached
+
+        no_cars = len(self.carobjs)
+        no_points = self.trackobj.no_points
+        stepsize = self.trackobj.stepsize
+        regen_only = self.pars_driver["disable_braking"]
+
+        kappa = self.trackobj.kappa
+        mu = self.trackobj.mu
+        vel_lim = self.trackobj.vel_lim
+        vel_lim_cl = np.append(vel_lim, vel_lim[0])
+        drs = np.asarray(self.trackobj.drs, dtype=bool)
+
+        m = self.car_pars[:, M]
+        g = self.car_pars[:, G]
+        f_roll = self.car_pars[:, F_ROLL]
+
+        # force required to overcome the elevation change to the next point (one row per car)
+        f_x_grade = self.trackobj.calc_grade_forces(m=m[:, np.newaxis], g=g[:, np.newaxis])
+
+        self.e_rec_e_motor[:] = 0.0  # must be reset for every run
+
+        # --------------------------------------------------------------------------------------------------------------
+        # SET START CONDITIONS -----------------------------------------------------------------------------------------
+        # --------------------------------------------------------------------------------------------------------------
+
+        all_cars = np.arange(no_cars)
+
+        self.vel_cl[:, 0] = v_start
+        self.es_cl[:, 0] = self.pars_driver["initial_energy"]
+        self.gear_cl[:, 0], self.n_cl[:, 0] = self.__find_gear(inds=all_cars, vel=self.vel_cl[:, 0])
+
+        i = np.zeros(no_cars, dtype=int)     # current point of every car
+        j = np.zeros(no_cars, dtype=int)     # current backward step of every car
+        a_x = np.asarray(a_x_start, dtype=float).copy()
+        state = np.full(no_cars, state_fwd)
+
+        while np.any(state != state_done):
+            # ----------------------------------------------------------------------------------------------------------
+            # CARS IN FORWARD CALCULATION ------------------------------------------------------------------------------
+            # ----------------------------------------------------------------------------------------------------------
+
+            cars = np.flatnonzero(state == state_fwd)
+
+            if cars.size > 0:
+                i_c = i[cars]
+                vel = self.vel_cl[cars, i_c]
+
+                # calculate currently acting lateral acceleration and forces
+                a_y = vel * vel * kappa[i_c]
+                f_y_f, f_y_r = self.__calc_lat_forces(inds=cars, a_y=a_y)
+
+                # calculate tire force potentials (using a_x = 0.0 (maximum cornering) to find out if we can stay on
+                # track)
+                _, f_y_pot, f_z = self.__tire_force_pots(inds=cars, vel=vel, a_x=np.zeros(cars.size), a_y=a_y,
+                                                         mu=mu[i_c])
+                self.tire_loads[cars, i_c] = f_z
+
+                acc = np.logical_and.reduce((np.abs(f_y_f) <= f_y_pot[:, 0] + f_y_pot[:, 1],
+                                             np.abs(f_y_r) <= f_y_pot[:, 2] + f_y_pot[:, 3],
+                                             vel <= vel_lim[i_c]))
+
+                # CASE 1: some tire potential is left and no velocity limit is set -> accelerate
+                if np.any(acc):
+                    self.__forward_step(cars=cars[acc], i_c=i_c[acc], a_y=a_y[acc], f_y_f=f_y_f[acc],
+                                        f_y_r=f_y_r[acc], a_x=a_x, vel_lim=vel_lim, vel_lim_cl=vel_lim_cl, drs=drs,
+                                        f_x_grade=f_x_grade)
+
+                    i[cars[acc]] += 1
+                    state[cars[acc][i[cars[acc]] >= no_points]] = state_done
+
+                # CASE 2: lateral force is greater than poss. tot. tire force of an axle or speed limit must be kept
+                brk = cars[~acc]
+
+                if brk.size > 0:
+                    if np.any(i[brk] == 1):
+                        raise RuntimeError("Reduce start velocity! (it could be that braking would affect points within"
+                                           " the previous lap)")
+
+                    # get maximum current velocity depending on speed limit or lateral acceleration limit
+                    self.vel_cl[brk, i[brk]] = np.minimum(self.vel_max_cornering[brk, i[brk]], vel_lim[i[brk]])
+
+                    j[brk] = 0
+                    a_x[brk] = 0.0
+                    state[brk] = state_bwd
+
+            # ----------------------------------------------------------------------------------------------------------
+            # CARS IN BACKWARD ITERATIONS ------------------------------------------------------------------------------
+            # ----------------------------------------------------------------------------------------------------------
+
+            cars = np.flatnonzero(state == state_bwd)
+
+            if cars.size > 0:
+                ind_prev = i[cars] - j[cars] - 1    # point for which the velocity is determined
+                ind_cur = i[cars] - j[cars]
+
+                vel_tmp = self.vel_cl[cars, ind_cur].copy()
+                vel_tmp_old = np.zeros(cars.size)
+                vels_tmp_sum = np.zeros(cars.size)
+                vels_tmp_no = 0
+                tire_loads_tmp = np.zeros((cars.size, 4))
+
+                # all cars iterate together until every car converged
+                active = np.flatnonzero(np.abs(vel_tmp - vel_tmp_old) > tol)
+
+                while active.size > 0:
+                    vels_tmp_no += 1
+                    cars_a = cars[active]
+                    ind_prev_a = ind_prev[active]
+                    vel_tmp_old[active] = vel_tmp[active]
+
+                    # calculate lat. acceleration and forces with temporary stored velocity and previous curvature
+                    a_y = vel_tmp[active] * vel_tmp[active] * kappa[ind_prev_a]
+                    f_y_f, f_y_r = self.__calc_lat_forces(inds=cars_a, a_y=a_y)
+
+                    # calculate tire force potentials
+                    f_x_pot, f_y_pot, tire_loads_tmp[active] = self.__tire_force_pots(inds=cars_a,
+                                                                                      vel=vel_tmp[active],
+                                                                                      a_x=a_x[cars_a],
+                                                                                      a_y=a_y,
+                                                                                      mu=mu[ind_prev_a])
+
+                    # calculate remaining tire potential for deceleration (see Lap.__fbplus)
+                    if regen_only:
+                        f_x_poss = self.__calc_f_x_pot(inds=cars_a, f_x_pot=f_x_pot, f_y_pot=f_y_pot, f_y_f=f_y_f,
+                                                       f_y_r=f_y_r, force_use_all_wheels=False,
+                                                       limit_braking_weak_side=None)
+
+                        # limit the deceleration force to the motor capabilities
+                        f_x_poss_torque = (self.car_pars[cars_a, TORQUE_E_MOTOR_MAX]
+                                           / self.car_pars[cars_a, ETA_G]
+                                           / (self.i_trans[cars_a, self.gear_cl[cars_a, ind_prev_a]]
+                                              * self.__r_driven_tire(inds=cars_a, vel=self.vel_cl[cars_a, ind_prev_a])
+                                              * self.e_i[cars_a, self.gear_cl[cars_a, ind_prev_a]]))
+
+                        f_x_poss_power = (self.car_pars[cars_a, POW_E_MOTOR]
+                                          / self.car_pars[cars_a, ETA_E_MOTOR_RE]
+                                          / self.car_pars[cars_a, ETA_G]
+                                          / vel_tmp[active])
+
+                        f_x_poss = np.minimum(np.minimum(f_x_poss, f_x_poss_torque), f_x_poss_power)
+
+                    else:
+                        f_x_poss = self.__calc_f_x_pot(inds=cars_a, f_x_pot=f_x_pot, f_y_pot=f_y_pot, f_y_f=f_y_f,
+                                                       f_y_r=f_y_r, force_use_all_wheels=True,
+                                                       limit_braking_weak_side=self.pars_solver[
+                                                           "limit_braking_weak_side"])
+
+                    # account for the force due to change in elevation
+                    f_x_poss = f_x_poss + f_x_grade[cars_a, ind_prev_a]
+
+                    # calculate deceleration
+                    f_z_tot = (tire_loads_tmp[active, 0] + tire_loads_tmp[active, 1] + tire_loads_tmp[active, 2]
+                               + tire_loads_tmp[active, 3])
+                    a_x[cars_a] = (-(f_x_poss + self.__air_res(inds=cars_a, vel=vel_tmp[active], drs=False)
+                                     + f_z_tot * f_roll[cars_a])
+                                   / m[cars_a])
+
+                    # calculate previous velocity and use the average of all values as applied velocity (all active
+                    # cars did the same number of iterations so far)
+                    vels_tmp_sum[active] += np.sqrt(self.vel_cl[cars_a, ind_cur[active]]
+                                                    * self.vel_cl[cars_a, ind_cur[active]]
+                                                    + 2 * -a_x[cars_a] * stepsize)
+                    vel_tmp[active] = vels_tmp_sum[active] / vels_tmp_no
+
+                    active = active[np.abs(vel_tmp[active] - vel_tmp_old[active]) > tol]
+
+                # check if the calculated velocity is greater than the original one -> backward iterations finished
+                finished = vel_tmp >= self.vel_cl[cars, ind_prev]
+
+                upd = ~finished
+                self.vel_cl[cars[upd], ind_prev[upd]] = vel_tmp[upd]
+                self.tire_loads[cars[upd], ind_prev[upd]] = tire_loads_tmp[upd]
+                j[cars[upd]] += 1
+
+                if np.any(i[cars[upd]] - j[cars[upd]] - 1 < 0):
+                    raise RuntimeError("Reduce start velocity (it could be that braking would affect points within"
+                                       " the previous lap)!")
+
+                # recalculation of the remaining data for the cars with a finished velocity profile
+                for car in cars[finished]:
+                    self.__recalc_braking_zone(car=car, ind_first=i[car] - j[car] - 1, ind_last=i[car], drs=drs,
+                                               f_x_grade=f_x_grade)
+
+                    # reset longitudinal acceleration for next step (almost zero during maximum cornering)
+                    a_x[car] = 0.0
+                    state[car] = state_fwd
+
+        # --------------------------------------------------------------------------------------------------------------
+        # PREPARE FOR RETURN -------------------------------------------------------------------------------------------
+        # --------------------------------------------------------------------------------------------------------------
+
+        # return real instead of index based gear values
+        self.gear_cl = self.gear_cl + 1
+
+        # save final a_x values for a possible recalculation of the lap
+        self.a_x_final = a_x
+
+    def __forward_step(self, cars: np.ndarray, i_c: np.ndarray, a_y: np.ndarray, f_y_f: np.ndarray,
+                       f_y_r: np.ndarray, a_x: np.ndarray, vel_lim: np.ndarray, vel_lim_cl: np.ndarray,
+                       drs: np.ndarray, f_x_grade: np.ndarray):
+        """Forward step (case 1 in Lap.__fbplus) for all given cars at their current points i_c. a_x contains the
+        values of all cars and is updated in place."""
+
+        stepsize = self.trackobj.stepsize
+        mu = self.trackobj.mu[i_c]
+        vel = self.vel_cl[cars, i_c]
+        m = self.car_pars[cars, M]
+
+        # obtain maximum longitudinal acceleration
+        a_x_max = self.__calc_max_ax(inds=cars, vel=vel, a_y=a_y, mu=mu, f_y_f=f_y_f, f_y_r=f_y_r)
+
+        # approximate current a_x for tire load calc. either based on previous iteration or based on a_x_max
+        a_x_c = np.where(a_x[cars] > 0.0, np.minimum(a_x[cars], a_x_max), a_x_max)
+
+        # recalculate tire force potentials based on approximated a_x
+        f_x_pot, f_y_pot, f_z = self.__tire_force_pots(inds=cars, vel=vel, a_x=a_x_c, a_y=a_y, mu=mu)
+        self.tire_loads[cars, i_c] = f_z
+        f_z_tot = f_z[:, 0] + f_z[:, 1] + f_z[:, 2] + f_z[:, 3]
+
+        # calculate remaining tire potential at front and rear axle for longitudinal force transmission
+        f_x_poss = self.__calc_f_x_pot(inds=cars, f_x_pot=f_x_pot, f_y_pot=f_y_pot, f_y_f=f_y_f, f_y_r=f_y_r,
+                                       force_use_all_wheels=False, limit_braking_weak_side=None)
+
+        # calculate torque distribution (trying to reach the possible force f_x)
+        throttle_pos = self.throttle_pos[i_c]
+        m_requ, m_e_motor = self.__calc_torque_distr_f_x(inds=cars, f_x=f_x_poss, n=self.n_cl[cars, i_c],
+                                                         throttle_pos=throttle_pos, vel=vel)
+        self.m_eng[cars, i_c] = 0.0
+
+        # calculate available acceleration force in powertrain
+        gear = self.gear_cl[cars, i_c]
+        f_x_powert = (self.car_pars[cars, ETA_G] * (0.0 + m_e_motor)
+                      / (self.i_trans[cars, gear] * self.__r_driven_tire(inds=cars, vel=vel) * self.e_i[cars, gear]))
+
+        # account for available force due to change in elevation
+        f_x_powert = f_x_powert - f_x_grade[cars, i_c]
+
+        # calculate reached longitudinal acceleration
+        a_x_c = ((f_x_powert - self.__air_res(inds=cars, vel=vel, drs=drs[i_c])
+                  - f_z_tot * self.car_pars[cars, F_ROLL])
+                 / m)
+
+        # calculate velocity in the next point
+        radicand = vel * vel + 2 * a_x_c * stepsize
+
+        if np.any(radicand < 0.0):
+            print("velocity: {}, a_x: {}, step_size: {}, result: {}"
+                  .format(vel[radicand < 0.0], a_x_c[radicand < 0.0], stepsize, radicand[radicand < 0.0]))
+            raise ValueError("math domain error")
+
+        vel_next = np.sqrt(radicand)
+
+        # consider velocity limit if reaching it during this step
+        lim = np.logical_and(vel <= vel_lim_cl[i_c + 1], vel_lim_cl[i_c + 1] < vel_next)
+
+        if np.any(lim):
+            # calculate a_x required to reach the velocity limit
+            a_x_c[lim] = ((vel_lim_cl[i_c[lim] + 1] * vel_lim_cl[i_c[lim] + 1] - vel[lim] * vel[lim])
+                          / (2 * stepsize))
+
+            f_x_target = (self.__air_res(inds=cars[lim], vel=vel[lim], drs=False)
+                          + f_z_tot[lim] * self.car_pars[cars[lim], F_ROLL]
+                          + m[lim] * a_x_c[lim])
+
+            m_requ[lim], m_e_motor[lim] = self.__calc_torque_distr_f_x(inds=cars[lim], f_x=f_x_target,
+                                                                       n=self.n_cl[cars[lim], i_c[lim]],
+                                                                       throttle_pos=throttle_pos[lim],
+                                                                       vel=vel[lim])
+
+            # set velocity accordingly
+            vel_next[lim] = vel_lim_cl[i_c[lim] + 1]
+
+        self.m_requ[cars, i_c] = m_requ
+        self.m_e_motor[cars, i_c] = m_e_motor
+        self.vel_cl[cars, i_c + 1] = vel_next
+        a_x[cars] = a_x_c
+
+        # check shifting -> calculate gear and rev in the next point
+        self.gear_cl[cars, i_c + 1], self.n_cl[cars, i_c + 1] = self.__find_gear(inds=cars, vel=vel_next)
+
+        # calculate time at start of next point
+        self.t_cl[cars, i_c + 1] = self.t_cl[cars, i_c] + 2 * stepsize / (vel + vel_next)
+
+        # calculate energy used by e motor during current step in [J] and changes in the energy storage
+        e_motor_power = self.__power_demand_e_motor_drive(inds=cars, n=self.n_cl[cars, i_c], m_e_motor=m_e_motor)
+        self.es_cl[cars, i_c + 1] = (self.es_cl[cars, i_c] + 0.0
+                                     - e_motor_power * (self.t_cl[cars, i_c + 1] - self.t_cl[cars, i_c]))
+        self.e_motor_power[cars, i_c] = e_motor_power
+
+    def __recalc_braking_zone(self, car: int, ind_first: int, ind_last: int, drs: np.ndarray,
+                              f_x_grade: np.ndarray):
+        """Recalculation of gears, times and energy related quantities of a single car after the backward iterations
+        (see Lap.__fbplus). ind_first is the last unchanged point, ind_last the current point."""
+
+        stepsize = self.trackobj.stepsize
+        car_pars = self.car_pars[car]
+        ks = np.arange(ind_first, ind_last)
+
+        # recalculate gears and revs for all changed points including current point
+        inds_changed = np.arange(ind_first + 1, ind_last + 1)
+        self.gear_cl[car, inds_changed], self.n_cl[car, inds_changed] = \
+            self.__find_gear(inds=np.full(inds_changed.size, car), vel=self.vel_cl[car, inds_changed])
+
+        # recalculate lap times starting from the last unchanged point (sequential summation as in Lap.__fbplus)
+        self.t_cl[car, ind_first:ind_last + 1] = np.cumsum(np.append(self.t_cl[car, ind_first],
+                                                                     2 * stepsize / (self.vel_cl[car, ks + 1]
+                                                                                     + self.vel_cl[car, ks])))
+
+        # calculate resistance force (DRS only in the first point, see Lap.__fbplus)
+        drs_tmp = np.zeros(ks.size, dtype=bool)
+        drs_tmp[0] = drs[ind_first]
+
+        inds_car = np.full(ks.size, car)
+        vel = self.vel_cl[car, ks]
+        vel_next = self.vel_cl[car, ks + 1]
+
+        f_x_resi = (self.__air_res(inds=inds_car, vel=vel, drs=drs_tmp)
+                    + (self.tire_loads[car, ks, 0] + self.tire_loads[car, ks, 1] + self.tire_loads[car, ks, 2]
+                       + self.tire_loads[car, ks, 3]) * car_pars[F_ROLL])
+
+        # calculate the force that must be provided by the powertrain (or brakes) for the given velocities
+        a_x_requ = (vel_next * vel_next - vel * vel) / (2 * stepsize)
+        f_x_powert = car_pars[M] * a_x_requ + f_x_resi + f_x_grade[car, ks]
+
+        es_delta = np.zeros(ks.size)
+
+        # engine demanded -> recalculate torque distribution and energy storage state
+        dem = f_x_powert > 0.0
+
+        if np.any(dem):
+            k_dem = ks[dem]
+            self.e_rec_e_motor[car, k_dem] = 0.0
+
+            m_requ, m_e_motor = self.__calc_torque_distr_f_x(inds=inds_car[dem], f_x=f_x_powert[dem],
+                                                             n=self.n_cl[car, k_dem],
+                                                             throttle_pos=self.throttle_pos[k_dem], vel=vel[dem])
+            self.m_requ[car, k_dem] = m_requ
+            self.m_e_motor[car, k_dem] = m_e_motor
+            self.m_eng[car, k_dem] = 0.0
+
+            # check torques provided and requested
+            for diff in (m_requ - m_e_motor)[~np.isclose(m_e_motor, m_requ, rtol=1e-9, atol=0.0)]:
+                print("WARNING: It seems like if the requested torque could not be supplied by the"
+                      + " powertrain (maybe because of energy storage changes during recalculation or because"
+                      + " the throttle position was set to 0.0 during EM strategy calculation). Be aware"
+                      + " that this fact is not considered and the further calculation is processed as if the"
+                      + " torque was supplied! The difference amounts to %.1f Nm." % diff)
+
+            es_delta[dem] = -(self.__power_demand_e_motor_drive(inds=inds_car[dem], n=self.n_cl[car, k_dem],
+                                                                m_e_motor=m_e_motor)
+                              * (self.t_cl[car, k_dem + 1] - self.t_cl[car, k_dem]))
+
+            # index ind_last is used here on purpose to keep the results identical to Lap.__fbplus
+            self.e_motor_power[car, ind_last] = self.__power_demand_e_motor_drive(
+                inds=np.array([car]),
+                n=self.n_cl[car, ind_last:ind_last + 1],
+                m_e_motor=self.m_e_motor[car, ind_last:ind_last + 1])[0]
+
+        # engine not demanded -> kinetic energy recuperation
+        rec = ~dem
+
+        if np.any(rec):
+            k_rec = ks[rec]
+            self.m_eng[car, k_rec] = 0.0
+            self.m_requ[car, k_rec] = 0.0
+
+            if self.pars_driver["use_recuperation"]:
+                e_rec_e_motor_tires = np.abs(f_x_powert[rec]) * stepsize
+
+                e_rec_e_motor_torque = (car_pars[TORQUE_E_MOTOR_MAX]
+                                        / car_pars[ETA_G]
+                                        / self.i_trans[car, self.gear_cl[car, k_rec]]
+                                        / self.__r_driven_tire(inds=inds_car[rec], vel=vel[rec])
+                                        * stepsize)
+
+                e_rec_e_motor_power = (car_pars[POW_E_MOTOR]
+                                       / car_pars[ETA_E_MOTOR_RE]
+                                       / car_pars[ETA_G]
+                                       * (self.t_cl[car, k_rec] - self.t_cl[car, k_rec - 1]))
+
+                e_rec_tmp = np.minimum(np.minimum(e_rec_e_motor_tires, e_rec_e_motor_torque), e_rec_e_motor_power)
+                self.e_rec_e_motor[car, k_rec] = e_rec_tmp * car_pars[ETA_G] * car_pars[ETA_E_MOTOR_RE]
+
+                self.e_motor_power[car, k_rec] = (-self.e_rec_e_motor[car, k_rec]
+                                                  / (self.t_cl[car, k_rec + 1] - self.t_cl[car, k_rec]))
+                self.m_e_motor[car, k_rec] = (self.e_motor_power[car, k_rec]
+                                              / (self.n_cl[car, k_rec] * 2 * math.pi)
+                                              * car_pars[ETA_E_MOTOR_RE])
+
+                if np.any(np.abs(self.m_e_motor[car, k_rec]) > car_pars[TORQUE_E_MOTOR_MAX]):
+                    raise Exception("Maximum motor torque exceeded: {}, max: {}"
+                                    .format(np.max(np.abs(self.m_e_motor[car, k_rec])),
+                                            car_pars[TORQUE_E_MOTOR_MAX]))
+
+                if np.any(np.abs(self.e_motor_power[car, k_rec]) > car_pars[POW_E_MOTOR]):
+                    raise Exception("Maximum Motor power exceeded: {} max: {}"
+                                    .format(np.max(np.abs(self.e_motor_power[car, k_rec])), car_pars[POW_E_MOTOR]))
+
+            else:
+                self.e_rec_e_motor[car, k_rec] = 0.0
+
+            es_delta[rec] = self.e_rec_e_motor[car, k_rec]
+
+        # update energy storage starting from the last unchanged point (sequential summation as in Lap.__fbplus)
+        self.es_cl[car, ind_first:ind_last + 1] = np.cumsum(np.append(self.es_cl[car, ind_first], es_delta))
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# TESTING --------------------------------------------------------------------------------------------------------------
+# ----------------------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    pass
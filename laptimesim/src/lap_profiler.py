@@ -0,0 +1,133 @@
+import time
+
+"""
+author:
+E-lemons team
+
+.. description::
+The file provides the profiler of the lap simulation. If profiling is activated (debug option use_profiling), the lap
+object holds a LapProfiler that collects the number of calls and the wall time of the phases of the solver as well as
+some counters, e.g. the depth of the backward iterations. If it is deactivated, the lap does not hold a profiler and
+the solver only checks for it, i.e. there is no measurable overhead. The profile is reset at the beginning of every
+simulated lap such that it belongs to a single sensitivity analysis iteration.
+
+Phases (calls and wall time):
+fbplus:             solver runs (including all phases below except em_strategy and e_cons)
+v_max_cornering:    calculation of the maximum cornering velocity profile (once per solver run)
+calc_max_ax:        calculation of the maximum longitudinal acceleration (once per forward step)
+backward:           backward iterations of a braking zone
+recalc:             recalculation of gears, revs, times and energies of a braking zone
+em_strategy:        calculation of the EM strategy (once per EM iteration)
+e_cons:             calculation of the energy consumption of the lap
+
+Counters:
+forward_steps:          points calculated in the forward loop
+braking_zones:          braking zones (i.e. calls of the backward phase)
+backward_depth:         sum of the depths j of the backward iterations of all braking zones
+backward_depth_max:     maximum depth j of the backward iterations of a braking zone
+backward_inner_iters:   iterations of the inner convergence loop of the backward iterations
+em_iters:               EM strategy iterations
+
+The compiled solver backend (see fbplus_kernel.py) does not report the phases and counters within the solver runs.
+"""
+
+PROFILE_PHASES = ["fbplus", "v_max_cornering", "calc_max_ax", "backward", "recalc", "em_strategy", "e_cons"]
+PROFILE_COUNTERS = ["forward_steps", "braking_zones", "backward_depth", "backward_depth_max", "backward_inner_iters",
+                    "em_iters"]
+
+# column names of a profile summary, see LapProfiler.get_summary
+PROFILE_FIELDNAMES = (["profile_%s_calls" % phase for phase in PROFILE_PHASES]
+                      + ["profile_%s_time" % phase for phase in PROFILE_PHASES]
+                      + ["profile_%s" % counter for counter in PROFILE_COUNTERS])
+
+
+class LapProfiler(object):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # SLOTS ------------------------------------------------------------------------------------------------------------
+    # ------------------------------------------------------------------------------------------------------------------
+
+    __slots__ = ("__calls",
+                 "__times",
+                 "__counters")
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # CONSTRUCTOR ------------------------------------------------------------------------------------------------------
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def __init__(self):
+        self.reset()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # GETTERS / SETTERS ------------------------------------------------------------------------------------------------
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def __get_calls(self) -> dict: return self.__calls
+    def __set_calls(self, x: dict) -> None: self.__calls = x
+    calls = property(__get_calls, __set_calls)
+
+    def __get_times(self) -> dict: return self.__times
+    def __set_times(self, x: dict) -> None: self.__times = x
+    times = property(__get_times, __set_times)
+
+    def __get_counters(self) -> dict: return self.__counters
+    def __set_counters(self, x: dict) -> None: self.__counters = x
+    counters = property(__get_counters, __set_counters)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # METHODS ----------------------------------------------------------------------------------------------------------
+    # ------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def timer() -> float:
+        """Start time of a phase, see add_time."""
+
+        return time.perf_counter()
+
+    def reset(self):
+        self.calls = dict.fromkeys(PROFILE_PHASES, 0)
+        self.times = dict.fromkeys(PROFILE_PHASES, 0.0)
+        self.counters = dict.fromkeys(PROFILE_COUNTERS, 0)
+
+    def add_time(self, phase: str, t_start: float):
+        """Add a call of a phase that started at t_start (see timer)."""
+
+        self.calls[phase] += 1
+        self.times[phase] += time.perf_counter() - t_start
+
+    def add_count(self, counter: str, value: int = 1):
+        self.counters[counter] += value
+
+    def set_max(self, counter: str, value: int):
+        if value > self.counters[counter]:
+            self.counters[counter] = value
+
+    def get_summary(self) -> dict:
+        """Flat dictionary of all calls, times (in s) and counters with the keys in PROFILE_FIELDNAMES."""
+
+        summary = {}
+
+        for phase in PROFILE_PHASES:
+            summary["profile_%s_calls" % phase] = self.calls[phase]
+
+        for phase in PROFILE_PHASES:
+            summary["profile_%s_time" % phase] = self.times[phase]
+
+        for counter in PROFILE_COUNTERS:
+            summary["profile_%s" % counter] = self.counters[counter]
+
+        return summary
+
+    def print_summary(self):
+        print("Profile of the lap simulation:")
+
+        for phase in PROFILE_PHASES:
+            print("%-16s %6i calls %9.4f s" % (phase, self.calls[phase], self.times[phase]))
+
+        for counter in PROFILE_COUNTERS:
+            print("%-22s %i" % (counter, self.counters[counter]))
+
+
+# testing --------------------------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    pass
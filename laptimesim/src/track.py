@@ -1,11 +1,13 @@
 import numpy as np
 import math
-import matplotlib.pyplot as plt
 import json
+import hashlib
+import os
 import trajectory_planning_helpers as tph
 import configparser
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
+
+# version of the prepared raceline data stored in the track cache, must be increased whenever the preparation changes
+_TRACK_CACHE_VERSION = 2
 
 class Track(object):
     """
@@ -41,7 +43,8 @@ class Track(object):
     # ------------------------------------------------------------------------------------------------------------------
 
     def __init__(self, track_opts: dict, track_pars: dict, trackfilepath: str, vel_lim_glob: float = np.inf,
-                 yellow_s1: bool = False, yellow_s2: bool = False, yellow_s3: bool = False):
+                 yellow_s1: bool = False, yellow_s2: bool = False, yellow_s3: bool = False,
+                 cache_path: str = None):
 
         # save given track parameters, load track parameters and append the relevant ones to pars_track
         # MH: sorry this naming is very confusing
@@ -54,43 +57,19 @@ class Track(object):
         for key in track_pars:
             self.pars_track[key] = track_pars[key]
 
-        # load raceline
-        self.raceline = np.loadtxt(trackfilepath, comments='#', delimiter=',')
-
-        # load elevation profile
-        if self.pars_track["use_elevation"]:
-
-            self.elevation_profile = []
-            raceline_tmp = []
-            for row in self.raceline:
-                self.elevation_profile.append(row[2])
-                raceline_tmp.append([row[0], row[1]])
-            self.raceline = raceline_tmp
-
-
-            # make sure that the elevation and track profile are the same size 
-            # so the lap calculations can be completed.
-            if len(self.elevation_profile) != self.raceline.shape[0]:
-                raise(Exception("Raceline and elevation profile must be the same size!" + 
-                        "Raceline: {}, elevation: {}".format(self.raceline.shape[0], self.elevation_profile.shape[0])))
+        # load prepared raceline from the cache if available, otherwise prepare it and store it in the cache
+        if cache_path is not None:
+            cache_file = self.__get_cache_file(trackfilepath=trackfilepath, cache_path=cache_path)
         else:
-            self.elevation_profile = np.ones(self.raceline.shape[0])
+            cache_file = None
 
-        # set friction values artificially as long as no real friction values available and limit them to a valid range
-        self.mu = np.ones(self.raceline.shape[0]) * self.pars_track["mu_mean"] * self.pars_track["mu_weather"]
-
-        if np.any(self.mu < 0.5) or np.any(self.mu > 1.3):
-            print("WARNING: Friction values seem invalid, friction values are limited to 0.5 <= mu <= 1.3!")
-            self.mu[self.mu < 0.5] = 0.5
-            self.mu[self.mu > 1.3] = 1.3
-
-        # flip track if required
-        if self.pars_track["flip_track"]:
-            self.raceline = np.flipud(self.raceline)
-            self.mu = np.flipud(self.mu)
+        if cache_file is not None and os.path.isfile(cache_file):
+            self.__load_cache(cache_file=cache_file)
+        else:
+            self.__load_raceline(trackfilepath=trackfilepath)
 
-        # prepare raceline (interpolation, distance and curvature calculation)
-        self.__prep_raceline()
+            if cache_file is not None:
+                self.__save_cache(cache_file=cache_file)
 
         # set sector boundaries
         self.zone_inds = {}  # initialize zone_inds
@@ -223,6 +202,89 @@ class Track(object):
     #     self.kappa = np.convolve(self.kappa, np.ones(self.pars_track["curv_filt_window"])
     #                              / self.pars_track["curv_filt_window"], mode="same")
 
+    def __load_raceline(self, trackfilepath: str) -> None:
+        """This function loads the raceline (and elevation profile) from the track file, sets the friction values and
+        prepares the raceline."""
+
+        # load raceline
+        self.raceline = np.loadtxt(trackfilepath, comments='#', delimiter=',')
+
+        # load elevation profile (3rd column of the track file)
+        if self.pars_track["use_elevation"]:
+            if self.raceline.ndim != 2 or self.raceline.shape[1] < 3:
+                raise IOError("Track file must contain the elevation in the 3rd column if use_elevation is set!")
+
+            self.elevation_profile = self.raceline[:, 2]
+        else:
+            self.elevation_profile = np.ones(self.raceline.shape[0])
+
+        self.raceline = self.raceline[:, :2]
+
+        # set friction values artificially as long as no real friction values available and limit them to a valid range
+        self.mu = np.ones(self.raceline.shape[0]) * self.pars_track["mu_mean"] * self.pars_track["mu_weather"]
+
+        if np.any(self.mu < 0.5) or np.any(self.mu > 1.3):
+            print("WARNING: Friction values seem invalid, friction values are limited to 0.5 <= mu <= 1.3!")
+            self.mu[self.mu < 0.5] = 0.5
+            self.mu[self.mu > 1.3] = 1.3
+
+        # flip track if required
+        if self.pars_track["flip_track"]:
+            self.raceline = np.flipud(self.raceline)
+            self.mu = np.flipud(self.mu)
+            self.elevation_profile = np.flipud(self.elevation_profile)
+
+        # prepare raceline (interpolation, distance and curvature calculation)
+        self.__prep_raceline()
+
+    def __get_cache_file(self, trackfilepath: str, cache_path: str) -> str:
+        """The prepared raceline is stored content-addressed, i.e. the file name contains a hash of the track file and
+        of all track options that influence the preparation."""
+
+        with open(trackfilepath, "rb") as fh:
+            key = hashlib.sha1(fh.read())
+
+        key.update(repr((_TRACK_CACHE_VERSION,
+                         self.pars_track["interp_stepsize_des"],
+                         self.pars_track["curv_filt_width"],
+                         self.pars_track["flip_track"],
+                         self.pars_track["mu_mean"],
+                         self.pars_track["mu_weather"],
+                         self.pars_track["use_elevation"])).encode())
+
+        trackname = os.path.splitext(os.path.basename(trackfilepath))[0]
+
+        return os.path.join(cache_path, "%s_%s.npz" % (trackname, key.hexdigest()))
+
+    def __load_cache(self, cache_file: str) -> None:
+        with np.load(cache_file) as data:
+            self.raceline = data["raceline"]
+            self.kappa = data["kappa"]
+            self.dists_cl = data["dists_cl"]
+            self.mu = data["mu"]
+            self.elevation_profile = data["elevation_profile"]
+            self.stepsize = float(data["stepsize"])
+
+        self.no_points = self.raceline.shape[0]
+        self.no_points_cl = self.no_points + 1
+
+    def __save_cache(self, cache_file: str) -> None:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+
+        # write to a temporary file first such that parallel runs never load an incomplete file
+        cache_file_tmp = "%s.%i.tmp" % (cache_file, os.getpid())
+
+        with open(cache_file_tmp, "wb") as fh:
+            np.savez(fh,
+                     raceline=self.raceline,
+                     kappa=self.kappa,
+                     dists_cl=self.dists_cl,
+                     mu=self.mu,
+                     elevation_profile=self.elevation_profile,
+                     stepsize=self.stepsize)
+
+        os.replace(cache_file_tmp, cache_file)
+
     def __prep_raceline(self) -> None:
         """This function prepares the inserted raceline in several steps: interpolation, distance calculation,
         curvature calculation and curvature smoothing. The workflow is based on a spline representation of the
@@ -264,6 +326,10 @@ class Track(object):
         mu_preinterp_cl = np.append(self.mu, self.mu[0])
         self.mu = np.interp(self.dists_cl[:-1], dists_cl_preinterp, mu_preinterp_cl)  # unclosed
 
+        # (linear) interpolation of the elevation profile in the same way
+        elevation_preinterp_cl = np.append(self.elevation_profile, self.elevation_profile[0])
+        self.elevation_profile = np.interp(self.dists_cl[:-1], dists_cl_preinterp, elevation_preinterp_cl)  # unclosed
+
         # calculate curvature profile (unclosed)
         self.kappa = tph.calc_head_curv_an.calc_head_curv_an(coeffs_x=coeffs_x_cl,
                                                              coeffs_y=coeffs_y_cl,
@@ -388,11 +454,25 @@ class Track(object):
                 print("WARNING: DRS zone 2 gets deactivated due to yellow flag!")
                 self.pars_track["use_drs2"] = False
 
+    def calc_grade_forces(self, m: float or np.ndarray, g: float or np.ndarray) -> np.ndarray:
+        """Force in N required to overcome the elevation change from every point to the next one (unclosed, negative
+        downhill) for a car of mass m in kg. It is zero everywhere if the elevation is not used. m and g can also be
+        column vectors of several cars, the result then contains one row per car."""
+
+        if not self.pars_track["use_elevation"]:
+            return np.zeros(np.broadcast(m, g).shape[:-1] + (self.no_points,))
+
+        elevation_change = np.diff(np.append(self.elevation_profile, self.elevation_profile[0]))
+
+        return elevation_change * m * g / self.stepsize
+
     def check_track(self) -> None:
         """Recalculate raceline based on curvature. Raceline is an array containing x and y coords: [x, y].
         kappa contains the curvature in rad/m. stepsize is the stepsize after interpolation in m. heading_start is in
         rad."""
 
+        import matplotlib.pyplot as plt
+
         # create required arrays
         raceline_re = np.zeros((self.no_points, 2))
         phi_re = np.zeros(self.no_points)
@@ -426,6 +506,8 @@ class Track(object):
         plt.show()
 
     def plot_curvature(self):
+        import matplotlib.pyplot as plt
+
         fig = plt.figure()
         ax = fig.add_subplot(111)
 
@@ -436,6 +518,8 @@ class Track(object):
         ax.set_ylabel("kappa in rad/m")
 
     def plot_trackmap(self, mapfilepath: str = "") -> None:
+        import matplotlib.pyplot as plt
+
         fig = plt.figure()
         ax1 = fig.add_subplot(111)
 
@@ -523,6 +607,7 @@ class Track(object):
         plt.show()
 
     def plot_elevation(self):
+        import matplotlib.pyplot as plt
 
         fig = plt.figure()
         ax = fig.add_subplot(111)
@@ -533,6 +618,9 @@ class Track(object):
         plt.grid()
     
     def plot_elevation_3d(self):
+        import matplotlib.pyplot as plt
+        from mpl_toolkits.mplot3d import Axes3D
+
         scale_x = 1.0
         scale_y = 1.0
         scale_z = 0.3  # scale z axis such that it does not appear stretched
@@ -3,13 +3,16 @@ import time
 import datetime
 import os
 import numpy as np
-import pkg_resources
 import toml
 
 from definitions import *  # FIXME enumerate imports
 from datastore import (DataStore)
+from lap_result_cache import LapResultCache
 
-from race_sim import RaceSim
+import sa_runner
+import race_monte_carlo
+import lap_report
+from results_sink import read_results
 
 """
 author:
@@ -35,6 +38,8 @@ def main(track_opts: dict,
          solver_opts: dict,
          driver_opts: dict,
          sa_opts: dict,
+         race_mc_opts: dict,
+         report_opts: dict,
          debug_opts: dict,
          car_config: dict,
          track_pars: dict,
@@ -47,19 +52,26 @@ def main(track_opts: dict,
     # get repo path
     repo_path = os.path.dirname(os.path.abspath(__file__))
 
-    # read dependencies from requirements.txt
-    requirements_path = os.path.join(repo_path, 'requirements.txt')
-    dependencies = []
+    if debug_opts["headless"]:
+        # headless runs skip the dependency check and all plots, i.e. matplotlib is not imported
+        debug_opts = dict(debug_opts, use_plot=False, use_debug_plots=False, use_plot_comparison_tph=False)
 
-    with open(requirements_path, 'r') as fh:
-        line = fh.readline()
+    else:
+        import pkg_resources
+
+        # read dependencies from requirements.txt
+        requirements_path = os.path.join(repo_path, 'requirements.txt')
+        dependencies = []
 
-        while line:
-            dependencies.append(line.rstrip())
+        with open(requirements_path, 'r') as fh:
             line = fh.readline()
 
-    # check dependencies
-    pkg_resources.require(dependencies)
+            while line:
+                dependencies.append(line.rstrip())
+                line = fh.readline()
+
+        # check dependencies
+        pkg_resources.require(dependencies)
 
     # ------------------------------------------------------------------------------------------------------------------
     # INITIALIZATION ---------------------------------------------------------------------------------------------------
@@ -78,11 +90,21 @@ def main(track_opts: dict,
         os.makedirs(output_path_veh_dyn_info, exist_ok=True)
     
 
-    date = datetime.datetime.now().strftime("%Y_%m_%d-%I_%M_%S_%p")
-    resultsfile = os.path.join(repo_path, "laptimesim", "output", "results-{}.csv".format(date))
+    if sa_opts["resume_results_file"]:
+        # continue a crashed sensitivity analysis at its last checkpoint
+        resultsfile = os.path.join(repo_path, "laptimesim", "output", sa_opts["resume_results_file"])
+    else:
+        date = datetime.datetime.now().strftime("%Y_%m_%d-%I_%M_%S_%p")
+        resultsfile = os.path.join(repo_path, "laptimesim", "output",
+                                   "results-{}.{}".format(date, sa_opts["results_format"]))
+
     datastore = DataStore(results_file_name=resultsfile,
                             track_pars=track_pars,
-                            car_name=car_name)
+                            car_name=car_name,
+                            results_buffer_size=sa_opts["results_buffer_size"],
+                            checkpoint_interval=sa_opts["checkpoint_interval"],
+                            resume=bool(sa_opts["resume_results_file"]),
+                            use_profiling=debug_opts["use_profiling"])
 
     datastore.parse_car_config(car_config)
 
@@ -90,7 +112,7 @@ def main(track_opts: dict,
 
     # generate car parameters used for debug lap plots. This set of
     # car parameters is used when the simulation does not do sensitivity analysis 
-    first_iter_veh_pars = datastore.single_iteration_data[0].race_car_model.get_car_parameters_for_laptimesim()
+    first_iter_veh_pars = datastore.get_first_race_car_model().get_car_parameters_for_laptimesim()
 
     # ------------------------------------------------------------------------------------------------------------------
     # CREATE TRACK INSTANCE --------------------------------------------------------------------------------------------
@@ -102,6 +124,12 @@ def main(track_opts: dict,
 
     vel_lim_glob = np.inf
 
+    # prepared racelines are cached in the output folder (see Track)
+    if track_opts["use_cache"]:
+        track_cache_path = os.path.join(output_path, "track_cache")
+    else:
+        track_cache_path = None
+
     # create instance
     track = laptimesim.src.track.Track(track_opts=track_opts,
                                        track_pars=track_pars,
@@ -109,7 +137,8 @@ def main(track_opts: dict,
                                        vel_lim_glob=vel_lim_glob,
                                        yellow_s1=driver_opts["yellow_s1"],
                                        yellow_s2=driver_opts["yellow_s2"],
-                                       yellow_s3=driver_opts["yellow_s3"])
+                                       yellow_s3=driver_opts["yellow_s3"],
+                                       cache_path=track_cache_path)
 
     # debug plot
     if debug_opts["use_debug_plots"]:
@@ -175,6 +204,9 @@ def main(track_opts: dict,
         # normal simulation --------------------------------------------------------------------------------------------
         lap.simulate_lap()
 
+        if lap.profiler is not None:
+            lap.profiler.print_summary()
+
         # debug plot
         if debug_opts["use_debug_plots"]:
             # plot torques
@@ -203,56 +235,61 @@ def main(track_opts: dict,
 
         # sensitivity analysis -----------------------------------------------------------------------------------------
 
-        for i, single_simulation_data in datastore.single_iteration_data.items():
-            print("SA: Starting solver run (%i)" % (i + 1))
-
-            race_car_object = single_simulation_data.race_car_model
-
-            veh_pars = race_car_object.get_car_parameters_for_laptimesim()
-            car = laptimesim.src.car_electric.CarElectric(pars=veh_pars)
-
-            # change properties of vehicle in the lap simulation
-            lap.driverobj.carobj = car
-
-
-            # simulate lap and save lap time
-            # I made sure there was no other initialization needed, 
-            # we know this violates the object oriented world. 
-            # we know this isn't the best practiced but we 
-            # double checked that this was ok and there 
-            # wasn't any other initialization required or dependencies
-            lap.simulate_lap()
-
-            total_pit_time = race_car_object.general_parameters.pit_time + track_pars[PIT_DRIVE_THROUGH_PENALTY_TIME]
-
-            race_sim = RaceSim(pit_time=total_pit_time,
-                                gwc_times=datastore.track_pars[GWC_TIMES_TAG],
-                                lap_time=lap.t_cl[-1],
-                                energy_per_lap=lap.e_cons_cl[-1],
-                                battery_capacity=race_car_object.battery_parameters.size)
-            race_sim.calculate()
-
-            total_pits = 0
-            energy_remaining = 0
-            for day in race_sim.race_days:
-                total_pits += day.number_of_pits
-                energy_remaining += day.energy_remaining*100  # for percentage conversion
-
-            is_winning_car_configuration = race_sim.total_laps > track_pars["winning_laps"]
-
-            datastore.set_single_iteration_results(iteration=i,
-                                                   lap_time=lap.t_cl[-1],
-                                                   total_laps=race_sim.total_laps,
-                                                   lap_energy=lap.e_cons_cl[-1]/1000, # 1000 factor fo J -> kJ
-                                                   total_pits=total_pits,
-                                                   energy_remaining=energy_remaining,
-                                                   is_winning_car_configuration=is_winning_car_configuration) 
+        # number of worker processes (0 -> use all available cores)
+        no_workers = sa_opts["no_workers"]
+
+        if no_workers == 0:
+            no_workers = os.cpu_count()
+
+        # lap results of cars that have been simulated before (e.g. iterations that only differ in the pit time) are
+        # taken from the lap result cache, the on-disk store is located in the output folder
+        if sa_opts["lap_cache_size"] > 0:
+            lap_cache = LapResultCache(max_size=sa_opts["lap_cache_size"],
+                                       context={"track_opts": track_opts,
+                                                "track_pars": track_pars,
+                                                "raceline": track.raceline,
+                                                "solver_opts": solver_opts,
+                                                "driver_opts": driver_opts,
+                                                # the batched solver ignores some of the solver options, therefore,
+                                                # its laps are not mixed with the ones of the serial solver
+                                                "batched": sa_opts["batch_size"] > 1},
+                                       cache_path=(os.path.join(output_path, "lap_cache")
+                                                   if sa_opts["use_lap_cache_disk"] else None))
+        else:
+            lap_cache = None
+
+        # the iterations of the adaptive sampling are run in refinement rounds, the combinations of a round
+        # depend on the results of the previous ones
+        while True:
+            if sa_opts["batch_size"] > 1:
+                sa_runner.run_batched(track=track,
+                                      solver_opts=solver_opts,
+                                      driver_opts=driver_opts,
+                                      debug_opts=debug_opts,
+                                      datastore=datastore,
+                                      track_pars=track_pars,
+                                      batch_size=sa_opts["batch_size"],
+                                      lap_cache=lap_cache)
+            elif no_workers > 1:
+                sa_runner.run_parallel(track=track,
+                                       solver_opts=solver_opts,
+                                       driver_opts=driver_opts,
+                                       debug_opts=debug_opts,
+                                       datastore=datastore,
+                                       track_pars=track_pars,
+                                       no_workers=no_workers,
+                                       lap_cache=lap_cache)
+            else:
+                sa_runner.run_serial(lap=lap,
+                                     datastore=datastore,
+                                     track_pars=track_pars,
+                                     lap_cache=lap_cache)
+
+            if not datastore.refine_sa_combinations():
+                break
 
-            lap.reset_lap()
+        datastore.close_results_file()
 
-            print("Solver run {}. Winning car?: {}, total laps: {}".format(i,
-                                                                          is_winning_car_configuration,
-                                                                          race_sim.total_laps ))
         best_results, multiple_optimum_results = datastore.get_best_result()
 
         print("Best result was iteration: {}".format(best_results[ITER_TAG]))
@@ -264,9 +301,46 @@ def main(track_opts: dict,
         print("{}: {}".format(ENERGY_REMAINING_TAG, best_results[ENERGY_REMAINING_TAG]))
         print("{}: {}".format(BATTERY_SIZE_TAG, best_results[BATTERY_SIZE_TAG]))
         print("Are there multiple optimum results?: {}".format(multiple_optimum_results))
+
+        # monte carlo race simulation of all iterations ----------------------------------------------------------------
+
+        if race_mc_opts["use_monte_carlo"]:
+            mc_results = race_monte_carlo.evaluate_results(data=read_results(resultsfile),
+                                                           track_pars=track_pars,
+                                                           race_mc_opts=race_mc_opts,
+                                                           caution_energy_factor=driver_opts["yellow_throttle"])
+            mc_results.to_csv(os.path.splitext(resultsfile)[0] + "-monte_carlo.csv", index=False)
+
+            best_mc_results = mc_results.loc[mc_results[WIN_PROBABILITY_TAG].idxmax()]
+
+            print("Best result of the monte carlo race simulation was iteration: {}"
+                  .format(int(best_mc_results[ITER_TAG])))
+            print("{}: {}".format(WIN_PROBABILITY_TAG, best_mc_results[WIN_PROBABILITY_TAG]))
+            print("{}: {}".format(TOTAL_LAPS_P05_TAG, best_mc_results[TOTAL_LAPS_P05_TAG]))
+            print("{}: {}".format(TOTAL_LAPS_P50_TAG, best_mc_results[TOTAL_LAPS_P50_TAG]))
+            print("{}: {}".format(TOTAL_LAPS_P95_TAG, best_mc_results[TOTAL_LAPS_P95_TAG]))
+
+        # reports of the best iterations -------------------------------------------------------------------------------
+
+        if report_opts["use_report"]:
+            report_files = lap_report.create_reports(
+                track=track,
+                solver_opts=solver_opts,
+                driver_opts=driver_opts,
+                debug_opts=debug_opts,
+                datastore=datastore,
+                iterations=lap_report.select_iterations(data=read_results(resultsfile), report_opts=report_opts),
+                output_path=os.path.join(output_path, "reports", os.path.splitext(os.path.basename(resultsfile))[0]),
+                formats=report_opts["formats"],
+                no_workers=no_workers)
+
+            print("Rendered the reports of {} iterations".format(len(report_files)))
+
         print("total simulation time: {}"
             .format(time.perf_counter() - t_start))
 
+    return lap
+
 # ----------------------------------------------------------------------------------------------------------------------
 # MAIN FUNCTION CALL ---------------------------------------------------------------------------------------------------
 # ----------------------------------------------------------------------------------------------------------------------
@@ -292,6 +366,8 @@ if __name__ == '__main__':
     solver_opts_ = config["solver_opts_"]
     driver_opts_ = config["driver_opts_"]
     sa_opts_ = config["sa_opts_"]
+    race_mc_opts_ = config["race_mc_opts_"]
+    report_opts_ = config["report_opts_"]
     debug_opts_ = config["debug_opts_"]
 
     # get track parameters
@@ -308,6 +384,8 @@ if __name__ == '__main__':
          solver_opts=solver_opts_,
          driver_opts=driver_opts_,
          sa_opts=sa_opts_,
+         race_mc_opts=race_mc_opts_,
+         report_opts=report_opts_,
          debug_opts=debug_opts_,
          car_config=car_config,
          track_pars=track_pars_,
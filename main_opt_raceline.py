@@ -2,9 +2,7 @@ import opt_raceline
 import numpy as np
 import time
 import os
-import matplotlib.pyplot as plt
 import trajectory_planning_helpers as tph
-import pkg_resources
 
 """
 author:
@@ -27,7 +25,8 @@ def main(track_pars: dict,
          imp_opts: dict,
          reg_smooth_opts: dict,
          stepsize_opts: dict,
-         optim_opts_mincurv: dict) -> None:
+         optim_opts_mincurv: dict,
+         headless: bool = False) -> None:
 
     # ------------------------------------------------------------------------------------------------------------------
     # CHECK PYTHON DEPENDENCIES ----------------------------------------------------------------------------------------
@@ -36,19 +35,27 @@ def main(track_pars: dict,
     # get repo path
     repo_path = os.path.dirname(os.path.abspath(__file__))
 
-    # read dependencies from requirements.txt
-    requirements_path = os.path.join(repo_path, 'requirements.txt')
-    dependencies = []
+    if headless:
+        # headless runs skip the dependency check and all plots, i.e. matplotlib is not imported
+        plot_opts = dict.fromkeys(plot_opts, False)
+        imp_opts = dict(imp_opts, plot_track=False)
 
-    with open(requirements_path, 'r') as fh:
-        line = fh.readline()
+    else:
+        import pkg_resources
+
+        # read dependencies from requirements.txt
+        requirements_path = os.path.join(repo_path, 'requirements.txt')
+        dependencies = []
 
-        while line:
-            dependencies.append(line.rstrip())
+        with open(requirements_path, 'r') as fh:
             line = fh.readline()
 
-    # check dependencies
-    pkg_resources.require(dependencies)
+            while line:
+                dependencies.append(line.rstrip())
+                line = fh.readline()
+
+        # check dependencies
+        pkg_resources.require(dependencies)
 
     # ------------------------------------------------------------------------------------------------------------------
     # CHECK USER INPUT -------------------------------------------------------------------------------------------------
@@ -254,6 +261,9 @@ def main(track_pars: dict,
     # PLOT RESULTS -----------------------------------------------------------------------------------------------------
     # ------------------------------------------------------------------------------------------------------------------
 
+    if plot_opts["raceline"] or plot_opts["raceline_curv"]:
+        import matplotlib.pyplot as plt
+
     if plot_opts["raceline"]:
         # calc required data
         bound1 = track_interp[:, :2] + normvec_normalized_interp * np.expand_dims(track_interp[:, 2], 1)
@@ -433,9 +443,11 @@ if __name__ == '__main__':
     # set plot options -------------------------------------------------------------------------------------------------
     # raceline:         plot optimized path on the race track
     # raceline_curv:    plot curvature profile of optimized path
+    # headless:         skip the dependency check and all plots (including plot_track of the import options)
 
     plot_opts_ = {"raceline": True,
                   "raceline_curv": True}
+    headless_ = False
 
     # set import options -----------------------------------------------------------------------------------------------
     # mode:             "track" or "centerline" -> track is supplied as .csv and contains [x, y, w_tr_right, w_tr_left],
@@ -489,4 +501,5 @@ if __name__ == '__main__':
          imp_opts=imp_opts_,
          reg_smooth_opts=reg_smooth_opts_,
          stepsize_opts=stepsize_opts_,
-         optim_opts_mincurv=optim_opts_mincurv_)
+         optim_opts_mincurv=optim_opts_mincurv_,
+         headless=headless_)
@@ -2,8 +2,6 @@ import json
 import utm
 import numpy as np
 import math
-import matplotlib.pyplot as plt
-from matplotlib.widgets import TextBox
 from collections import OrderedDict
 
 
@@ -31,6 +29,9 @@ def import_geojson_gps_centerline(trackfilepath: str,
     :rtype centerline:      np.ndarray
     """
 
+    import matplotlib.pyplot as plt
+    from matplotlib.widgets import TextBox
+
     # ------------------------------------------------------------------------------------------------------------------
     # LOAD GEOJSON DATA ------------------------------------------------------------------------------------------------
     # ------------------------------------------------------------------------------------------------------------------
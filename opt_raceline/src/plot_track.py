@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import trajectory_planning_helpers as tph
 
 
@@ -28,6 +27,8 @@ def plot_track(track_imp: np.ndarray,
     :type filepath_tr_plot:     str
     """
 
+    import matplotlib.pyplot as plt
+
     # ------------------------------------------------------------------------------------------------------------------
     # PREPARE IMPORTED TRACK -------------------------------------------------------------------------------------------
     # ------------------------------------------------------------------------------------------------------------------
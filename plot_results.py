@@ -1,4 +1,4 @@
-# plotting script, reads in previously created csv
+# plotting script, reads in previously created results (csv, npz, parquet or feather)
 # and plots    
 import argparse
 import pandas as pd
@@ -7,12 +7,13 @@ import os
 import matplotlib.pyplot as plt 
 
 from definitions import *
+from results_sink import read_results
 
 def parse_args():
     arg_parser = argparse.ArgumentParser("Plot racesim results with matplotlib")
 
     arg_parser.add_argument('-f','--results-file', required=True,
-                            help='path to results csv file')
+                            help='path to results file (csv, npz, parquet or feather)')
 
     args = arg_parser.parse_args()
 
@@ -20,8 +21,8 @@ def parse_args():
 
     return args
 
-def csv_reader(file_path):
-    data = pd.read_csv(file_path)
+def results_reader(file_path):
+    data = read_results(file_path)
     print(data[TOTAL_LAPS_TAG])
     print(type(data[TOTAL_LAPS_TAG]))
 
@@ -114,7 +115,7 @@ def plot_data(data):
 def main():
     args = parse_args()
 
-    data = csv_reader(args.results_file)
+    data = results_reader(args.results_file)
 
     plot_data(data)
 
@@ -1,6 +1,7 @@
 # classes to store the relationship of race car properties
 from definitions import *
 from copy import deepcopy
+import numpy as np
 
 class generalParameters():
     """Class for holding general parameters. These variables are a mirror
@@ -451,6 +452,35 @@ class RaceCarModel():
 
         return frontal_area
 
+    def set_calculated_properties(self, properties):
+        """Set the output variables from already calculated properties, e.g. from
+        calculate_car_properties_columnar, instead of calculating them again.
+        The car must be a rules legal car.
+
+        Inputs:
+            - properties (dict): key is flattened property name (see calculate_car_properties_columnar),
+            value is the value of this car
+
+        Outputs:
+            Nothing
+
+        Raises:
+            - keyError if not all properties are present
+        """
+
+        self._outputs_set = True
+        self._is_allowable_weight = True
+
+        self.battery_parameters.mass = properties["battery.mass"]
+        self.general_parameters.pit_time = properties["general.pit_time"]
+        self.engine_parameters.motor_mass = properties["engine.motor_mass"]
+        self.engine_parameters.motor_max_power = properties["engine.motor_max_power"]
+        self.general_parameters.net_chassis_mass = properties["general.net_chassis_mass"]
+        self.general_parameters.m = properties["general.m"]
+        self.general_parameters.maximum_allowable_vehicle_mass = properties["general.maximum_allowable_vehicle_mass"]
+        self.general_parameters.frontal_area = properties["general.frontal_area"]
+        self.general_parameters.c_w_a = properties["general.c_w_a"]
+        self.general_parameters.f_roll = properties["general.f_roll"]
 
     def get_vehicle_properties_for_csv_output(self):
         """Return car properites if all inputs and relationships are set,
@@ -608,6 +638,69 @@ class RaceCarModel():
         self.tire_parameters.rear_tires.dmuy_dfz = input_vars["tires.r.dmuy_dfz"]
         
 
+def calculate_car_properties_columnar(input_vars):
+    """Columnar version of RaceCarModel.calculate_car_properties. Calculates the
+    properties of many cars at once, e.g. of the whole sensitivity analysis grid.
+
+    Instead of raising an exception for cars that violate the rules (too much mass
+    compared to the gvw) a boolean mask is returned, the properties are calculated
+    for all cars.
+
+    Inputs:
+        - input_vars (dict): key is flattened parameter name from config (see RaceCarModel.set_params),
+        value is a numpy array with one value per car (or a single value used for all cars)
+
+    Outputs:
+        - properties (dict): key is flattened property name, e.g. "general.m", value is a numpy
+        array with one value per car
+        - is_allowable_weight (np.ndarray): boolean mask of the rules legal cars
+
+    Raises:
+        - keyError if not all values required are present
+    """
+
+    properties = {}
+
+    # Battery
+    battery_mass = input_vars["battery.size"] / input_vars["battery.energy_density"]
+    properties["battery.mass"] = battery_mass
+    properties["general.pit_time"] = (battery_mass * input_vars["battery.mass_pit_factor"]
+                                      + input_vars["battery.change_constant"])
+
+    # Motor (see RaceCarModel._calculate_max_motor_power)
+    motor_mass = input_vars["engine.motor_max_torque"] / input_vars["engine.motor_torque_density"]
+    properties["engine.motor_mass"] = motor_mass
+    properties["engine.motor_max_power"] = np.minimum(
+        (input_vars["engine.motor_max_torque"] / input_vars["engine.motor_constant"]) ** 2,
+        input_vars["battery.size"] * input_vars["battery.power_output_factor"])
+
+    # Chassis
+    net_chassis_mass = input_vars["general.vehicle_curb_mass"] - input_vars["general.mass_reduction"]
+    properties["general.net_chassis_mass"] = net_chassis_mass
+
+    m = (net_chassis_mass
+         + battery_mass * input_vars["general.chassis_battery_mass_factor"]
+         + motor_mass * input_vars["general.chassis_motor_mass_factor"]
+         + motor_mass
+         + battery_mass)
+    properties["general.m"] = m
+
+    maximum_allowable_vehicle_mass = (input_vars["general.vehicle_curb_mass"]
+                                      * input_vars["general.max_vehicle_weight_ratio"])
+    properties["general.maximum_allowable_vehicle_mass"] = maximum_allowable_vehicle_mass
+
+    # frontal area (see RaceCarModel._frontal_area_cube_calculation)
+    frontal_area = ((m / input_vars["general.car_density"]) ** (1/3)) ** 2
+    properties["general.frontal_area"] = frontal_area
+
+    is_allowable_weight = m < maximum_allowable_vehicle_mass
+
+    # Drag
+    properties["general.c_w_a"] = frontal_area * input_vars["general.coefficient_of_drag"]
+    properties["general.f_roll"] = m * input_vars["general.rolling_resistance_mass_factor"]
+
+    return properties, is_allowable_weight
+
 
 # Tests
 if __name__ == '__main__':
@@ -0,0 +1,73 @@
+# monte carlo evaluation of the results of the sensitivity analysis, the race of every
+# iteration is simulated for many random samples of pit times, cautions and battery degradation
+import numpy as np
+import pandas as pd
+
+from race_sim import RaceSimMonteCarlo
+
+from definitions import (
+    BATTERY_SIZE_TAG, GWC_TIMES_TAG, ITER_TAG, LAP_ENERGY_TAG, LAPTIME_TAG, PIT_DRIVE_THROUGH_PENALTY_TIME,
+    PIT_TIME_TAG, TOTAL_LAPS_P05_TAG, TOTAL_LAPS_P50_TAG, TOTAL_LAPS_P95_TAG, TOTAL_LAPS_TAG, WIN_PROBABILITY_TAG,
+    WINNING_GAS_CAR_LAPS
+)
+
+# number of simulated races (configurations x samples) per chunk of the results
+MC_CHUNK_SIZE = 1000000
+
+
+def evaluate_results(data, track_pars, race_mc_opts, caution_energy_factor):
+    """Simulate the race of all iterations of the sensitivity analysis with random race conditions
+    (see race_sim.RaceSimMonteCarlo).
+
+    Inputs:
+        - data (pd.DataFrame): results of the sensitivity analysis, e.g. from results_sink.read_results
+        - track_pars (dict): dictionary of track parameters of a single track from track_pars.toml
+        - race_mc_opts (dict): monte carlo race options from sim_config.toml
+        - caution_energy_factor (float): energy per lap during a caution relative to the energy per lap
+        (e.g. yellow_throttle of the driver)
+
+    Outputs:
+        - mc_results (pd.DataFrame): iteration, deterministic total laps, 5th, 50th and 95th percentile of the
+        total laps and probability to beat the winning gas car for every iteration
+
+    Raises:
+        - Nothing
+    """
+
+    no_samples = race_mc_opts["no_samples"]
+    chunk_size = max(MC_CHUNK_SIZE // no_samples, 1)
+    rng = np.random.default_rng(race_mc_opts["seed"])
+
+    percentiles = []
+    win_probability = []
+
+    for start in range(0, len(data), chunk_size):
+        chunk = data.iloc[start:start + chunk_size]
+
+        race_sim = RaceSimMonteCarlo(pit_time=chunk[PIT_TIME_TAG].to_numpy(dtype=float)
+                                     + track_pars[PIT_DRIVE_THROUGH_PENALTY_TIME],
+                                     gwc_times=track_pars[GWC_TIMES_TAG],
+                                     lap_time=chunk[LAPTIME_TAG].to_numpy(dtype=float),
+                                     energy_per_lap=chunk[LAP_ENERGY_TAG].to_numpy(dtype=float) * 1000,  # kJ -> J
+                                     battery_capacity=chunk[BATTERY_SIZE_TAG].to_numpy(dtype=float),
+                                     no_samples=no_samples,
+                                     pit_time_std=race_mc_opts["pit_time_std"],
+                                     caution_rate=race_mc_opts["caution_rate"],
+                                     caution_duration=race_mc_opts["caution_duration"],
+                                     caution_lap_time_factor=race_mc_opts["caution_lap_time_factor"],
+                                     caution_energy_factor=caution_energy_factor,
+                                     battery_degradation_max=race_mc_opts["battery_degradation_max"],
+                                     seed=rng)
+        race_sim.calculate()
+
+        percentiles.append(race_sim.total_laps_percentiles([5, 50, 95]))
+        win_probability.append(race_sim.win_probability(track_pars[WINNING_GAS_CAR_LAPS]))
+
+    percentiles = np.vstack(percentiles) if percentiles else np.zeros((0, 3))
+
+    return pd.DataFrame({ITER_TAG: data[ITER_TAG].to_numpy(),
+                         TOTAL_LAPS_TAG: data[TOTAL_LAPS_TAG].to_numpy(),
+                         TOTAL_LAPS_P05_TAG: percentiles[:, 0],
+                         TOTAL_LAPS_P50_TAG: percentiles[:, 1],
+                         TOTAL_LAPS_P95_TAG: percentiles[:, 2],
+                         WIN_PROBABILITY_TAG: np.concatenate(win_probability) if win_probability else []})
@@ -1,4 +1,5 @@
 # helper classes and objects to make race calculations
+import numpy as np
 
 class RaceDayInfo():
     """Class to contain information about
@@ -99,6 +100,185 @@ class RaceSim():
             
             self.total_laps += race_day.total_laps
 
+
+class RaceSimBatch():
+    """Vectorized version of the RaceSim for many car configurations at once,
+    e.g. all results of a sensitivity analysis. The inputs are arrays with one
+    entry per configuration (scalars are broadcasted), the results are arrays
+    with one row per configuration and one column per race day.
+
+    The number of pits of a race day is calculated in closed form instead of
+    simulating the race stint by stint: the car pits until the remaining race
+    time is shorter than the time to race one battery pack. The results are
+    identical to RaceSim.calculate apart from floating point rounding of the
+    accumulated race time. The times of the pits are not stored.
+    """
+    def __init__(self, pit_time,
+                 gwc_times,
+                 lap_time,
+                 energy_per_lap,
+                 battery_capacity):
+        """
+        Inputs:
+            - pit_time (float or np.ndarray): time to pit and change batteries in minutes
+            - gwc_times (list of float): list of race times in minutes for each day gwc stands for
+                green-white-chequered
+            - lap_time (float or np.ndarray): time to complete one lap in seconds (output from laptime sim)
+            - energy_per_lap (float or np.ndarray): energy consumed to complete one lap in joules (output from
+                laptime sim)
+            - battery_capacity (float or np.ndarray): energy capacity of battery in kWh (car property)
+
+        """
+        self.gwc_times = list(gwc_times)
+
+        self._pit_time, lap_time, self._energy_per_lap, self._battery_capacity_kwh = \
+            np.broadcast_arrays(*[np.atleast_1d(np.asarray(x, dtype=float))
+                                  for x in (pit_time, lap_time, energy_per_lap, battery_capacity)])
+
+        self._lap_time_minutes = lap_time / 60
+        self._battery_capacity_joules = self._battery_capacity_kwh * 3.6e6
+
+        # floor division
+        self.laps_per_battery = self._battery_capacity_joules // self._energy_per_lap
+        self.left_over_energy = self._battery_capacity_joules - (self.laps_per_battery
+                                                                 * self._energy_per_lap)
+
+        self.race_time_per_battery = self.laps_per_battery * self._lap_time_minutes
+
+        no_configs = self._lap_time_minutes.size
+        no_days = len(self.gwc_times)
+
+        self.laps_per_day = np.zeros((no_configs, no_days))
+        self.pits_per_day = np.zeros((no_configs, no_days), dtype=int)
+        self.energy_remaining_per_day = np.zeros((no_configs, no_days))
+        self.total_laps = np.zeros(no_configs)
+
+    def calculate(self):
+        """Calculate the number of laps completed and other
+        numbers over all race days for all configurations.
+        """
+        stint_time = self.race_time_per_battery + self._pit_time
+
+        for day, gwc_time in enumerate(self.gwc_times):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # the car pits as long as the remaining race time is long enough to empty the battery, if not even a
+                # single lap fits on a battery the car pits until the end of the race day
+                number_of_pits = np.where(self.laps_per_battery > 0,
+                                          np.floor((gwc_time - self.race_time_per_battery) / stint_time) + 1,
+                                          np.ceil(gwc_time / stint_time))
+                number_of_pits = np.maximum(number_of_pits, 0)
+
+                accumulated_time = number_of_pits * stint_time
+
+                # laps on the last battery pack if the race day is not over yet
+                finishing = accumulated_time < gwc_time
+                possible_laps = np.where(finishing, (gwc_time - accumulated_time) // self._lap_time_minutes, 0.0)
+
+                self.laps_per_day[:, day] = number_of_pits * self.laps_per_battery + possible_laps
+                self.pits_per_day[:, day] = number_of_pits
+                self.energy_remaining_per_day[:, day] = np.where(finishing,
+                                                                 (possible_laps * self._energy_per_lap)
+                                                                 / self._battery_capacity_joules,
+                                                                 0.0)
+
+            self.total_laps += self.laps_per_day[:, day]
+
+
+class RaceSimMonteCarlo():
+    """Stochastic version of the RaceSim, the race of every car configuration
+    is simulated for many random samples of the race conditions:
+    - pit time: normally distributed around the nominal pit time
+    - caution periods (full course yellow): the number of cautions is Poisson
+      distributed, during a caution the lap time is increased and the energy
+      per lap is reduced (reduced throttle, cf. yellow_throttle of the driver)
+    - battery degradation: the usable battery capacity is reduced by a uniformly
+      distributed fraction
+
+    All samples of all configurations are simulated at once by a RaceSimBatch.
+    The race conditions are constant over a sample, i.e. the cautions are
+    distributed evenly over all race days.
+    """
+    def __init__(self, pit_time,
+                 gwc_times,
+                 lap_time,
+                 energy_per_lap,
+                 battery_capacity,
+                 no_samples,
+                 pit_time_std=0.0,
+                 caution_rate=0.0,
+                 caution_duration=0.0,
+                 caution_lap_time_factor=1.0,
+                 caution_energy_factor=1.0,
+                 battery_degradation_max=0.0,
+                 seed=None):
+        """
+        Inputs:
+            - pit_time (float or np.ndarray): nominal time to pit and change batteries in minutes
+            - gwc_times (list of float): list of race times in minutes for each day gwc stands for
+                green-white-chequered
+            - lap_time (float or np.ndarray): time to complete one lap in seconds (output from laptime sim)
+            - energy_per_lap (float or np.ndarray): energy consumed to complete one lap in joules (output from
+                laptime sim)
+            - battery_capacity (float or np.ndarray): energy capacity of battery in kWh (car property)
+            - no_samples (int): number of samples per configuration
+            - pit_time_std (float): standard deviation of the pit time in minutes
+            - caution_rate (float): mean number of cautions per hour of racing
+            - caution_duration (float): duration of a caution in minutes
+            - caution_lap_time_factor (float): lap time during a caution relative to the lap time
+            - caution_energy_factor (float): energy per lap during a caution relative to the energy per lap
+            - battery_degradation_max (float): maximum loss of battery capacity (0.05 -> 5 %)
+            - seed (int): seed of the random number generator
+
+        """
+        self.gwc_times = list(gwc_times)
+        self.no_samples = no_samples
+
+        pit_time, lap_time, energy_per_lap, battery_capacity = \
+            np.broadcast_arrays(*[np.atleast_1d(np.asarray(x, dtype=float))
+                                  for x in (pit_time, lap_time, energy_per_lap, battery_capacity)])
+
+        rng = np.random.default_rng(seed)
+        shape = (lap_time.size, no_samples)
+        total_race_time = sum(self.gwc_times)
+
+        # sample race conditions
+        self.pit_time = np.maximum(pit_time[:, None] + rng.normal(0.0, pit_time_std, shape), 0.0)
+        self.battery_capacity = battery_capacity[:, None] * (1.0 - rng.uniform(0.0, battery_degradation_max, shape))
+        self.caution_fraction = np.minimum(rng.poisson(caution_rate * total_race_time / 60.0, shape)
+                                           * caution_duration / total_race_time, 1.0)
+
+        # average lap time and energy per lap based on the fraction of the race time under caution
+        laps_per_second = (1.0 - self.caution_fraction) / lap_time[:, None] \
+            + self.caution_fraction / (lap_time[:, None] * caution_lap_time_factor)
+        energy_per_second = (1.0 - self.caution_fraction) * energy_per_lap[:, None] / lap_time[:, None] \
+            + self.caution_fraction * energy_per_lap[:, None] * caution_energy_factor \
+            / (lap_time[:, None] * caution_lap_time_factor)
+
+        self.lap_time = 1.0 / laps_per_second
+        self.energy_per_lap = energy_per_second * self.lap_time
+
+        self.total_laps = np.zeros(shape)
+
+    def calculate(self):
+        """Calculate the total number of laps of all samples of all configurations."""
+        race_sim = RaceSimBatch(pit_time=self.pit_time.ravel(),
+                                gwc_times=self.gwc_times,
+                                lap_time=self.lap_time.ravel(),
+                                energy_per_lap=self.energy_per_lap.ravel(),
+                                battery_capacity=self.battery_capacity.ravel())
+        race_sim.calculate()
+
+        self.total_laps = race_sim.total_laps.reshape(self.total_laps.shape)
+
+    def total_laps_percentiles(self, percentiles):
+        """Percentiles (list of float in 0 - 100) of the total laps, one row per configuration."""
+        return np.percentile(self.total_laps, percentiles, axis=1).T
+
+    def win_probability(self, winning_laps):
+        """Probability of every configuration to do more laps than the winning gas car."""
+        return np.mean(self.total_laps > winning_laps, axis=1)
+
+
 # Testing
 if __name__ == '__main__':
     lap_time = 55  # Seconds
@@ -0,0 +1,309 @@
+# sinks for the results of the sensitivity analysis, the results are written row by row
+# and buffered, the file format is chosen by the extension of the results file name
+import csv
+import glob
+import os
+import numpy as np
+import pandas as pd
+
+# pyarrow is optional, it is only required for the parquet and feather formats
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# supported formats, the npz format is a directory of npz files (one per buffered chunk of rows)
+RESULTS_FORMATS = ["csv", "npz", "parquet", "feather"]
+
+
+class CsvResultsSink():
+    """Results sink writing all rows to a csv file"""
+
+    def __init__(self, file_name, fieldnames, buffer_size, resume_position=None):
+        """Open the csv file and write the header row
+
+        Inputs:
+            - file_name (str): path of the csv file
+            - fieldnames (list): column names, the columns are written in this order
+            - buffer_size (int): number of rows that are buffered before writing them
+            - resume_position (int): position returned by get_position to continue writing an existing file at,
+            rows written after it are removed (None -> create a new file)
+        """
+
+        self._fieldnames = fieldnames
+        self._buffer_size = buffer_size
+        self._rows = []
+
+        if resume_position is None:
+            self._file = open(file_name, "w", newline='')
+            self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+            self._writer.writeheader()
+        else:
+            os.truncate(file_name, resume_position)
+            self._file = open(file_name, "a", newline='')
+            self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+
+    def write(self, row):
+        """Add a row (dict with keys from fieldnames), the buffer is written if it is full"""
+
+        self._rows.append(dict(row))
+
+        if len(self._rows) >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        self._writer.writerows(self._rows)
+        self._rows = []
+        self._file.flush()
+
+    def get_position(self):
+        """Size of the file in bytes, all rows written so far are contained (call flush before)"""
+
+        return os.fstat(self._file.fileno()).st_size
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class NpzResultsSink():
+    """Results sink writing the rows in columnar form to a directory of npz files,
+    every flush of the buffer creates a new file (part-00000.npz, part-00001.npz, ...)"""
+
+    def __init__(self, file_name, fieldnames, buffer_size, resume_position=None, dtypes=None):
+        """Create the results directory
+
+        Inputs:
+            - file_name (str): path of the results directory
+            - fieldnames (list): column names
+            - buffer_size (int): number of rows per npz file
+            - resume_position (int): position returned by get_position to continue writing an existing directory at,
+            files written after it are removed (None -> start with an empty directory)
+            - dtypes (dict): types of the columns that are not stored as float64 (see _to_column)
+        """
+
+        self._dir_name = file_name
+        self._fieldnames = fieldnames
+        self._dtypes = dtypes or {}
+        self._buffer_size = buffer_size
+        self._rows = []
+        self._no_parts = 0
+
+        os.makedirs(self._dir_name, exist_ok=True)
+
+        # remove files of previous runs
+        for part_file_name in glob.glob(os.path.join(self._dir_name, "part-*.npz")):
+            if resume_position is None or _get_part_number(part_file_name) >= resume_position:
+                os.remove(part_file_name)
+
+        if resume_position is not None:
+            self._no_parts = resume_position
+
+    def write(self, row):
+        """Add a row (dict with keys from fieldnames), the buffer is written if it is full"""
+
+        self._rows.append(dict(row))
+
+        if len(self._rows) >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+
+        # column names are stored in the same order as the columns themselves since they are no valid
+        # keyword arguments for np.savez
+        columns = [_to_column([row.get(fieldname, "") for row in self._rows], self._dtypes.get(fieldname))
+                   for fieldname in self._fieldnames]
+
+        np.savez(os.path.join(self._dir_name, "part-%05i.npz" % self._no_parts),
+                 fieldnames=np.array(self._fieldnames),
+                 **{"column_%i" % i: column for i, column in enumerate(columns)})
+
+        self._no_parts += 1
+        self._rows = []
+
+    def get_position(self):
+        """Number of npz files, all rows written so far are contained (call flush before)"""
+
+        return self._no_parts
+
+    def close(self):
+        self.flush()
+
+
+class ArrowResultsSink():
+    """Results sink writing the rows in columnar form to a parquet or feather file
+    (requires pyarrow), every flush of the buffer writes a new row group/record batch"""
+
+    def __init__(self, file_name, fieldnames, buffer_size, results_format, resume_position=None, dtypes=None):
+        """Inputs:
+            - file_name (str): path of the results file
+            - fieldnames (list): column names
+            - buffer_size (int): number of rows that are buffered before writing them
+            - results_format (str): parquet or feather
+            - resume_position (int): not supported, parquet and feather files cannot be continued
+            - dtypes (dict): types of the columns that are not stored as float64 (see _to_column)
+
+        Raises:
+            - ImportError if pyarrow is not installed
+            - IOError if resume_position is given
+        """
+
+        if pyarrow is None:
+            raise ImportError("pyarrow is required for the {} results format (pip3 install pyarrow)!"
+                              .format(results_format))
+
+        if resume_position is not None:
+            raise IOError("Resuming is not supported for the {} results format!".format(results_format))
+
+        self._file_name = file_name
+        self._fieldnames = fieldnames
+        self._buffer_size = buffer_size
+        self._results_format = results_format
+        self._dtypes = dtypes or {}
+        self._rows = []
+        self._writer = None
+
+    def write(self, row):
+        """Add a row (dict with keys from fieldnames), the buffer is written if it is full"""
+
+        self._rows.append(dict(row))
+
+        if len(self._rows) >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+
+        table = pyarrow.Table.from_pydict({fieldname: _to_column([row.get(fieldname, "") for row in self._rows],
+                                                                 self._dtypes.get(fieldname))
+                                           for fieldname in self._fieldnames})
+
+        # the schema is defined by the first chunk of rows (the numeric types of all chunks are the same, see
+        # _to_column)
+        if self._writer is None:
+            if self._results_format == "parquet":
+                self._writer = pyarrow.parquet.ParquetWriter(self._file_name, table.schema)
+            else:
+                self._writer = pyarrow.ipc.new_file(self._file_name, table.schema)
+        else:
+            table = table.cast(self._writer.schema)
+
+        self._writer.write_table(table)
+        self._rows = []
+
+    def get_position(self):
+        return None
+
+    def close(self):
+        self.flush()
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def _to_column(values, dtype=None):
+    """Convert the values of a column to a typed numpy array of the given dtype. Without dtype,
+    numeric values are stored as float64 (such that the type does not depend on the values of a
+    chunk, e.g. integers, floats and nan), values that have no numpy type (e.g. lists like the
+    gear ratios) are stored as strings"""
+
+    if dtype is not None:
+        return np.asarray(values, dtype=dtype)
+
+    column = np.asarray(values)
+
+    if column.dtype == object or column.ndim != 1:
+        column = np.array([str(value) for value in values])
+    elif column.dtype.kind in "iuf":
+        column = column.astype(np.float64)
+
+    return column
+
+
+def _get_part_number(part_file_name):
+    # part-00012.npz -> 12
+    return int(os.path.basename(part_file_name)[5:-4])
+
+
+def get_results_format(file_name):
+    """Get the results format from the extension of the results file name"""
+
+    results_format = os.path.splitext(file_name)[1].lstrip(".")
+
+    if results_format not in RESULTS_FORMATS:
+        raise IOError("Unknown results format {}!".format(results_format))
+
+    return results_format
+
+
+def create_results_sink(file_name, fieldnames, buffer_size=1, resume_position=None, dtypes=None):
+    """Create the results sink matching the extension of the results file name
+
+    Inputs:
+        - file_name (str): path of the results file, the extension selects the format (see RESULTS_FORMATS)
+        - fieldnames (list): column names
+        - buffer_size (int): number of rows that are buffered before writing them
+        - resume_position (int): position returned by get_position of a previous sink to continue the results
+        file at (csv and npz only), None -> create a new results file
+        - dtypes (dict): types of the columns of the columnar formats that are not stored as float64 (e.g.
+        integer and boolean columns, see definitions.RESULTS_DTYPES)
+
+    Outputs:
+        - sink: object with the methods write(row), flush(), get_position() and close()
+
+    Raises:
+        - IOError if the format is unknown or cannot be resumed
+        - ImportError if the format requires pyarrow and it is not installed
+    """
+
+    results_format = get_results_format(file_name)
+
+    if results_format == "csv":
+        return CsvResultsSink(file_name=file_name, fieldnames=fieldnames, buffer_size=buffer_size,
+                              resume_position=resume_position)
+    elif results_format == "npz":
+        return NpzResultsSink(file_name=file_name, fieldnames=fieldnames, buffer_size=buffer_size,
+                              resume_position=resume_position, dtypes=dtypes)
+    else:
+        return ArrowResultsSink(file_name=file_name, fieldnames=fieldnames, buffer_size=buffer_size,
+                                results_format=results_format, resume_position=resume_position, dtypes=dtypes)
+
+
+def read_results(file_name):
+    """Read a results file written by one of the results sinks
+
+    Inputs:
+        - file_name (str): path of the results file, the extension selects the format (see RESULTS_FORMATS)
+
+    Outputs:
+        - data (pd.DataFrame): results, one row per iteration
+
+    Raises:
+        - IOError if the format is unknown
+    """
+
+    results_format = get_results_format(file_name)
+
+    if results_format == "csv":
+        return pd.read_csv(file_name)
+    elif results_format == "parquet":
+        return pd.read_parquet(file_name)
+    elif results_format == "feather":
+        return pd.read_feather(file_name)
+
+    # npz -> concatenate the columns of all parts
+    parts = []
+
+    for part_file_name in sorted(glob.glob(os.path.join(file_name, "part-*.npz")), key=_get_part_number):
+        with np.load(part_file_name) as part:
+            parts.append(pd.DataFrame({fieldname: part["column_%i" % i]
+                                       for i, fieldname in enumerate(part["fieldnames"].tolist())}))
+
+    return pd.concat(parts, ignore_index=True)
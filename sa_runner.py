@@ -0,0 +1,374 @@
+# runner for the sensitivity analysis, executes the lap and race simulation for every
+# iteration in the datastore either serially, batch-wise or on a pool of worker processes
+import concurrent.futures
+import itertools
+import numpy as np
+import laptimesim
+
+from race_sim import RaceSim, RaceSimBatch
+
+from definitions import (
+    GWC_TIMES_TAG, PIT_DRIVE_THROUGH_PENALTY_TIME
+)
+
+# lap object and lap result cache of a worker process, they are created once per worker in
+# _init_worker and reused for all iterations that are executed by this worker
+_worker_lap = None
+_worker_lap_cache = None
+
+
+def _race_results(race_car_model, track_pars, lap_time, lap_energy):
+    """Simulate the race based on the lap time and energy (in J) of a car and assemble the iteration results
+    (see simulate_iteration)"""
+
+    total_pit_time = race_car_model.general_parameters.pit_time + track_pars[PIT_DRIVE_THROUGH_PENALTY_TIME]
+
+    race_sim = RaceSim(pit_time=total_pit_time,
+                       gwc_times=track_pars[GWC_TIMES_TAG],
+                       lap_time=lap_time,
+                       energy_per_lap=lap_energy,
+                       battery_capacity=race_car_model.battery_parameters.size)
+    race_sim.calculate()
+
+    total_pits = 0
+    energy_remaining = 0
+    for day in race_sim.race_days:
+        total_pits += day.number_of_pits
+        energy_remaining += day.energy_remaining * 100  # for percentage conversion
+
+    is_winning_car_configuration = race_sim.total_laps > track_pars["winning_laps"]
+
+    results = {
+        "lap_time": lap_time,
+        "total_laps": int(race_sim.total_laps),  # whole number of laps, float due to the floor divisions
+        "lap_energy": lap_energy / 1000,  # 1000 factor fo J -> kJ
+        "total_pits": total_pits,
+        "energy_remaining": energy_remaining,
+        "is_winning_car_configuration": is_winning_car_configuration
+    }
+
+    return results
+
+
+def simulate_iteration(lap, race_car_model, track_pars, lap_cache=None):
+    """Simulate a lap and the race for a single sensitivity analysis iteration.
+
+    The car object of the lap is replaced by a car built from the race car model,
+    the lap is simulated and reset afterwards so the lap object can be reused for
+    the next iteration. If the same car was simulated before, the lap result is
+    taken from the lap result cache instead.
+
+    Inputs:
+        - lap (laptimesim.src.lap.Lap): lap object used for the simulation
+        - race_car_model (RaceCarModel): race car model of the iteration, car properties must be calculated
+        - track_pars (dict): dictionary of track parameters of a single track from track_pars.toml
+        - lap_cache (LapResultCache): cache of lap results, None -> every lap is simulated
+
+    Outputs:
+        - results (dict): keyword arguments for DataStore.set_single_iteration_results
+        (without the iteration number)
+
+    Raises:
+        - Nothing
+    """
+
+    veh_pars = race_car_model.get_car_parameters_for_laptimesim()
+
+    if lap_cache is not None:
+        lap_cache_key = lap_cache.make_key(veh_pars=veh_pars)
+        lap_result = lap_cache.get(lap_cache_key)
+    else:
+        lap_result = None
+
+    # profile of the lap simulation (None -> profiling deactivated or cached lap)
+    profile = None
+
+    if lap_result is not None:
+        lap_time, lap_energy = lap_result
+    else:
+        car = laptimesim.src.car_electric.CarElectric(pars=veh_pars)
+
+        # change properties of vehicle in the lap simulation
+        lap.driverobj.carobj = car
+
+        # simulate lap and save lap time
+        # I made sure there was no other initialization needed,
+        # we know this violates the object oriented world.
+        # we know this isn't the best practiced but we
+        # double checked that this was ok and there
+        # wasn't any other initialization required or dependencies
+        lap.simulate_lap()
+
+        lap_time = lap.t_cl[-1]
+        lap_energy = lap.e_cons_cl[-1]
+
+        if lap.profiler is not None:
+            profile = lap.profiler.get_summary()
+
+        lap.reset_lap()
+
+        if lap_cache is not None:
+            lap_cache.put(lap_cache_key, lap_time=lap_time, lap_energy=lap_energy)
+
+    results = _race_results(race_car_model=race_car_model,
+                            track_pars=track_pars,
+                            lap_time=lap_time,
+                            lap_energy=lap_energy)
+    results["profile"] = profile
+
+    return results
+
+
+def _store_results(datastore, iteration, results):
+    """Hand the results of a single iteration to the datastore and print a short summary"""
+
+    datastore.set_single_iteration_results(iteration=iteration, **results)
+
+    print("Solver run {}. Winning car?: {}, total laps: {}".format(iteration,
+                                                                   results["is_winning_car_configuration"],
+                                                                   results["total_laps"]))
+
+
+def run_serial(lap, datastore, track_pars, lap_cache=None):
+    """Run all iterations of the datastore one after another in the current process.
+
+    Inputs:
+        - lap (laptimesim.src.lap.Lap): lap object used for all iterations
+        - datastore (DataStore): datastore containing the iterations, results are written back to it
+        - track_pars (dict): dictionary of track parameters of a single track from track_pars.toml
+        - lap_cache (LapResultCache): cache of lap results, None -> every lap is simulated
+
+    Outputs:
+        - None
+
+    Raises:
+        - Nothing
+    """
+
+    for i, single_simulation_data in datastore.iterate_sa_combinations():
+        print("SA: Starting solver run (%i)" % (i + 1))
+
+        results = simulate_iteration(lap=lap,
+                                     race_car_model=single_simulation_data.race_car_model,
+                                     track_pars=track_pars,
+                                     lap_cache=lap_cache)
+
+        _store_results(datastore=datastore, iteration=i, results=results)
+
+
+def _init_worker(track, solver_opts, driver_opts, debug_opts, race_car_model, lap_cache):
+    """Initializer of a worker process, creates the driver and lap objects of the worker.
+    The track and the lap result cache are created once in the main process and copied into
+    every worker (the on-disk store of the cache is shared by all workers)."""
+
+    global _worker_lap, _worker_lap_cache
+
+    _worker_lap_cache = lap_cache
+
+    car = laptimesim.src.car_electric.CarElectric(pars=race_car_model.get_car_parameters_for_laptimesim())
+
+    driver = laptimesim.src.driver.Driver(carobj=car,
+                                          pars_driver=driver_opts,
+                                          trackobj=track,
+                                          stepsize=track.stepsize)
+
+    _worker_lap = laptimesim.src.lap.Lap(driverobj=driver,
+                                         trackobj=track,
+                                         pars_solver=solver_opts,
+                                         debug_opts=debug_opts)
+
+
+def _run_worker_iteration(iteration, race_car_model, track_pars):
+    """Task executed in a worker process, simulates a single iteration with the lap object of the worker"""
+
+    return iteration, simulate_iteration(lap=_worker_lap,
+                                         race_car_model=race_car_model,
+                                         track_pars=track_pars,
+                                         lap_cache=_worker_lap_cache)
+
+
+def run_parallel(track, solver_opts, driver_opts, debug_opts, datastore, track_pars, no_workers, lap_cache=None):
+    """Run all iterations of the datastore on a pool of worker processes.
+
+    Every worker gets its own driver and lap object while the track is only created once
+    and copied to the workers. The number of iterations in flight is limited to a few per
+    worker and results are streamed back into the datastore as soon as they are finished.
+    Writing to the datastore happens in the main process only.
+
+    Inputs:
+        - track (laptimesim.src.track.Track): track object used for all iterations
+        - solver_opts (dict): solver options from sim_config.toml
+        - driver_opts (dict): driver options from sim_config.toml
+        - debug_opts (dict): debug options from sim_config.toml
+        - datastore (DataStore): datastore containing the iterations, results are written back to it
+        - track_pars (dict): dictionary of track parameters of a single track from track_pars.toml
+        - no_workers (int): number of worker processes
+        - lap_cache (LapResultCache): cache of lap results, None -> every lap is simulated
+
+    Outputs:
+        - None
+
+    Raises:
+        - Exceptions raised within a worker are raised again in the main process
+    """
+
+    first_race_car_model = datastore.get_first_race_car_model()
+
+    if first_race_car_model is None:
+        return
+
+    max_iterations_in_flight = 2 * no_workers
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=no_workers,
+                                                initializer=_init_worker,
+                                                initargs=(track, solver_opts, driver_opts, debug_opts,
+                                                          first_race_car_model, lap_cache)) as executor:
+        futures = set()
+
+        for i, single_simulation_data in datastore.iterate_sa_combinations():
+            print("SA: Starting solver run (%i)" % (i + 1))
+
+            futures.add(executor.submit(_run_worker_iteration,
+                                        i,
+                                        single_simulation_data.race_car_model,
+                                        track_pars))
+
+            # wait for some results before submitting more iterations
+            if len(futures) >= max_iterations_in_flight:
+                done, futures = concurrent.futures.wait(futures,
+                                                        return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    iteration, results = future.result()
+                    _store_results(datastore=datastore, iteration=iteration, results=results)
+
+        for future in concurrent.futures.as_completed(futures):
+            iteration, results = future.result()
+            _store_results(datastore=datastore, iteration=iteration, results=results)
+
+
+def _race_results_batch(race_car_models, track_pars, lap_times, lap_energies):
+    """Vectorized version of _race_results for several cars, the race of all cars is simulated at once by a
+    RaceSimBatch object. Returns a list of the results of all cars."""
+
+    race_sim = RaceSimBatch(pit_time=[race_car_model.general_parameters.pit_time
+                                      + track_pars[PIT_DRIVE_THROUGH_PENALTY_TIME]
+                                      for race_car_model in race_car_models],
+                            gwc_times=track_pars[GWC_TIMES_TAG],
+                            lap_time=lap_times,
+                            energy_per_lap=lap_energies,
+                            battery_capacity=[race_car_model.battery_parameters.size
+                                              for race_car_model in race_car_models])
+    race_sim.calculate()
+
+    total_pits = 0
+    energy_remaining = 0
+    for day in range(len(race_sim.gwc_times)):
+        total_pits += race_sim.pits_per_day[:, day]
+        energy_remaining += race_sim.energy_remaining_per_day[:, day] * 100  # for percentage conversion
+
+    is_winning_car_configuration = race_sim.total_laps > track_pars["winning_laps"]
+
+    return [{
+        "lap_time": float(lap_times[k]),
+        "total_laps": int(race_sim.total_laps[k]),
+        "lap_energy": float(lap_energies[k]) / 1000,  # 1000 factor fo J -> kJ
+        "total_pits": int(total_pits[k]),
+        "energy_remaining": float(energy_remaining[k]),
+        "is_winning_car_configuration": bool(is_winning_car_configuration[k])
+    } for k in range(len(race_car_models))]
+
+
+def run_batched(track, solver_opts, driver_opts, debug_opts, datastore, track_pars, batch_size, lap_cache=None):
+    """Run the iterations of the datastore in batches of cars that are simulated together.
+
+    The laps of all cars of a batch are solved at once by a LapBatch object (see
+    laptimesim/src/lap_batch.py), i.e. the velocity profiles of all cars are advanced
+    together. This amortizes the python overhead of the solver across the batch. Cars whose
+    lap is cached or that appear several times in a batch are only simulated once. The solver
+    options calc_max_ax_mode, warm_start and backend are ignored (a warning is printed).
+
+    Inputs:
+        - track (laptimesim.src.track.Track): track object used for all iterations
+        - solver_opts (dict): solver options from sim_config.toml
+        - driver_opts (dict): driver options from sim_config.toml
+        - debug_opts (dict): debug options from sim_config.toml
+        - datastore (DataStore): datastore containing the iterations, results are written back to it
+        - track_pars (dict): dictionary of track parameters of a single track from track_pars.toml
+        - batch_size (int): number of cars simulated together
+        - lap_cache (LapResultCache): cache of lap results, None -> every lap is simulated
+
+    Outputs:
+        - None
+
+    Raises:
+        - IOError if the driver options are not supported by the batched solver
+    """
+
+    # the batched solver always determines the maximum longitudinal acceleration by the binary search and starts every
+    # batch cold, i.e. these solver options do not apply to it
+    solver_opts_batch = {"calc_max_ax_mode": "search", "warm_start": False, "backend": "python"}
+    ignored_solver_opts = [name for name, value in solver_opts_batch.items() if solver_opts.get(name, value) != value]
+
+    if ignored_solver_opts:
+        print("WARNING: The solver options %s are ignored by the batched solver!" % ", ".join(ignored_solver_opts))
+
+    iterations = datastore.iterate_sa_combinations()
+
+    while True:
+        batch = list(itertools.islice(iterations, batch_size))
+
+        if not batch:
+            break
+
+        print("SA: Starting batched solver runs (%i - %i)" % (batch[0][0] + 1, batch[-1][0] + 1))
+
+        veh_pars = [single_simulation_data.race_car_model.get_car_parameters_for_laptimesim()
+                    for _, single_simulation_data in batch]
+
+        if lap_cache is not None:
+            keys = [lap_cache.make_key(veh_pars=veh_pars_car) for veh_pars_car in veh_pars]
+        else:
+            keys = list(range(len(batch)))
+
+        # get cached lap results, collect the cars that must be simulated
+        lap_results = {}
+        keys_sim = []
+        veh_pars_sim = []
+
+        for key, veh_pars_car in zip(keys, veh_pars):
+            if key in lap_results:
+                continue
+
+            lap_result = lap_cache.get(key) if lap_cache is not None else None
+
+            if lap_result is not None:
+                lap_results[key] = lap_result
+            else:
+                lap_results[key] = None
+                keys_sim.append(key)
+                veh_pars_sim.append(veh_pars_car)
+
+        if keys_sim:
+            cars = [laptimesim.src.car_electric.CarElectric(pars=veh_pars_car) for veh_pars_car in veh_pars_sim]
+
+            lap_batch = laptimesim.src.lap_batch.LapBatch(carobjs=cars,
+                                                          pars_driver=driver_opts,
+                                                          trackobj=track,
+                                                          pars_solver=solver_opts,
+                                                          debug_opts=debug_opts)
+            lap_batch.simulate_lap()
+
+            for k, key in enumerate(keys_sim):
+                lap_results[key] = (lap_batch.t_cl[k, -1], lap_batch.e_cons_cl[k, -1])
+
+                if lap_cache is not None:
+                    lap_cache.put(key, lap_time=lap_results[key][0], lap_energy=lap_results[key][1])
+
+        results = _race_results_batch(race_car_models=[single_simulation_data.race_car_model
+                                                       for _, single_simulation_data in batch],
+                                      track_pars=track_pars,
+                                      lap_times=np.array([lap_results[key][0] for key in keys]),
+                                      lap_energies=np.array([lap_results[key][1] for key in keys]))
+
+        for (i, _), results_car in zip(batch, results):
+            _store_results(datastore=datastore, iteration=i, results=results_car)
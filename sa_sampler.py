@@ -0,0 +1,401 @@
+# samplers of the sensitivity analysis space, the grid sampler creates all combinations of the sa variables
+# while the other samplers only use a given number of samples (latin hypercube, sobol sequence, adaptive refinement,
+# surrogate model optimization)
+import math
+import numpy as np
+
+SAMPLING_METHODS = ["grid", "lhs", "sobol", "adaptive", "surrogate"]
+
+# length scales (unit cube) of the gaussian process of the surrogate sampler, the one with the highest marginal
+# likelihood is used
+GP_LENGTH_SCALES = [0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5]
+
+# noise of the gaussian process relative to the variance of the total laps (the total laps are whole numbers)
+GP_NOISE = 1e-3
+
+# number of random candidates per dimension the next samples of the surrogate sampler are chosen from
+NO_CANDIDATES_PER_DIM = 500
+
+
+class GridSampler():
+    """All combinations of the explicit values of the sa variables, the samples are numbered in the
+    order of itertools.product over all sa variables (the last variable changes fastest)"""
+
+    def __init__(self, explicit_values):
+        """
+        Inputs:
+            - explicit_values (list): explicit values (list or np.ndarray) of every sa variable
+        """
+
+        self._explicit_values = explicit_values
+
+        self.no_samples = 1
+        for values in self._explicit_values:
+            self.no_samples *= len(values)
+
+    def get_values(self, start, stop):
+        """Get the values of the sa variables of the samples start to stop (exclusive), returns a list with a
+        numpy array (one value per sample) for every swept variable and the single value for the other ones"""
+
+        # index of every sa variable within its list of explicit values
+        value_inds = np.unravel_index(np.arange(start, stop), [len(values) for values in self._explicit_values])
+
+        return [values[0] if len(values) == 1 else values[inds]
+                for values, inds in zip(self._explicit_values, value_inds)]
+
+    def set_results(self, sample, total_laps, is_winning_car_configuration):
+        pass
+
+    def refine(self):
+        return False
+
+
+class UnitCubeSampler():
+    """Base class of the samplers that sample the unit cube of the swept sa variables, every swept variable
+    is mapped linearly from [0, 1] to the range between its first and its last explicit value"""
+
+    def __init__(self, explicit_values, seed):
+        """
+        Inputs:
+            - explicit_values (list): explicit values (list or np.ndarray) of every sa variable, variables with a
+            single value are not swept
+            - seed (int): seed of the random number generator
+        """
+
+        self._explicit_values = explicit_values
+        self._swept = [len(values) > 1 for values in self._explicit_values]
+        self._rng = np.random.default_rng(seed)
+
+        # samples in the unit cube, one row per sample and one column per swept variable
+        self._unit_samples = np.zeros((0, self.no_dims))
+
+        # results of the samples, NaN -> not simulated (yet or out of rule spec)
+        self._total_laps = np.zeros(0)
+        self._is_winning = np.zeros(0, dtype=bool)
+
+    @property
+    def no_dims(self) -> int:
+        return sum(self._swept)
+
+    @property
+    def no_samples(self) -> int:
+        return self._unit_samples.shape[0]
+
+    def get_values(self, start, stop):
+        """Get the values of the sa variables of the samples start to stop (exclusive), returns a list with a
+        numpy array (one value per sample) for every swept variable and the single value for the other ones"""
+
+        values_samples = []
+        dim = 0
+
+        for values, swept in zip(self._explicit_values, self._swept):
+            if swept:
+                values_samples.append(values[0] + self._unit_samples[start:stop, dim] * (values[-1] - values[0]))
+                dim += 1
+            else:
+                values_samples.append(values[0])
+
+        return values_samples
+
+    def set_results(self, sample, total_laps, is_winning_car_configuration):
+        self._total_laps[sample] = total_laps
+        self._is_winning[sample] = is_winning_car_configuration
+
+    def refine(self):
+        return False
+
+    def _add_samples(self, unit_samples):
+        self._unit_samples = np.vstack((self._unit_samples, unit_samples))
+        self._total_laps = np.concatenate((self._total_laps, np.full(unit_samples.shape[0], np.nan)))
+        self._is_winning = np.concatenate((self._is_winning, np.zeros(unit_samples.shape[0], dtype=bool)))
+
+
+class LatinHypercubeSampler(UnitCubeSampler):
+    """Latin hypercube sampling, the range of every swept variable is divided into no_samples intervals of
+    equal size and every interval contains exactly one sample"""
+
+    def __init__(self, explicit_values, no_samples, seed):
+        UnitCubeSampler.__init__(self, explicit_values=explicit_values, seed=seed)
+
+        self._add_samples(latin_hypercube(no_samples=no_samples if self.no_dims > 0 else 1,
+                                          no_dims=self.no_dims,
+                                          rng=self._rng))
+
+
+class SobolSampler(UnitCubeSampler):
+    """Scrambled sobol sequence (requires scipy), the first no_samples points of the sequence are used,
+    the space is covered most evenly for powers of two"""
+
+    def __init__(self, explicit_values, no_samples, seed):
+        """
+        Raises:
+            - ImportError if scipy is not installed
+        """
+
+        # scipy is optional (and slow to import), it is only required for the sobol sampling method
+        try:
+            from scipy.stats import qmc
+        except ImportError:
+            raise ImportError("scipy is required for the sobol sampling method (pip3 install scipy)!")
+
+        UnitCubeSampler.__init__(self, explicit_values=explicit_values, seed=seed)
+
+        if self.no_dims > 0:
+            sobol = qmc.Sobol(d=self.no_dims, scramble=True, seed=self._rng)
+            self._add_samples(sobol.random_base2(m=math.ceil(math.log2(max(no_samples, 1))))[:no_samples])
+        else:
+            self._add_samples(np.zeros((1, 0)))
+
+
+class AdaptiveSampler(UnitCubeSampler):
+    """Adaptive sampling, starts with a latin hypercube and adds samples in refinement rounds. Half of the
+    samples of a round are placed around the sample with the most total laps, the other half around the
+    boundary between winning and losing car configurations (midpoints of the closest pairs of winning and
+    losing samples). The size of the refined regions is halved every round."""
+
+    def __init__(self, explicit_values, no_samples, no_refinement_rounds, no_refinement_samples, refinement_radius,
+                 seed):
+        """
+        Inputs:
+            - explicit_values (list): explicit values (list or np.ndarray) of every sa variable
+            - no_samples (int): number of samples of the initial latin hypercube
+            - no_refinement_rounds (int): number of refinement rounds
+            - no_refinement_samples (int): number of samples per refinement round
+            - refinement_radius (float): half size of the refined regions in the first round relative to the
+            ranges of the sa variables
+            - seed (int): seed of the random number generator
+        """
+
+        UnitCubeSampler.__init__(self, explicit_values=explicit_values, seed=seed)
+
+        self._no_refinement_rounds = no_refinement_rounds
+        self._no_refinement_samples = no_refinement_samples
+        self._refinement_radius = refinement_radius
+        self._round = 0
+
+        self._add_samples(latin_hypercube(no_samples=no_samples if self.no_dims > 0 else 1,
+                                          no_dims=self.no_dims,
+                                          rng=self._rng))
+
+    def refine(self):
+        """Add the samples of the next refinement round based on the results of all previous samples,
+        returns False if there are no new samples"""
+
+        if self._round >= self._no_refinement_rounds or self.no_dims == 0 or np.all(np.isnan(self._total_laps)):
+            return False
+
+        radius = self._refinement_radius * 0.5 ** self._round
+        self._round += 1
+
+        # centers of the refined regions: closest pairs of winning and losing samples and the best sample
+        is_simulated = ~np.isnan(self._total_laps)
+        winning_samples = self._unit_samples[is_simulated & self._is_winning]
+        losing_samples = self._unit_samples[is_simulated & ~self._is_winning]
+
+        if winning_samples.shape[0] > 0 and losing_samples.shape[0] > 0:
+            dists = np.linalg.norm(winning_samples[:, np.newaxis, :] - losing_samples[np.newaxis, :, :], axis=2)
+            inds_winning, inds_losing = np.unravel_index(np.argsort(dists, axis=None), dists.shape)
+            centers_boundary = 0.5 * (winning_samples[inds_winning] + losing_samples[inds_losing])
+            no_samples_boundary = self._no_refinement_samples // 2
+        else:
+            centers_boundary = np.zeros((0, self.no_dims))
+            no_samples_boundary = 0
+
+        centers = np.vstack((centers_boundary[np.arange(no_samples_boundary) % max(centers_boundary.shape[0], 1)],
+                             np.repeat(self._unit_samples[np.nanargmax(self._total_laps)][np.newaxis, :],
+                                       self._no_refinement_samples - no_samples_boundary, axis=0)))
+
+        new_samples = np.clip(centers + self._rng.uniform(-radius, radius, size=centers.shape), 0.0, 1.0)
+        self._add_samples(new_samples)
+
+        return new_samples.shape[0] > 0
+
+
+class SurrogateSampler(UnitCubeSampler):
+    """Surrogate model optimization of the total laps, starts with a latin hypercube and adds batches of
+    samples in optimization rounds. A gaussian process is fitted to the total laps of all simulated samples,
+    the samples of a batch maximize the expected improvement (the batch is chosen greedily, the gaussian
+    process believes its own prediction at the samples chosen before). Samples that are out of rule spec are
+    fitted with the fewest total laps such that the optimization stays away from them. The optimization
+    stops if the expected improvement is below ei_tol."""
+
+    def __init__(self, explicit_values, no_samples, no_refinement_rounds, no_refinement_samples, ei_tol, seed):
+        """
+        Inputs:
+            - explicit_values (list): explicit values (list or np.ndarray) of every sa variable
+            - no_samples (int): number of samples of the initial latin hypercube
+            - no_refinement_rounds (int): maximum number of optimization rounds
+            - no_refinement_samples (int): number of samples per optimization round (batch size)
+            - ei_tol (float): expected improvement of the total laps below which the optimization stops
+            - seed (int): seed of the random number generator
+        """
+
+        UnitCubeSampler.__init__(self, explicit_values=explicit_values, seed=seed)
+
+        self._no_refinement_rounds = no_refinement_rounds
+        self._no_refinement_samples = no_refinement_samples
+        self._ei_tol = ei_tol
+        self._round = 0
+
+        self._add_samples(latin_hypercube(no_samples=no_samples if self.no_dims > 0 else 1,
+                                          no_dims=self.no_dims,
+                                          rng=self._rng))
+
+    def refine(self):
+        """Add the samples of the next optimization round based on the results of all previous samples,
+        returns False if the optimization is finished"""
+
+        if self._round >= self._no_refinement_rounds or self.no_dims == 0 or np.all(np.isnan(self._total_laps)):
+            return False
+
+        self._round += 1
+
+        # normalized total laps, samples without results are fitted with the fewest total laps
+        total_laps = np.where(np.isnan(self._total_laps), np.nanmin(self._total_laps), self._total_laps)
+        total_laps_mean = np.mean(total_laps)
+        total_laps_std = max(np.std(total_laps), 1.0)
+
+        x = self._unit_samples
+        y = (total_laps - total_laps_mean) / total_laps_std
+        y_best = np.max(y)
+
+        gp = GaussianProcess(x=x, y=y)
+        candidates = self._rng.random((NO_CANDIDATES_PER_DIM * self.no_dims, self.no_dims))
+        new_samples = []
+
+        for k in range(self._no_refinement_samples):
+            mu, sigma = gp.predict(candidates)
+            ei = expected_improvement(mu=mu, sigma=sigma, y_best=y_best)
+            ind = np.argmax(ei)
+
+            # the expected improvement of the first sample decides whether the optimization is finished
+            if k == 0 and ei[ind] * total_laps_std < self._ei_tol:
+                return False
+
+            new_samples.append(candidates[ind])
+
+            # believe the prediction at the chosen sample such that the next ones are placed elsewhere
+            x = np.vstack((x, candidates[ind]))
+            y = np.append(y, mu[ind])
+            gp = GaussianProcess(x=x, y=y, length_scale=gp.length_scale)
+            candidates = np.delete(candidates, ind, axis=0)
+
+        self._add_samples(np.array(new_samples))
+
+        return True
+
+
+class GaussianProcess():
+    """Gaussian process regression with a squared exponential kernel of unit variance, the length scale is
+    chosen from GP_LENGTH_SCALES by the marginal likelihood if it is not given"""
+
+    def __init__(self, x, y, length_scale=None):
+        """
+        Inputs:
+            - x (np.ndarray): inputs, one row per sample
+            - y (np.ndarray): outputs (normalized to zero mean and unit variance)
+            - length_scale (float): length scale of the kernel, None -> maximize the marginal likelihood
+        """
+
+        self._x = x
+
+        if length_scale is None:
+            log_likelihoods = [self._fit(y=y, length_scale=length_scale_)
+                               for length_scale_ in GP_LENGTH_SCALES]
+            length_scale = GP_LENGTH_SCALES[int(np.argmax(log_likelihoods))]
+
+        self._fit(y=y, length_scale=length_scale)
+
+    def _fit(self, y, length_scale):
+        # cholesky factorization of the kernel matrix, returns the log marginal likelihood
+        self.length_scale = length_scale
+        self._chol = np.linalg.cholesky(self._kernel(self._x, self._x) + GP_NOISE * np.eye(self._x.shape[0]))
+        self._alpha = np.linalg.solve(self._chol.T, np.linalg.solve(self._chol, y))
+
+        return -0.5 * np.dot(y, self._alpha) - np.sum(np.log(np.diag(self._chol)))
+
+    def _kernel(self, x_a, x_b):
+        dists_sq = np.sum((x_a[:, np.newaxis, :] - x_b[np.newaxis, :, :]) ** 2, axis=2)
+
+        return np.exp(-0.5 * dists_sq / self.length_scale ** 2)
+
+    def predict(self, x):
+        """Get the mean and standard deviation of the prediction at the inputs x"""
+
+        kernel_x = self._kernel(self._x, x)
+        v = np.linalg.solve(self._chol, kernel_x)
+
+        mu = kernel_x.T @ self._alpha
+        sigma = np.sqrt(np.maximum(1.0 - np.sum(v ** 2, axis=0), 0.0))
+
+        return mu, sigma
+
+
+def latin_hypercube(no_samples, no_dims, rng):
+    """Latin hypercube in the unit cube, returns an array of shape (no_samples, no_dims)"""
+
+    strata = np.argsort(rng.random((no_samples, no_dims)), axis=0)
+
+    return (strata + rng.random((no_samples, no_dims))) / no_samples
+
+
+def expected_improvement(mu, sigma, y_best):
+    """Expected improvement over y_best of a maximization for predictions with mean mu and standard deviation
+    sigma"""
+
+    improvement = mu - y_best
+    z = improvement / np.maximum(sigma, 1e-12)
+    cdf = 0.5 * (1.0 + np.vectorize(math.erf, otypes=[float])(z / math.sqrt(2.0)))
+    pdf = np.exp(-0.5 * z ** 2) / math.sqrt(2.0 * math.pi)
+
+    return np.where(sigma > 0.0, improvement * cdf + sigma * pdf, np.maximum(improvement, 0.0))
+
+
+def create_sampler(sampling_opts, explicit_values):
+    """Create the sampler of the sensitivity analysis
+
+    Inputs:
+        - sampling_opts (dict): sampling section of the car config, the method key selects the sampler (see
+        SAMPLING_METHODS), the other keys depend on the method:
+            lhs, sobol: no_samples, seed
+            adaptive: no_samples, no_refinement_rounds, no_refinement_samples, refinement_radius, seed
+            surrogate: no_samples, no_refinement_rounds, no_refinement_samples, ei_tol, seed
+        - explicit_values (list): explicit values (list or np.ndarray) of every sa variable
+
+    Outputs:
+        - sampler: object with the attribute no_samples and the methods get_values(start, stop),
+        set_results(sample, total_laps, is_winning_car_configuration) and refine()
+
+    Raises:
+        - IOError if the sampling method is unknown
+        - ImportError if the sampling method requires scipy and it is not installed
+    """
+
+    method = sampling_opts["method"]
+
+    if method == "grid":
+        return GridSampler(explicit_values=explicit_values)
+    elif method == "lhs":
+        return LatinHypercubeSampler(explicit_values=explicit_values,
+                                     no_samples=sampling_opts["no_samples"],
+                                     seed=sampling_opts["seed"])
+    elif method == "sobol":
+        return SobolSampler(explicit_values=explicit_values,
+                            no_samples=sampling_opts["no_samples"],
+                            seed=sampling_opts["seed"])
+    elif method == "adaptive":
+        return AdaptiveSampler(explicit_values=explicit_values,
+                               no_samples=sampling_opts["no_samples"],
+                               no_refinement_rounds=sampling_opts["no_refinement_rounds"],
+                               no_refinement_samples=sampling_opts["no_refinement_samples"],
+                               refinement_radius=sampling_opts["refinement_radius"],
+                               seed=sampling_opts["seed"])
+    elif method == "surrogate":
+        return SurrogateSampler(explicit_values=explicit_values,
+                                no_samples=sampling_opts["no_samples"],
+                                no_refinement_rounds=sampling_opts["no_refinement_rounds"],
+                                no_refinement_samples=sampling_opts["no_refinement_samples"],
+                                ei_tol=sampling_opts["ei_tol"],
+                                seed=sampling_opts["seed"])
+    else:
+        raise IOError("Unknown sampling method {}!".format(method))
@@ -0,0 +1,117 @@
+import os
+import numpy as np
+import laptimesim
+from conftest import REPO_PATH, load_test_inputs
+from datastore import DataStore
+
+
+def _create_car(tmp_path, car="eLemons_bmw_e28"):
+    # create the car of the first sensitivity analysis iteration of the given car config
+    _, car_name_, car_config_, track_pars_ = load_test_inputs(car=car)
+
+    datastore_ = DataStore(results_file_name=os.path.join(tmp_path, "results.csv"),
+                           track_pars=track_pars_,
+                           car_name=car_name_)
+    datastore_.parse_car_config(car_config_)
+    datastore_.generate_unique_sa_combinations()
+
+    race_car_model_ = datastore_.get_first_race_car_model()
+
+    return laptimesim.src.car_electric.CarElectric(pars=race_car_model_.get_car_parameters_for_laptimesim())
+
+
+def test_tire_force_pots_vec(tmp_path):
+    car = _create_car(tmp_path)
+
+    rng = np.random.default_rng(0)
+    vel = rng.uniform(0.0, 60.0, 200)
+    a_x = rng.uniform(-15.0, 15.0, 200)
+    a_y = rng.uniform(-15.0, 15.0, 200)
+    mu = rng.uniform(0.5, 1.2, 200)
+
+    tire_force_pots = car.tire_force_pots_vec(vel=vel, a_x=a_x, a_y=a_y, mu=mu)
+
+    assert tire_force_pots.shape == (200, 12)
+
+    for i in range(vel.size):
+        assert np.allclose(tire_force_pots[i], car.tire_force_pots(vel=vel[i], a_x=a_x[i], a_y=a_y[i], mu=mu[i]),
+                           rtol=1e-12, atol=0.0)
+
+    # scalar inputs are broadcasted
+    assert np.allclose(car.tire_force_pots_vec(vel=vel[0], a_x=0.0, a_y=0.0, mu=1.0)[0],
+                       car.tire_force_pots(vel=vel[0], a_x=0.0, a_y=0.0, mu=1.0),
+                       rtol=1e-12, atol=0.0)
+
+
+
+def test_v_max_cornering_profile(tmp_path):
+    car = _create_car(tmp_path)
+
+    kappa = np.concatenate((np.linspace(-0.1, 0.1, 41), [0.0, 1e-5, 0.5]))
+    mu = np.linspace(0.6, 1.1, kappa.size)
+
+    vel_max_cornering = car.v_max_cornering_profile(kappa=kappa, mu=mu, vel_subtr_corner=0.5)
+
+    for i in range(kappa.size):
+        assert vel_max_cornering[i] == car.v_max_cornering(kappa=kappa[i], mu=mu[i], vel_subtr_corner=0.5)
+
+    # second call is served from the cache and must not be affected by changes of the returned array
+    vel_max_cornering[:] = 0.0
+    assert np.array_equal(car.v_max_cornering_profile(kappa=kappa, mu=mu, vel_subtr_corner=0.5),
+                          [car.v_max_cornering(kappa=kappa[i], mu=mu[i], vel_subtr_corner=0.5)
+                           for i in range(kappa.size)])
+
+
+def test_calc_max_ax_analytic(tmp_path):
+    car = _create_car(tmp_path)
+
+    rng = np.random.default_rng(0)
+
+    for vel, a_y, mu in zip(rng.uniform(1.0, 60.0, 500), rng.uniform(-20.0, 20.0, 500), rng.uniform(0.5, 1.2, 500)):
+        f_y_f, f_y_r = car.calc_lat_forces(a_y=a_y)
+
+        # default tolerance corresponds to the resolution of the binary search
+        assert car.calc_max_ax_analytic(vel=vel, a_y=a_y, mu=mu, f_y_f=f_y_f, f_y_r=f_y_r) \
+            == car.calc_max_ax(vel=vel, a_y=a_y, mu=mu, f_y_f=f_y_f, f_y_r=f_y_r)
+
+
+def test_find_gear(tmp_path):
+    car = _create_car(tmp_path)
+
+    # velocities around every shift velocity down to the floating point resolution
+    vel = np.concatenate([np.linspace(0.0, 100.0, 2001)]
+                         + [vel_shift + np.arange(-20, 21) * np.spacing(vel_shift) for vel_shift in car.vel_shift
+                            if np.isfinite(vel_shift)])
+
+    gears, n = car.find_gear_profile(vel=vel)
+
+    for i in range(vel.size):
+        # first gear below the shift revs, final gear if the shift revs are exceeded in all gears
+        circumref = car.tire_circ_ref * (1 + (vel[i] * 3.6 - 60.0) * (0.045 / 200.0))
+        n_gears = vel[i] / (circumref * car.pars_gearbox["i_trans"])
+        shift_bool = n_gears < car.pars_gearbox["n_shift"]
+        gear = int(np.argmax(shift_bool)) if np.any(shift_bool) else n_gears.size - 1
+
+        assert car.find_gear(vel=vel[i]) == (gear, n[i])
+        assert gears[i] == gear
+        assert n[i] == n_gears[gear]
+
+
+def test_calc_torque_e_motor_boost_hybrid():
+    car = laptimesim.src.car_hybrid.CarHybrid(parfilepath=os.path.join(REPO_PATH, "laptimesim", "input", "vehicles",
+                                                                       "F1_Shanghai.ini"))
+
+    rng = np.random.default_rng(0)
+    n = rng.uniform(50.0, 250.0, 500)
+    m_requ = rng.uniform(0.0, 1000.0, 500)
+    throttle_pos = rng.uniform(0.0, 1.0, 500)
+    vel = rng.uniform(0.0, 90.0, 500)
+
+    m_e_motor = car.calc_torque_e_motor_boost(n=n, m_requ=m_requ, throttle_pos=throttle_pos, vel=vel)
+
+    # all cases of the torque distribution (ICE only, e motor partly and fully, below the minimum e motor velocity)
+    assert 0 < np.count_nonzero(m_e_motor) < n.size
+
+    for i in range(n.size):
+        assert m_e_motor[i] == car.calc_torque_distr(n=n[i], m_requ=m_requ[i], throttle_pos=throttle_pos[i],
+                                                     es=np.inf, em_boost_use=True, vel=vel[i])[1]
@@ -0,0 +1,260 @@
+import os
+import json
+import numpy as np
+import pytest
+
+from conftest import TEST_CAR, load_test_inputs
+from datastore import DataStore
+import results_sink
+from results_sink import read_results
+from definitions import ITER_TAG, LAPTIME_TAG, TOTAL_LAPS_TAG, WINNING_ELECTRIC_CAR_TAG
+
+
+def _create_datastore(tmp_path, car=TEST_CAR, results_file_name="results.csv", results_buffer_size=1,
+                      checkpoint_interval=0, resume=False, sampling_opts=None):
+    # create a datastore with prepared sensitivity analysis combinations of the given car config
+    _, car_name_, car_config_, track_pars_ = load_test_inputs(car=car)
+    if sampling_opts is not None:
+        car_config_["sampling"] = sampling_opts
+
+    datastore_ = DataStore(results_file_name=os.path.join(tmp_path, results_file_name),
+                           track_pars=track_pars_,
+                           car_name=car_name_,
+                           results_buffer_size=results_buffer_size,
+                           checkpoint_interval=checkpoint_interval,
+                           resume=resume)
+    datastore_.parse_car_config(car_config_)
+    datastore_.generate_unique_sa_combinations()
+
+    return datastore_
+
+
+def test_iterate_sa_combinations(tmp_path):
+    datastore = _create_datastore(tmp_path)
+    iterations = []
+
+    for i, single_iteration_data in datastore.iterate_sa_combinations():
+        assert single_iteration_data.iteration_number == i
+        assert list(datastore.single_iteration_data) == [i]
+
+        iterations.append(i)
+
+        # the first two iterations reach the same number of laps
+        datastore.set_single_iteration_results(iteration=i,
+                                               lap_time=100.0,
+                                               lap_energy=1000.0,
+                                               total_laps=300 + max(len(iterations), 2),
+                                               total_pits=1,
+                                               energy_remaining=0.0,
+                                               is_winning_car_configuration=False)
+
+    # overweight cars are skipped, the iteration numbers follow the order of all combinations
+    assert 0 < len(iterations) < datastore._total_iterations
+    assert iterations == sorted(iterations)
+    assert datastore.get_first_race_car_model() is not None
+    assert not datastore.single_iteration_data
+
+    best_results, multiple_optimum_results = datastore.get_best_result()
+
+    assert best_results[ITER_TAG] == iterations[-1]
+    assert best_results[TOTAL_LAPS_TAG] == 300 + len(iterations)
+    assert multiple_optimum_results == (len(iterations) == 2)
+
+
+def test_results_formats(tmp_path):
+    data = {}
+
+    for results_file_name in ("results.csv", "results.npz"):
+        datastore = _create_datastore(tmp_path, results_file_name=results_file_name, results_buffer_size=3)
+
+        for i, _ in datastore.iterate_sa_combinations():
+            datastore.set_single_iteration_results(iteration=i,
+                                                   lap_time=100.0 + i,
+                                                   lap_energy=1000.0,
+                                                   total_laps=300 + i,
+                                                   total_pits=1,
+                                                   energy_remaining=0.5,
+                                                   is_winning_car_configuration=i % 2 == 0)
+
+        datastore.close_results_file()
+        data[results_file_name] = read_results(os.path.join(tmp_path, results_file_name))
+
+    # the columnar format contains the same typed columns as the csv file
+    assert list(data["results.npz"].columns) == list(data["results.csv"].columns)
+    assert len(data["results.npz"]) == len(data["results.csv"]) > 3
+
+    for column in (ITER_TAG, TOTAL_LAPS_TAG, LAPTIME_TAG, WINNING_ELECTRIC_CAR_TAG):
+        assert data["results.npz"][column].dtype == data["results.csv"][column].dtype
+        assert np.array_equal(data["results.npz"][column], data["results.csv"][column])
+
+
+@pytest.mark.parametrize("results_format", ["npz", "parquet", "feather"])
+def test_results_column_types(tmp_path, results_format):
+    if results_format != "npz":
+        pytest.importorskip("pyarrow")
+
+    # the type of a column must not depend on the values of a chunk, e.g. integer and float values of the same column
+    file_name = os.path.join(tmp_path, "results." + results_format)
+    sink = results_sink.create_results_sink(file_name=file_name, fieldnames=["iteration", "value", "name"],
+                                            buffer_size=2, dtypes={"iteration": "int64"})
+
+    for i, value in enumerate([1, 2, 2.5, np.nan, 3]):
+        sink.write({"iteration": i, "value": value, "name": "car_%i" % i})
+
+    sink.close()
+    data = read_results(file_name)
+
+    assert data["iteration"].dtype == np.int64
+    assert data["value"].dtype == np.float64
+    assert np.array_equal(data["value"], [1.0, 2.0, 2.5, np.nan, 3.0], equal_nan=True)
+    assert list(data["name"]) == ["car_%i" % i for i in range(5)]
+
+    # every npz file stores the same types (the integer values of the first file are not stored as integers)
+    if results_format == "npz":
+        for part_file_name in os.listdir(file_name):
+            with np.load(os.path.join(file_name, part_file_name)) as part:
+                assert (part["column_0"].dtype, part["column_1"].dtype) == (np.int64, np.float64)
+
+
+def _set_results(datastore, i):
+    datastore.set_single_iteration_results(iteration=i,
+                                           lap_time=100.0 + i,
+                                           lap_energy=1000.0,
+                                           total_laps=300 + i,
+                                           total_pits=1,
+                                           energy_remaining=0.5,
+                                           is_winning_car_configuration=False)
+
+
+def test_resume(tmp_path):
+    for results_file_name in ("results.csv", "results.npz"):
+        # complete sensitivity analysis without interruption
+        datastore = _create_datastore(tmp_path, results_file_name="full-" + results_file_name)
+
+        for i, _ in datastore.iterate_sa_combinations():
+            _set_results(datastore, i)
+
+        datastore.close_results_file()
+        data_full = read_results(os.path.join(tmp_path, "full-" + results_file_name))
+
+        # crash after a few iterations, the results of the second iteration are not set before the crash and
+        # the results after the last checkpoint are written to the results file but not part of the checkpoint
+        datastore = _create_datastore(tmp_path, results_file_name=results_file_name, results_buffer_size=2,
+                                      checkpoint_interval=1e-9)
+        iterations = datastore.iterate_sa_combinations()
+
+        for k, (i, _) in enumerate(iterations):
+            if k != 1:
+                _set_results(datastore, i)
+
+            if k == 4:
+                break
+
+        datastore._checkpoint_interval = 0
+
+        for k, (i, _) in enumerate(iterations):
+            _set_results(datastore, i)
+
+            if k == 3:
+                break
+
+        datastore.results_sink.flush()
+
+        # resume and finish the sensitivity analysis
+        datastore = _create_datastore(tmp_path, results_file_name=results_file_name, results_buffer_size=2,
+                                      checkpoint_interval=1e-9, resume=True)
+
+        for i, _ in datastore.iterate_sa_combinations():
+            _set_results(datastore, i)
+
+        datastore.close_results_file()
+        data = read_results(os.path.join(tmp_path, results_file_name))
+
+        # every iteration is contained exactly once
+        assert len(data) == len(data_full)
+        assert sorted(data[ITER_TAG]) == list(data_full[ITER_TAG])
+        assert datastore.get_best_result()[0][ITER_TAG] == data_full[ITER_TAG].iloc[-1]
+
+
+def test_resume_twice(tmp_path):
+    for results_file_name in ("results.csv", "results.npz"):
+        # complete sensitivity analysis without interruption
+        datastore = _create_datastore(tmp_path, results_file_name="full-" + results_file_name)
+
+        for i, _ in datastore.iterate_sa_combinations():
+            _set_results(datastore, i)
+
+        datastore.close_results_file()
+        data_full = read_results(os.path.join(tmp_path, "full-" + results_file_name))
+
+        # crash with the results of the second iteration not set
+        datastore = _create_datastore(tmp_path, results_file_name=results_file_name, checkpoint_interval=1e-9)
+
+        for k, (i, _) in enumerate(datastore.iterate_sa_combinations()):
+            if k == 1:
+                pending_iteration = i
+            else:
+                _set_results(datastore, i)
+
+            if k == 3:
+                break
+
+        # resume and crash again after the pending iteration is finished
+        datastore = _create_datastore(tmp_path, results_file_name=results_file_name, checkpoint_interval=1e-9,
+                                      resume=True)
+        i, _ = next(datastore.iterate_sa_combinations())
+        assert i == pending_iteration
+        _set_results(datastore, i)
+
+        # resume again and finish the sensitivity analysis
+        datastore = _create_datastore(tmp_path, results_file_name=results_file_name, checkpoint_interval=1e-9,
+                                      resume=True)
+
+        for i, _ in datastore.iterate_sa_combinations():
+            _set_results(datastore, i)
+
+        datastore.close_results_file()
+        data = read_results(os.path.join(tmp_path, results_file_name))
+
+        # every iteration is contained exactly once
+        assert not data[ITER_TAG].duplicated().any()
+        assert sorted(data[ITER_TAG]) == list(data_full[ITER_TAG])
+
+
+def test_resume_unsupported_format(tmp_path, monkeypatch):
+    # parquet and feather files have no position to continue them at, pyarrow is not needed to create the sink
+    monkeypatch.setattr(results_sink, "pyarrow", object())
+
+    datastore = _create_datastore(tmp_path, results_file_name="results.parquet", checkpoint_interval=1e-9)
+    assert datastore._checkpoint_interval == 0
+    assert not os.path.isfile(os.path.join(tmp_path, "results.parquet.checkpoint.json"))
+
+    # a checkpoint without position (e.g. written before checkpoints were deactivated) must not be resumed
+    with open(os.path.join(tmp_path, "results.parquet.checkpoint.json"), "w") as fh:
+        json.dump({"results_position": None}, fh)
+
+    with pytest.raises(IOError):
+        _create_datastore(tmp_path, results_file_name="results.parquet", checkpoint_interval=1e-9, resume=True)
+
+
+def test_adaptive_sampling(tmp_path):
+    datastore = _create_datastore(tmp_path, sampling_opts={"method": "adaptive", "no_samples": 8,
+                                                           "no_refinement_rounds": 2, "no_refinement_samples": 4,
+                                                           "refinement_radius": 0.1, "seed": 0})
+    iterations = []
+
+    while True:
+        for i, single_iteration_data in datastore.iterate_sa_combinations():
+            iterations.append(i)
+            _set_results(datastore, i)
+
+        if not datastore.refine_sa_combinations():
+            break
+
+    datastore.close_results_file()
+    data = read_results(os.path.join(tmp_path, "results.csv"))
+
+    # every round only yields its own iterations
+    assert datastore._total_iterations == 16
+    assert iterations == sorted(set(iterations)) == list(data[ITER_TAG])
+    assert iterations[-1] >= 8
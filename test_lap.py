@@ -0,0 +1,240 @@
+import os
+import numpy as np
+import pytest
+import laptimesim
+
+from bench_laptimesim import create_lap
+from conftest import REPO_PATH, TEST_TRACK, load_test_inputs
+from datastore import DataStore
+from laptimesim.src import fbplus_kernel
+from laptimesim.src.car_electric import CarElectric
+from laptimesim.src.lap_batch import LapBatch
+from laptimesim.src.lap_profiler import PROFILE_FIELDNAMES
+
+
+def _create_hybrid_lap(em_strategy, initial_energy, **solver_opts):
+    # create a lap of the hybrid F1 car on Shanghai (not part of track_pars.toml, therefore, the track parameters of the
+    # test track are used with the sector boundaries of Shanghai) with the test options
+    config_, _, _, track_pars_ = load_test_inputs()
+
+    config_["track_opts_"]["trackname"] = "Shanghai"
+    config_["driver_opts_"].update({"em_strategy": em_strategy, "initial_energy": initial_energy})
+    config_["solver_opts_"].update(solver_opts)
+
+    track = laptimesim.src.track.Track(track_opts=config_["track_opts_"],
+                                       track_pars=dict(track_pars_, s12=1500.0, s23=3500.0),
+                                       trackfilepath=os.path.join(REPO_PATH, "laptimesim", "input", "tracks",
+                                                                  "racelines", "Shanghai.csv"),
+                                       vel_lim_glob=np.inf)
+    car = laptimesim.src.car_hybrid.CarHybrid(parfilepath=os.path.join(REPO_PATH, "laptimesim", "input", "vehicles",
+                                                                       "F1_Shanghai.ini"))
+    driver = laptimesim.src.driver.Driver(carobj=car,
+                                          pars_driver=config_["driver_opts_"],
+                                          trackobj=track,
+                                          stepsize=track.stepsize)
+
+    return laptimesim.src.lap.Lap(driverobj=driver,
+                                  trackobj=track,
+                                  pars_solver=config_["solver_opts_"],
+                                  debug_opts=config_["debug_opts_"])
+
+
+def _create_lap(use_profiling=False, driver_opts=None, track_opts=None, **solver_opts):
+    # create a lap of the test car and track with changed track, driver and solver options
+    track_opts = track_opts or {}
+    config_, car_name_, car_config_, track_pars_ = load_test_inputs(trackname=track_opts.get("trackname", TEST_TRACK))
+
+    config_["track_opts_"].update(track_opts)
+    config_["driver_opts_"].update(driver_opts or {})
+    config_["solver_opts_"].update(solver_opts)
+    config_["debug_opts_"]["use_profiling"] = use_profiling
+
+    return create_lap(track_opts=config_["track_opts_"],
+                      solver_opts=config_["solver_opts_"],
+                      driver_opts=config_["driver_opts_"],
+                      debug_opts=config_["debug_opts_"],
+                      car_config=car_config_,
+                      track_pars=track_pars_,
+                      car_name=car_name_)
+
+
+@pytest.mark.parametrize("use_elevation", [False, True])
+@pytest.mark.parametrize("compiled", [True, False])
+def test_numba_backend(monkeypatch, compiled, use_elevation):
+    if compiled:
+        pytest.importorskip("numba")
+    else:
+        # kernel of the numba backend as plain python function (as used if numba is not installed)
+        monkeypatch.setattr(fbplus_kernel, "NUMBA_AVAILABLE", True)
+        monkeypatch.setattr(fbplus_kernel, "fbplus", getattr(fbplus_kernel.fbplus, "py_func", fbplus_kernel.fbplus))
+
+    lap_python = _create_lap(backend="python", track_opts={"use_elevation": use_elevation})
+    lap_python.simulate_lap()
+
+    lap_numba = _create_lap(backend="numba", track_opts={"use_elevation": use_elevation})
+    lap_numba.simulate_lap()
+
+    assert np.allclose(lap_python.vel_cl, lap_numba.vel_cl)
+    assert np.allclose(lap_python.t_cl, lap_numba.t_cl)
+    assert np.array_equal(lap_python.gear_cl, lap_numba.gear_cl)
+    assert np.allclose(lap_python.e_cons_cl, lap_numba.e_cons_cl)
+
+    if not compiled:
+        assert np.array_equal(lap_python.vel_cl, lap_numba.vel_cl)
+        assert np.array_equal(lap_python.t_cl, lap_numba.t_cl)
+
+
+@pytest.mark.parametrize("trackname, use_elevation",
+                         [("HighPlainsFullTrack", False), ("HighPlainsFullTrack", True), ("Gingerman", False)])
+def test_lap_batch(tmp_path, trackname, use_elevation):
+    lap = _create_lap(calc_max_ax_mode="search", track_opts={"trackname": trackname, "use_elevation": use_elevation})
+
+    # all cars of the sensitivity analysis
+    _, car_name_, car_config_, track_pars_ = load_test_inputs(trackname=trackname)
+
+    datastore = DataStore(results_file_name=os.path.join(tmp_path, "results.csv"),
+                          track_pars=track_pars_,
+                          car_name=car_name_)
+    datastore.parse_car_config(car_config_)
+    datastore.generate_unique_sa_combinations()
+    cars = [CarElectric(pars=iteration_data.race_car_model.get_car_parameters_for_laptimesim())
+            for _, iteration_data in datastore.iterate_sa_combinations()]
+    datastore.close_results_file()
+
+    lap_batch = LapBatch(carobjs=cars,
+                         pars_driver=lap.driverobj.pars_driver,
+                         trackobj=lap.trackobj,
+                         pars_solver=lap.pars_solver,
+                         debug_opts=lap.debug_opts)
+    lap_batch.simulate_lap()
+
+    assert len(cars) >= 4
+    assert len(np.unique(lap_batch.t_cl[:, -1])) > 1
+
+    for k, car in enumerate(cars):
+        lap.driverobj.carobj = car
+        lap.reset_lap()
+        lap.simulate_lap()
+
+        assert np.allclose(lap.vel_cl, lap_batch.vel_cl[k])
+        assert np.allclose(lap.t_cl, lap_batch.t_cl[k])
+        assert np.array_equal(lap.gear_cl, lap_batch.gear_cl[k])
+        assert np.allclose(lap.e_cons_cl, lap_batch.e_cons_cl[k])
+
+
+def test_warm_start():
+    lap_cold = _create_lap(warm_start=False)
+    lap_cold.simulate_lap()
+
+    lap_warm = _create_lap(warm_start=True)
+
+    # first lap is a cold start, the second lap of the same car starts with the converged start velocity,
+    # the third one with a start velocity far away from it
+    for warm_start_state in (None, lap_cold.warm_start_state, (lap_cold.vel_cl[0] + 5.0, 0.0)):
+        lap_warm.reset_lap()
+        lap_warm.warm_start_state = warm_start_state
+        lap_warm.simulate_lap()
+
+        assert np.array_equal(lap_cold.vel_cl, lap_warm.vel_cl)
+        assert np.array_equal(lap_cold.t_cl, lap_warm.t_cl)
+        assert np.array_equal(lap_cold.e_cons_cl, lap_warm.e_cons_cl)
+
+
+def test_profiling():
+    lap = _create_lap(use_profiling=False)
+    lap.simulate_lap()
+
+    lap_profiled = _create_lap(use_profiling=True)
+    lap_profiled.simulate_lap()
+
+    assert lap.profiler is None
+    assert np.array_equal(lap.vel_cl, lap_profiled.vel_cl)
+
+    calls = lap_profiled.profiler.calls
+    counters = lap_profiled.profiler.counters
+
+    # every solver run calculates the cornering velocities once, every forward step the maximum acceleration
+    assert calls["fbplus"] == calls["v_max_cornering"] >= 1
+    assert calls["calc_max_ax"] == counters["forward_steps"] > 0
+    assert calls["backward"] == calls["recalc"] == counters["braking_zones"] > 0
+    assert counters["backward_depth"] >= counters["backward_depth_max"] > 0
+    assert counters["backward_inner_iters"] >= counters["backward_depth"]
+    assert calls["e_cons"] == 1
+    assert lap_profiled.profiler.times["fbplus"] > lap_profiled.profiler.times["calc_max_ax"] > 0.0
+    assert set(lap_profiled.profiler.get_summary()) == set(PROFILE_FIELDNAMES)
+
+
+@pytest.mark.parametrize("em_strategy", ["LBP", "LS"])
+def test_em_strategy(em_strategy):
+    lap = _create_lap()
+    lap.simulate_lap()
+
+    driver = lap.driverobj
+    driver.pars_driver["em_strategy"] = em_strategy
+    driver.em_boost_use = np.full(lap.trackobj.no_points, False)
+    m_e_motor = driver.carobj.calc_torque_e_motor_boost(n=lap.n_cl[:-1], m_requ=lap.m_requ,
+                                                        throttle_pos=driver.throttle_pos, vel=lap.vel_cl[:-1])
+    e_boost = driver.carobj.power_demand_e_motor_drive(n=lap.n_cl[:-1], m_e_motor=m_e_motor) * np.diff(lap.t_cl)
+
+    # boost points are selected until their energy exceeds the available energy
+    es_final = 0.5 * np.sum(e_boost)
+    driver.calc_em_boost_use(t_cl=lap.t_cl, vel_cl=lap.vel_cl, n_cl=lap.n_cl, m_requ=lap.m_requ, es_final=es_final)
+
+    assert 0 < np.sum(driver.em_boost_use) < lap.trackobj.no_points
+    assert np.sum(e_boost[driver.em_boost_use]) >= es_final > 0.0
+
+    if em_strategy == "LS":
+        assert np.max(lap.vel_cl[:-1][driver.em_boost_use]) <= np.min(lap.vel_cl[:-1][~driver.em_boost_use])
+
+    # too much energy -> boost everywhere
+    driver.calc_em_boost_use(t_cl=lap.t_cl, vel_cl=lap.vel_cl, n_cl=lap.n_cl, m_requ=lap.m_requ,
+                             es_final=2.0 * np.sum(e_boost))
+
+    assert np.all(driver.em_boost_use)
+
+
+@pytest.mark.parametrize("em_iter_scheme", ["add", "secant"])
+def test_em_iter_scheme(em_iter_scheme):
+    lap = _create_lap()
+    lap.simulate_lap()
+
+    # the boost points have no influence on an electric car -> converged after the first iteration
+    lap_em = _create_lap(driver_opts={"em_strategy": "LS", "initial_energy": 1.0e8}, em_iter_scheme=em_iter_scheme)
+    lap_em.simulate_lap()
+
+    assert lap.em_iter_stats == []
+    assert len(lap_em.em_iter_stats) == 1
+    assert lap_em.em_iter_stats[0]["es_final"] == lap_em.es_cl[-1]
+    assert lap_em.em_iter_stats[0]["lap_time"] == lap_em.t_cl[-1]
+    assert np.array_equal(lap.vel_cl, lap_em.vel_cl)
+
+    with pytest.raises(IOError):
+        _create_lap(em_iter_scheme="newton")
+
+
+def test_em_iter_scheme_hybrid():
+    # LBP: the secant method predicts the energy rebound of the boost and needs fewer solver runs than adding boost
+    # points from the remaining energy
+    lap_add = _create_hybrid_lap(em_strategy="LBP", initial_energy=1.0e6, em_iter_scheme="add", max_no_em_iters=20)
+    lap_add.simulate_lap()
+
+    lap_secant = _create_hybrid_lap(em_strategy="LBP", initial_energy=1.0e6, em_iter_scheme="secant",
+                                    max_no_em_iters=20)
+    lap_secant.simulate_lap()
+
+    assert 1 < len(lap_secant.em_iter_stats) < len(lap_add.em_iter_stats) < 20
+    assert lap_secant.em_iter_stats[-1]["es_final"] < 0.01 * lap_secant.em_iter_stats[0]["es_final"]
+    assert lap_secant.t_cl[-1] == pytest.approx(lap_add.t_cl[-1], abs=0.01)
+
+    # LS: the budget of the secant step empties the ES, the budget is bisected and boost points are removed again
+    lap_secant = _create_hybrid_lap(em_strategy="LS", initial_energy=0.75e6, em_iter_scheme="secant",
+                                    max_no_em_iters=20)
+    lap_secant.simulate_lap()
+
+    em_iter_stats = lap_secant.em_iter_stats
+
+    assert len(em_iter_stats) < 20
+    assert any(em_iter["es_final"] == 0.0 for em_iter in em_iter_stats[:-1])
+    assert any(em_iter_next["no_boost_points"] < em_iter["no_boost_points"]
+               for em_iter, em_iter_next in zip(em_iter_stats, em_iter_stats[1:]))
+    assert em_iter_stats[-1]["es_final"] == lap_secant.es_cl[-1] >= 0.0
@@ -0,0 +1,69 @@
+import os
+import copy
+import pandas as pd
+import pytest
+
+import lap_report
+from bench_laptimesim import create_lap
+from conftest import load_test_inputs
+from datastore import DataStore
+from definitions import ITER_TAG, LAP_ENERGY_TAG, LAPTIME_TAG, TOTAL_LAPS_TAG
+
+
+def test_select_iterations():
+    data = pd.DataFrame({ITER_TAG: [0, 1, 2, 3, 4],
+                         TOTAL_LAPS_TAG: [300, 310, 310, 290, 305],
+                         LAPTIME_TAG: [100.0, 99.0, 98.0, 97.0, 99.0],
+                         LAP_ENERGY_TAG: [1000.0, 1100.0, 1200.0, 1300.0, 1000.0]})
+
+    assert lap_report.select_best(data=data, no_best=3).tolist() == [2, 1, 4]
+
+    # iteration 0 is slower than iteration 4 with the same lap energy, iteration 1 is dominated by iteration 4
+    assert lap_report.select_pareto_front(data=data).tolist() == [3, 2, 4]
+
+    assert lap_report.select_iterations(data=data, report_opts={"no_best": 1, "use_pareto_front": False}).tolist() \
+        == [2]
+    assert lap_report.select_iterations(data=data, report_opts={"no_best": 1, "use_pareto_front": True}).tolist() \
+        == [2, 3, 4]
+
+
+def test_create_reports(tmp_path):
+    # user input (test car and options)
+    config_, car_name_, car_config_, track_pars_ = load_test_inputs()
+    debug_opts_ = config_["debug_opts_"]
+
+    lap = create_lap(track_opts=copy.deepcopy(config_["track_opts_"]),
+                     solver_opts=copy.deepcopy(config_["solver_opts_"]),
+                     driver_opts=copy.deepcopy(config_["driver_opts_"]),
+                     debug_opts=debug_opts_,
+                     car_config=copy.deepcopy(car_config_),
+                     track_pars=copy.deepcopy(track_pars_),
+                     car_name=car_name_)
+
+    datastore = DataStore(results_file_name=os.path.join(tmp_path, "results.csv"),
+                          track_pars=track_pars_,
+                          car_name=car_name_)
+    datastore.parse_car_config(copy.deepcopy(car_config_))
+    datastore.generate_unique_sa_combinations()
+    iteration = next(datastore.iterate_sa_combinations())[0]
+
+    file_names = lap_report.create_reports(track=lap.trackobj,
+                                           solver_opts=config_["solver_opts_"],
+                                           driver_opts=config_["driver_opts_"],
+                                           debug_opts=debug_opts_,
+                                           datastore=datastore,
+                                           iterations=[iteration],
+                                           output_path=os.path.join(tmp_path, "reports"),
+                                           formats=["png", "svg"])
+    datastore.close_results_file()
+
+    # four plots in both formats
+    assert list(file_names) == [iteration]
+    assert len(file_names[iteration]) == 8
+    assert all(os.path.getsize(file_name) > 0 for file_name in file_names[iteration])
+
+    with pytest.raises(IOError):
+        datastore.get_race_car_model(-1)
+
+    with pytest.raises(IOError):
+        lap_report.render_lap_report(lap=lap, file_name_prefix=os.path.join(tmp_path, "lap"), formats=["bmp"])
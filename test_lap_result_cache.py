@@ -0,0 +1,39 @@
+import numpy as np
+
+import lap_result_cache
+from lap_result_cache import LapResultCache
+
+
+def test_lap_result_cache(tmp_path, monkeypatch):
+    context = {"solver_opts": {"v_start": 27.7}, "raceline": np.zeros((3, 2))}
+    lap_cache = LapResultCache(max_size=2, context=context)
+
+    # the key does not depend on the order of the parameters or on their (numpy) types
+    key = lap_cache.make_key({"general": {"m": np.float64(1000.0), "lf": 1.2}, "gearbox": {"i_trans": [0.1, 0.2]}})
+    assert key == lap_cache.make_key({"gearbox": {"i_trans": np.array([0.1, 0.2])},
+                                      "general": {"lf": 1.2, "m": 1000.0}})
+    assert key != lap_cache.make_key({"general": {"m": 1000.1, "lf": 1.2}, "gearbox": {"i_trans": [0.1, 0.2]}})
+    assert key != LapResultCache(max_size=2, context={**context, "solver_opts": {"v_start": 20.0}}).make_key(
+        {"general": {"m": 1000.0, "lf": 1.2}, "gearbox": {"i_trans": [0.1, 0.2]}})
+
+    # least recently used lap results are evicted
+    assert lap_cache.get("a") is None
+    lap_cache.put("a", lap_time=100.0, lap_energy=1e6)
+    lap_cache.put("b", lap_time=101.0, lap_energy=2e6)
+    assert lap_cache.get("a") == (100.0, 1e6)
+    lap_cache.put("c", lap_time=102.0, lap_energy=3e6)
+
+    assert lap_cache.get("b") is None
+    assert lap_cache.get("a") == (100.0, 1e6)
+    assert lap_cache.get("c") == (102.0, 3e6)
+    assert (lap_cache.hits, lap_cache.misses) == (3, 2)
+
+    # lap results on disk are shared between cache objects and are exact
+    lap_time = 1.0 / 3.0
+    LapResultCache(max_size=0, context=context, cache_path=tmp_path).put(key, lap_time=lap_time, lap_energy=np.pi)
+    assert LapResultCache(max_size=0, context=context, cache_path=tmp_path).get(key) == (lap_time, np.pi)
+
+    # lap results of another cache version are not used
+    monkeypatch.setattr(lap_result_cache, "_LAP_CACHE_VERSION", lap_result_cache._LAP_CACHE_VERSION + 1)
+    lap_cache_new = LapResultCache(max_size=0, context=context, cache_path=tmp_path)
+    assert lap_cache_new.make_key({"general": {"m": 1000.0, "lf": 1.2}, "gearbox": {"i_trans": [0.1, 0.2]}}) != key
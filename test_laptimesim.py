@@ -1,62 +1,57 @@
 import main_laptimesim
-import os
-import pickle
+import subprocess
+import sys
+import copy
 import numpy as np
 
+from bench_laptimesim import create_lap
+from conftest import REPO_PATH, load_test_inputs
+
 
 def test_laptimesim():
-    # user input
-    track_opts_ = {"trackname": "Shanghai",
-                   "flip_track": False,
-                   "mu_weather": 1.0,
-                   "interp_stepsize_des": 5.0,
-                   "curv_filt_width": 10.0,
-                   "use_drs1": True,
-                   "use_drs2": True,
-                   "use_pit": False}
-    solver_opts_ = {"vehicle": "F1_Shanghai.ini",
-                    "series": "F1",
-                    "limit_braking_weak_side": 'FA',
-                    "v_start": 100.0 / 3.6,
-                    "find_v_start": True,
-                    "max_no_em_iters": 5,
-                    "es_diff_max": 1.0}
-    driver_opts_ = {"vel_subtr_corner": 0.5,
-                    "vel_lim_glob": None,
-                    "yellow_s1": False,
-                    "yellow_s2": False,
-                    "yellow_s3": False,
-                    "yellow_throttle": 0.3,
-                    "initial_energy": 4.58e6,
-                    "em_strategy": "FCFB",
-                    "use_recuperation": True,
-                    "use_lift_coast": False,
-                    "lift_coast_dist": 10.0}
-    sa_opts_ = {"use_sa": False,
-                "sa_type": "mass",
-                "range_1": [733.0, 833.0, 5],
-                "range_2": None}
-    debug_opts_ = {"use_plot": False,
-                   "use_debug_plots": False,
-                   "use_plot_comparison_tph": False,
-                   "use_print": False,
-                   "use_print_result": False}
+    # user input (test car and options, single lap without sensitivity analysis and plots)
+    config_, car_name_, car_config_, track_pars_ = load_test_inputs()
+
+    track_opts_ = config_["track_opts_"]
+    sa_opts_ = config_["sa_opts_"]
+    sa_opts_["use_sa"] = False
+    debug_opts_ = config_["debug_opts_"]
 
     # simulation call
-    lap = main_laptimesim.main(track_opts=track_opts_,
-                               solver_opts=solver_opts_,
-                               driver_opts=driver_opts_,
+    lap = main_laptimesim.main(track_opts=copy.deepcopy(track_opts_),
+                               solver_opts=copy.deepcopy(config_["solver_opts_"]),
+                               driver_opts=copy.deepcopy(config_["driver_opts_"]),
                                sa_opts=sa_opts_,
-                               debug_opts=debug_opts_)
+                               race_mc_opts=config_["race_mc_opts_"],
+                               report_opts=config_["report_opts_"],
+                               debug_opts=debug_opts_,
+                               car_config=copy.deepcopy(car_config_),
+                               track_pars=copy.deepcopy(track_pars_),
+                               car_name=car_name_)
+
+    # testing, the lap of the first iteration must match a lap created directly
+    target_lap = create_lap(track_opts=copy.deepcopy(track_opts_),
+                            solver_opts=copy.deepcopy(config_["solver_opts_"]),
+                            driver_opts=copy.deepcopy(config_["driver_opts_"]),
+                            debug_opts=debug_opts_,
+                            car_config=copy.deepcopy(car_config_),
+                            track_pars=copy.deepcopy(track_pars_),
+                            car_name=car_name_)
+    target_lap.simulate_lap()
+
+    assert np.all(lap.vel_cl > 0.0)
+    assert np.allclose(target_lap.vel_cl, lap.vel_cl)
+    assert np.allclose(target_lap.t_cl, lap.t_cl)
 
-    # testing
-    repo_path_ = os.path.dirname(os.path.abspath(__file__))
-    target_lap_path_ = os.path.join(repo_path_, ".github", "testobjects", "testobj_laptimesim_Shanghai.pkl")
 
-    with open(target_lap_path_, 'rb') as fh:
-        target_lap = pickle.load(fh)
+def test_headless_imports():
+    # the simulation core must not import the plotting stack or pkg_resources, see debug_opts_.headless
+    modules = subprocess.check_output([sys.executable, "-c",
+                                       "import sys, main_laptimesim, sa_runner; print(' '.join(sys.modules))"],
+                                      cwd=REPO_PATH, text=True).split()
 
-    assert np.allclose(target_lap.vel_cl, lap.vel_cl)
+    assert "matplotlib" not in modules
+    assert "pkg_resources" not in modules
 
 
 # testing --------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,40 @@
+import numpy as np
+
+from race_car_model import RaceCarModel
+from test_datastore import _create_datastore
+
+
+def test_calculate_car_properties_columnar(tmp_path):
+    datastore = _create_datastore(tmp_path)
+    iterations, input_vars, properties, is_allowable_weight = \
+        datastore.calculate_sa_grid_chunk(0, datastore._total_iterations)
+
+    assert not np.all(is_allowable_weight)
+
+    for k in iterations:
+        car_input_vars = {key: value[k] if isinstance(value, np.ndarray) else value
+                          for key, value in input_vars.items()}
+
+        race_car_model = RaceCarModel()
+        race_car_model.set_params(car_input_vars)
+
+        try:
+            race_car_model.calculate_car_properties()
+        except Exception:
+            assert not is_allowable_weight[k]
+            continue
+
+        assert is_allowable_weight[k]
+
+        race_car_model_columnar = RaceCarModel()
+        race_car_model_columnar.set_params(car_input_vars)
+        race_car_model_columnar.set_calculated_properties({key: value[k] for key, value in properties.items()})
+
+        properties_scalar = race_car_model.get_vehicle_properties_for_csv_output()
+        properties_columnar = race_car_model_columnar.get_vehicle_properties_for_csv_output()
+
+        for key in properties_scalar:
+            if isinstance(properties_scalar[key], float):
+                assert np.isclose(properties_scalar[key], properties_columnar[key], rtol=1e-12, atol=0.0)
+            else:
+                assert properties_scalar[key] == properties_columnar[key]
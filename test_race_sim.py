@@ -0,0 +1,78 @@
+import numpy as np
+
+from race_sim import RaceSim, RaceSimBatch, RaceSimMonteCarlo
+
+
+def test_race_sim_batch():
+    rng = np.random.default_rng(0)
+    no_configs = 2000
+
+    pit_time = rng.uniform(0.0, 10.0, no_configs)
+    lap_time = rng.uniform(40.0, 200.0, no_configs)
+    energy_per_lap = rng.uniform(1e5, 6e6, no_configs)
+    battery_capacity = rng.uniform(2.0, 60.0, no_configs)
+
+    # round numbers hit the boundaries of the floor divisions exactly, the last configurations cannot complete a
+    # single lap on a battery
+    lap_time[:100] = 60.0
+    energy_per_lap[:100] = 3.6e6
+    battery_capacity[:100] = np.arange(100) % 7 + 1.0
+    pit_time[:100] = np.where(np.arange(100) < 50, 0.0, 5.0)
+    energy_per_lap[-10:] = 1e8
+
+    gwc_times = [360, 240, 0.5]
+
+    race_sim_batch = RaceSimBatch(pit_time=pit_time,
+                                  gwc_times=gwc_times,
+                                  lap_time=lap_time,
+                                  energy_per_lap=energy_per_lap,
+                                  battery_capacity=battery_capacity)
+    race_sim_batch.calculate()
+
+    for i in range(no_configs):
+        race_sim = RaceSim(pit_time=pit_time[i],
+                           gwc_times=gwc_times,
+                           lap_time=lap_time[i],
+                           energy_per_lap=energy_per_lap[i],
+                           battery_capacity=battery_capacity[i])
+        race_sim.calculate()
+
+        assert race_sim_batch.total_laps[i] == race_sim.total_laps
+
+        for day, race_day in enumerate(race_sim.race_days):
+            assert race_sim_batch.laps_per_day[i, day] == race_day.total_laps
+            assert race_sim_batch.pits_per_day[i, day] == race_day.number_of_pits
+            assert race_sim_batch.energy_remaining_per_day[i, day] == race_day.energy_remaining
+
+
+def test_race_sim_monte_carlo():
+    lap_time = np.array([55.0, 60.0, 65.0])
+    race_pars = {"pit_time": 5.0, "gwc_times": [360, 240], "lap_time": lap_time, "energy_per_lap": 5.4e6,
+                 "battery_capacity": 50.0}
+
+    # without any randomness all samples equal the deterministic race
+    race_sim_mc = RaceSimMonteCarlo(no_samples=10, **race_pars)
+    race_sim_mc.calculate()
+
+    race_sim_batch = RaceSimBatch(**race_pars)
+    race_sim_batch.calculate()
+
+    assert np.array_equal(race_sim_mc.total_laps, np.repeat(race_sim_batch.total_laps[:, None], 10, axis=1))
+
+    # random race conditions, the results are reproducible with the same seed
+    race_sims = [RaceSimMonteCarlo(no_samples=500, pit_time_std=1.0, caution_rate=0.5, caution_duration=10.0,
+                                   caution_lap_time_factor=2.0, caution_energy_factor=0.3,
+                                   battery_degradation_max=0.05, seed=0, **race_pars) for _ in range(2)]
+
+    for race_sim in race_sims:
+        race_sim.calculate()
+
+    assert np.array_equal(race_sims[0].total_laps, race_sims[1].total_laps)
+
+    percentiles = race_sims[0].total_laps_percentiles([5, 50, 95])
+    win_probability = race_sims[0].win_probability(race_sim_batch.total_laps[1])
+
+    assert percentiles.shape == (3, 3)
+    assert np.all(np.diff(percentiles, axis=1) >= 0.0)
+    assert np.all((win_probability >= 0.0) & (win_probability <= 1.0))
+    assert win_probability[0] > win_probability[2]
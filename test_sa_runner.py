@@ -0,0 +1,38 @@
+import os
+import numpy as np
+
+import sa_runner
+from conftest import load_test_inputs
+from datastore import DataStore
+
+
+def test_race_results_batch(tmp_path):
+    _, car_name_, car_config_, track_pars_ = load_test_inputs()
+
+    datastore = DataStore(results_file_name=os.path.join(tmp_path, "results.csv"),
+                          track_pars=track_pars_,
+                          car_name=car_name_)
+    datastore.parse_car_config(car_config_)
+    datastore.generate_unique_sa_combinations()
+    race_car_models = [iteration_data.race_car_model for _, iteration_data in datastore.iterate_sa_combinations()]
+    datastore.close_results_file()
+
+    rng = np.random.default_rng(0)
+    lap_times = rng.uniform(80.0, 120.0, len(race_car_models))
+    lap_energies = rng.uniform(0.5e6, 2.0e6, len(race_car_models))
+
+    results_batch = sa_runner._race_results_batch(race_car_models=race_car_models,
+                                                  track_pars=track_pars_,
+                                                  lap_times=lap_times,
+                                                  lap_energies=lap_energies)
+
+    # the batched runner writes the same values with the same types as the serial and parallel runners
+    for k, race_car_model in enumerate(race_car_models):
+        results = sa_runner._race_results(race_car_model=race_car_model,
+                                          track_pars=track_pars_,
+                                          lap_time=lap_times[k],
+                                          lap_energy=lap_energies[k])
+
+        assert results_batch[k] == results
+        assert type(results_batch[k]["total_laps"]) is type(results["total_laps"]) is int
+        assert type(results_batch[k]["total_pits"]) is type(results["total_pits"]) is int
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from sa_sampler import AdaptiveSampler, GridSampler, create_sampler
+
+
+def _explicit_values():
+    # two swept variables and one that is not swept
+    return [np.linspace(10.0, 100.0, 10), [0.5], np.linspace(200.0, 240.0, 3)]
+
+
+def test_grid_sampler():
+    sampler = GridSampler(explicit_values=_explicit_values())
+    values = sampler.get_values(0, sampler.no_samples)
+
+    assert sampler.no_samples == 30
+    assert values[1] == 0.5
+    assert np.array_equal(values[0], np.repeat(np.linspace(10.0, 100.0, 10), 3))
+    assert np.array_equal(values[2], np.tile(np.linspace(200.0, 240.0, 3), 10))
+    assert not sampler.refine()
+
+
+@pytest.mark.parametrize("method", ["lhs", "sobol"])
+def test_space_filling_samplers(method):
+    if method == "sobol":
+        pytest.importorskip("scipy")
+
+    sampler = create_sampler(sampling_opts={"method": method, "no_samples": 16, "seed": 0},
+                             explicit_values=_explicit_values())
+    values = sampler.get_values(0, sampler.no_samples)
+
+    assert sampler.no_samples == 16
+    assert values[1] == 0.5
+
+    # every one of the 16 intervals of the ranges contains exactly one sample
+    for values_var, value_min, value_max in ((values[0], 10.0, 100.0), (values[2], 200.0, 240.0)):
+        intervals = np.floor((values_var - value_min) / (value_max - value_min) * 16)
+        assert np.array_equal(np.sort(intervals), np.arange(16))
+
+    # chunks contain the same samples
+    assert np.array_equal(sampler.get_values(4, 8)[0], values[0][4:8])
+
+
+def test_adaptive_sampler():
+    sampler = AdaptiveSampler(explicit_values=_explicit_values(), no_samples=20, no_refinement_rounds=2,
+                              no_refinement_samples=10, refinement_radius=0.1, seed=0)
+    start = 0
+    no_samples = [sampler.no_samples]
+
+    # total laps rise with the first variable, cars with a value above 50 win
+    while True:
+        values = sampler.get_values(start, sampler.no_samples)
+
+        for k, value in enumerate(values[0]):
+            sampler.set_results(sample=start + k, total_laps=value, is_winning_car_configuration=value > 50.0)
+
+        start = sampler.no_samples
+
+        if not sampler.refine():
+            break
+
+        no_samples.append(sampler.no_samples)
+
+    assert no_samples == [20, 30, 40]
+
+    # half of the samples of every round is placed around the winning boundary, the other half around the best sample
+    values = sampler.get_values(20, 40)[0].reshape(2, 2, 5)
+    assert np.all(np.abs(values[:, 0] - 50.0) < 90.0 * 0.25)
+    assert np.all(values[:, 1] > 100.0 - 90.0 * 0.25)
+
+
+def _total_laps(values):
+    # total laps with a single maximum at (70, 220)
+    return 300.0 - ((values[0] - 70.0) / 10.0) ** 2 - ((values[2] - 220.0) / 5.0) ** 2
+
+
+def test_surrogate_sampler():
+    sampler = create_sampler(sampling_opts={"method": "surrogate", "no_samples": 10, "no_refinement_rounds": 10,
+                                            "no_refinement_samples": 4, "ei_tol": 0.1, "seed": 0},
+                             explicit_values=_explicit_values())
+    start = 0
+
+    while True:
+        for k, total_laps in enumerate(_total_laps(sampler.get_values(start, sampler.no_samples))):
+            sampler.set_results(sample=start + k, total_laps=total_laps, is_winning_car_configuration=False)
+
+        start = sampler.no_samples
+
+        if not sampler.refine():
+            break
+
+    total_laps = _total_laps(sampler.get_values(0, sampler.no_samples))
+
+    # the batches find the maximum with few samples and the optimization stops by itself
+    assert (sampler.no_samples - 10) % 4 == 0
+    assert sampler.no_samples < 10 + 4 * 10
+    assert np.max(total_laps) > 299.5
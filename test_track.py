@@ -0,0 +1,56 @@
+import os
+import numpy as np
+import pytest
+
+import laptimesim
+from conftest import REPO_PATH, load_test_inputs
+
+
+def _create_track(cache_path, **track_opts):
+    # create the test track with changed track options
+    config_, _, _, track_pars_ = load_test_inputs()
+    trackname_ = config_["track_opts_"]["trackname"]
+
+    return laptimesim.src.track.Track(track_opts=dict(config_["track_opts_"], **track_opts),
+                                      track_pars=track_pars_,
+                                      trackfilepath=os.path.join(REPO_PATH, "laptimesim", "input", "tracks",
+                                                                 "racelines", trackname_ + ".csv"),
+                                      cache_path=cache_path)
+
+
+def test_track_cache(tmp_path):
+    track = _create_track(cache_path=None)
+    track_cached = _create_track(cache_path=str(tmp_path))
+
+    assert len(os.listdir(tmp_path)) == 1
+
+    track_loaded = _create_track(cache_path=str(tmp_path))
+
+    for track_tmp in (track_cached, track_loaded):
+        assert np.array_equal(track.raceline, track_tmp.raceline)
+        assert np.array_equal(track.kappa, track_tmp.kappa)
+        assert np.array_equal(track.dists_cl, track_tmp.dists_cl)
+        assert np.array_equal(track.mu, track_tmp.mu)
+        assert np.array_equal(track.elevation_profile, track_tmp.elevation_profile)
+        assert track.stepsize == track_tmp.stepsize
+        assert track.no_points == track_tmp.no_points
+        assert track.zone_inds == track_tmp.zone_inds
+
+
+@pytest.mark.parametrize("flip_track", [False, True])
+def test_elevation_profile(flip_track):
+    track = _create_track(cache_path=None, use_elevation=True, flip_track=flip_track)
+    track_flat = _create_track(cache_path=None, use_elevation=False, flip_track=flip_track)
+
+    # the elevation profile is interpolated onto the raceline, the elevation column does not influence it
+    assert track.raceline.shape == (track.no_points, 2)
+    assert track.elevation_profile.shape == (track.no_points,)
+    assert np.array_equal(track.raceline, track_flat.raceline)
+
+    # the grade forces of a closed lap sum up to zero, flat tracks have none
+    f_x_grade = track.calc_grade_forces(m=1000.0, g=9.81)
+    assert f_x_grade.shape == (track.no_points,)
+    assert np.any(f_x_grade != 0.0)
+    assert np.isclose(np.sum(f_x_grade), 0.0, atol=1e-6)
+    assert np.array_equal(track.calc_grade_forces(m=np.array([[1000.0], [2000.0]]), g=9.81)[1], 2.0 * f_x_grade)
+    assert np.array_equal(track_flat.calc_grade_forces(m=1000.0, g=9.81), np.zeros(track.no_points))